@@ -0,0 +1,3 @@
+from .server import ApiServer, ApiRequestHandler, serve
+
+__all__ = [ApiServer, ApiRequestHandler, serve]
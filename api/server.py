@@ -0,0 +1,495 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+from models import (Collaborator, ValidationError, NotFound, PermissionDenied, TokenExpired,
+                    ConcurrentUpdateError)
+from controllers import ClientHandler, ContractHandler, EventHandler, CollaboratorHandler, SearchHandler, SchedulingConflict
+from controllers.scheduling import CONFLICT_LIMIT
+from config.database import SessionLocal, engine
+from sentry_sdk import capture_exception
+import json
+import re
+import selectors
+import socket
+import threading
+import time
+
+
+KEEP_ALIVE_TIMEOUT = 5
+
+MAX_BODY_SIZE = 1024 * 1024
+
+DATE_FIELDS = ('start_date', 'end_date')
+
+HIDDEN_FIELDS = ('password',)
+
+
+def to_dict(instance):
+    """
+    Converts a model instance to a JSON ready dict of its columns.
+
+    Args:
+        instance: The model instance.
+
+    Returns:
+        dict: The column values, datetimes as ISO strings, passwords left out.
+    """
+    values = {}
+    for attr in inspect(instance).mapper.column_attrs:
+        if attr.key in HIDDEN_FIELDS:
+            continue
+        value = getattr(instance, attr.key)
+        values[attr.key] = value.isoformat() if isinstance(value, datetime) else value
+    return values
+
+
+def listing_arguments(query):
+    """
+    Reads the pagination parameters of a listing from the query string.
+
+    Args:
+        query (dict): The parsed query string.
+
+    Returns:
+        dict: after_id, limit and sort_key keyword arguments.
+
+    Raises:
+        ValueError: If after_id or limit is not a number.
+    """
+    after_id = query.get('after_id')
+    limit = query.get('limit')
+    return {
+        'after_id': int(after_id) if after_id is not None else None,
+        'limit': int(limit) if limit is not None else None,
+        'sort_key': query.get('sort', 'id')
+    }
+
+
+def _listing(method):
+    return lambda handler, ids, body, query: [to_dict(row) for row in getattr(handler, method)(**listing_arguments(query))]
+
+
+def _search(handler, ids, body, query):
+    kinds = query.get('kind')
+    limit = query.get('limit')
+    return handler.search(query.get('q', ''), kinds.split(',') if kinds else None,
+                          int(limit) if limit is not None else 20)
+
+
+def _filter(method):
+    return lambda handler, ids, body, query: [to_dict(row) for row in getattr(handler, method)()]
+
+
+ROUTES = [
+    ('GET', r'/clients', ClientHandler, _listing('get_all_clients')),
+    ('POST', r'/clients', ClientHandler, lambda h, ids, body, query: to_dict(h.create_client(body))),
+    ('PUT', r'/clients/(\d+)', ClientHandler, lambda h, ids, body, query: to_dict(h.update_client(ids[0], body))),
+    ('GET', r'/contracts', ContractHandler, _listing('get_all_contracts')),
+    ('GET', r'/contracts/not-paid', ContractHandler, _filter('filter_contacts_not_paid')),
+    ('POST', r'/contracts', ContractHandler, lambda h, ids, body, query: to_dict(h.create_contract(body))),
+    ('PUT', r'/contracts/signed', ContractHandler,
+     lambda h, ids, body, query: h.mark_contracts_signed(body.get('contract_ids', ()))),
+    ('PUT', r'/contracts/paid', ContractHandler,
+     lambda h, ids, body, query: h.mark_contracts_paid(body.get('contract_ids', ()))),
+    ('PUT', r'/contracts/amount-due', ContractHandler,
+     lambda h, ids, body, query: h.adjust_amount_due(body.get('contract_ids', ()), float(body.get('delta', 0)))),
+    ('PUT', r'/contracts/(\d+)', ContractHandler, lambda h, ids, body, query: to_dict(h.update_contract(ids[0], body))),
+    ('GET', r'/events', EventHandler, _listing('get_all_events')),
+    ('GET', r'/events/without-support', EventHandler, _filter('filter_events_without_support')),
+    ('GET', r'/events/mine', EventHandler, _filter('filter_my_events')),
+    ('POST', r'/events', EventHandler, lambda h, ids, body, query: to_dict(h.create_event(body))),
+    ('PUT', r'/events/(\d+)', EventHandler, lambda h, ids, body, query: to_dict(h.update_event(ids[0], body))),
+    ('PUT', r'/events/support', EventHandler,
+     lambda h, ids, body, query: h.add_support_contact_many(body.get('event_ids', ()), body.get('support_contact_id'),
+                                                           bool(body.get('allow_overlap')))),
+    ('PUT', r'/events/(\d+)/support', EventHandler,
+     lambda h, ids, body, query: to_dict(h.add_support_contact(ids[0], body.get('support_contact_id'),
+                                                               bool(body.get('allow_overlap'))))),
+    ('GET', r'/events/conflicts', EventHandler,
+     lambda h, ids, body, query: h.scheduling_conflicts(int(query.get('limit', CONFLICT_LIMIT)))),
+    ('POST', r'/events/auto-assign', EventHandler,
+     lambda h, ids, body, query: h.auto_assign_support(body.get('where', ()), bool(body.get('dry_run')))),
+    ('GET', r'/search', SearchHandler, _search),
+    ('GET', r'/collaborators', CollaboratorHandler, _listing('get_all_collaborators')),
+    ('POST', r'/collaborators', CollaboratorHandler, lambda h, ids, body, query: to_dict(h.create_collaborator(body))),
+    ('PUT', r'/collaborators/(\d+)', CollaboratorHandler,
+     lambda h, ids, body, query: to_dict(h.update_collaborator(ids[0], body))),
+    ('DELETE', r'/collaborators/(\d+)', CollaboratorHandler,
+     lambda h, ids, body, query: h.delete_collaborator(ids[0])[0]),
+]
+
+COMPILED_ROUTES = [(method, re.compile(pattern + '$'), handler_class, action)
+                   for method, pattern, handler_class, action in ROUTES]
+
+
+class ApiError(Exception):
+    """
+    An error answered with a given HTTP status.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# The HTTP status of the handler exceptions, the first matching class wins.
+ERROR_STATUSES = [
+    (TokenExpired, 401),
+    (PermissionDenied, 403),
+    (NotFound, 404),
+    (SchedulingConflict, 409),
+    (ConcurrentUpdateError, 409),
+    (ValidationError, 422),
+]
+
+
+def error_status(error):
+    """
+    Chooses the HTTP status of a handler exception from its class.
+
+    Args:
+        error (Exception): The exception raised by a handler.
+
+    Returns:
+        int: The HTTP status code, 400 for the exceptions of no known class.
+    """
+    for error_class, status in ERROR_STATUSES:
+        if isinstance(error, error_class):
+            return status
+    return 400
+
+
+def error_payload(error):
+    """
+    Builds the JSON answer of a handler exception.
+
+    Args:
+        error (Exception): The exception raised by a handler.
+
+    Returns:
+        dict: The error message, with the conflicting events of a
+              SchedulingConflict and the invalid fields of a ValidationError.
+    """
+    if isinstance(error, SchedulingConflict):
+        return {'error': str(error), 'conflicts': error.conflicts}
+    if isinstance(error, ConcurrentUpdateError):
+        return {'error': str(error), 'retryable': True}
+    if isinstance(error, ValidationError):
+        return {'error': 'Invalid data', 'details': error.args[0]}
+    return {'error': str(error)}
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers the JSON API requests, one database session per request.
+
+    HTTP/1.1 keeps client connections open between requests. A worker only
+    serves the requests already received on a connection, the server waits
+    for the next ones without holding it, see KeepAliveWatcher.
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'EpicEvents'
+    timeout = KEEP_ALIVE_TIMEOUT
+
+    def handle(self):
+        """
+        Serves the received request, then the pipelined ones already read
+        into the buffer.
+        """
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.has_buffered_request():
+            self.handle_one_request()
+
+    def has_buffered_request(self):
+        """
+        Tells whether the next request can be read without waiting for the client.
+        """
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method):
+        """
+        Routes a request to its handler operation and writes the JSON answer.
+
+        Args:
+            method (str): The HTTP method.
+        """
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        session = SessionLocal()
+        try:
+            body = self.read_body()
+            if method == 'POST' and url.path == '/login':
+                status, payload = 200, self.login(session, body)
+            else:
+                status, payload = 200, self.call_handler(session, method, url.path, body, query)
+        except ApiError as e:
+            status, payload = e.status, {'error': str(e)}
+        except SQLAlchemyError as e:
+            session.rollback()
+            capture_exception(e)
+            status, payload = 500, {'error': 'Database error'}
+        except Exception as e:
+            session.rollback()
+            status, payload = error_status(e), error_payload(e)
+        finally:
+            session.close()
+        self.send_json(status, payload)
+
+    def read_body(self):
+        """
+        Reads and decodes the JSON body of the request.
+
+        Returns:
+            dict: The decoded body, empty when there is none.
+
+        Raises:
+            ApiError: If the body is too large or is not a JSON object.
+        """
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_SIZE:
+            self.close_connection = True
+            raise ApiError(413, 'Request body too large')
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, 'Invalid JSON body')
+        if not isinstance(body, dict):
+            raise ApiError(400, 'The JSON body must be an object')
+        for field in DATE_FIELDS:
+            if isinstance(body.get(field), str):
+                try:
+                    body[field] = datetime.fromisoformat(body[field])
+                except ValueError:
+                    raise ApiError(400, f'{field} must be an ISO formatted date')
+        return body
+
+    def login(self, session, body):
+        """
+        Exchanges an email and a password for a JWT token.
+
+        Raises:
+            ApiError: If the credentials are wrong.
+        """
+        token = Collaborator().authenticate(session, body.get('email', ''), body.get('password', ''))
+        if not token:
+            raise ApiError(401, 'Invalid email or password')
+        return {'token': token}
+
+    def call_handler(self, session, method, path, body, query):
+        """
+        Runs the handler operation matching the method and path.
+
+        Raises:
+            ApiError: If no route matches or the bearer token is missing or invalid.
+        """
+        route = None
+        path_matched = False
+        for route_method, pattern, handler_class, action in COMPILED_ROUTES:
+            match = pattern.match(path)
+            if match:
+                path_matched = True
+                if route_method == method:
+                    route = (handler_class, action, [int(value) for value in match.groups()])
+                    break
+        if route is None:
+            raise ApiError(405 if path_matched else 404, f'No route for {method} {path}')
+
+        authorization = self.headers.get('Authorization', '')
+        if not authorization.startswith('Bearer '):
+            raise ApiError(401, 'Missing bearer token')
+        handler_class, action, ids = route
+        handler = handler_class(session, authorization[len('Bearer '):].strip())
+        if not handler.token_data or handler.token_data == 'expired' or not handler.collaborator:
+            raise ApiError(401, 'Invalid or expired token')
+        try:
+            return action(handler, ids, body, query)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+
+    def send_json(self, status, payload):
+        """
+        Writes a JSON response with its length, so the connection can be reused.
+        """
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        """
+        Request logging is left to a reverse proxy, the default one writes a
+        line to stderr for every request.
+        """
+
+
+class KeepAliveWatcher:
+    """
+    Waits for the next request of the idle kept alive connections.
+
+    A single thread selects the idle sockets: a readable one goes back to
+    the worker pool, one idle for KEEP_ALIVE_TIMEOUT seconds is closed. Idle
+    connections therefore never hold a worker, however many there are.
+    """
+    def __init__(self, server, timeout=KEEP_ALIVE_TIMEOUT):
+        """
+        Starts the watcher thread.
+
+        Args:
+            server (ApiServer): The server the connections belong to.
+            timeout (float): The longest idle time of a connection, in seconds.
+        """
+        self.server = server
+        self.timeout = timeout
+        self._selector = selectors.DefaultSelector()
+        self._wakeup, self._waker = socket.socketpair()
+        self._selector.register(self._wakeup, selectors.EVENT_READ)
+        self._parked = []
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='api-keep-alive', daemon=True)
+        self._thread.start()
+
+    def park(self, request, client_address):
+        """
+        Watches a connection until its next request or its idle timeout.
+
+        Args:
+            request (socket): The client connection.
+            client_address (tuple): The client address.
+        """
+        with self._lock:
+            self._parked.append((request, client_address, time.monotonic() + self.timeout))
+        self._waker.send(b'\0')
+
+    def stop(self):
+        """
+        Stops the watcher thread and closes the idle connections.
+        """
+        self._stopping = True
+        self._waker.send(b'\0')
+        self._thread.join()
+        for key in list(self._selector.get_map().values()):
+            if key.fileobj is not self._wakeup:
+                self.server.shutdown_request(key.fileobj)
+        self._selector.close()
+        self._wakeup.close()
+        self._waker.close()
+
+    def _run(self):
+        deadlines = {}
+        while not self._stopping:
+            timeout = max(min(deadlines.values()) - time.monotonic(), 0) if deadlines else None
+            for key, _ in self._selector.select(timeout):
+                if key.fileobj is self._wakeup:
+                    self._wakeup.recv(4096)
+                    with self._lock:
+                        parked, self._parked = self._parked, []
+                    for request, client_address, deadline in parked:
+                        self._selector.register(request, selectors.EVENT_READ, client_address)
+                        deadlines[request] = deadline
+                else:
+                    self._selector.unregister(key.fileobj)
+                    del deadlines[key.fileobj]
+                    try:
+                        self.server.executor.submit(self.server.process_request_thread, key.fileobj, key.data)
+                    except RuntimeError:
+                        # The server is closing, the pool takes no more work.
+                        self.server.shutdown_request(key.fileobj)
+            now = time.monotonic()
+            for request in [request for request, deadline in deadlines.items() if deadline <= now]:
+                self._selector.unregister(request)
+                del deadlines[request]
+                self.server.shutdown_request(request)
+
+
+class ApiServer(ThreadingHTTPServer):
+    """
+    HTTP server handling requests on a fixed pool of worker threads.
+
+    A thread per connection would grow without bound under load, the pool
+    caps the concurrency, and so the number of database connections in use.
+    Workers serve requests, not connections: between two requests a kept
+    alive connection waits in the KeepAliveWatcher.
+    """
+    request_queue_size = 128
+
+    def __init__(self, address, workers=8):
+        """
+        Binds the server.
+
+        Args:
+            address (tuple): The (host, port) to listen on.
+            workers (int): The number of requests served at once.
+        """
+        super().__init__(address, ApiRequestHandler)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+        self.keep_alive = KeepAliveWatcher(self)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        """
+        Serves the received requests of a connection, then hands it to the
+        KeepAliveWatcher unless it must be closed.
+        """
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        if handler.close_connection:
+            self.shutdown_request(request)
+        else:
+            self.keep_alive.park(request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+        self.keep_alive.stop()
+
+
+def serve(host='127.0.0.1', port=8000, workers=8):
+    """
+    Serves the JSON API until interrupted.
+
+    Args:
+        host (str): The interface to listen on.
+        port (int): The port to listen on.
+        workers (int): The number of requests served at once.
+    """
+    # Logging every statement would cost more than running it.
+    engine.echo = False
+    server = ApiServer((host, port), workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,23 @@
+"""
+Measures bcrypt hashes per second for each cost factor, sequentially and on
+the password hasher thread pool.
+
+Usage: python -m benchmarks.bench_bcrypt [--min-rounds 4] [--max-rounds 14]
+"""
+import click
+from models.passwords import benchmark, HASH_WORKERS
+
+
+@click.command()
+@click.option('--min-rounds', default=4, show_default=True)
+@click.option('--max-rounds', default=14, show_default=True)
+@click.option('--duration', default=1.0, show_default=True, help="Seconds measured per cost and mode.")
+@click.option('--workers', default=HASH_WORKERS, show_default=True)
+def main(min_rounds, max_rounds, duration, workers):
+    click.echo(f"{'rounds':>6}  {'hashes/s':>10}  {f'hashes/s x{workers}':>14}")
+    for rounds, sequential, parallel in benchmark(range(min_rounds, max_rounds + 1), duration, workers):
+        click.echo(f"{rounds:>6}  {sequential:>10.1f}  {parallel:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
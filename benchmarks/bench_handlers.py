@@ -0,0 +1,305 @@
+"""
+Times the handlers and the show_/filter_ views over synthetic datasets and
+compares the results with saved baselines.
+
+Each case runs --repeat times on a fresh session, plus once under tracemalloc
+for its peak memory. Writes run inside a transaction that is rolled back, so
+the datasets never change between runs.
+
+Usage: python -m benchmarks.bench_handlers [--scale 10k] [--scale 100k] [--scale 1m]
+                                           [--repeat 5] [--save NAME] [--compare NAME]
+"""
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from models import Client, Contract, Event, Collaborator
+from controllers import ClientHandler, ContractHandler, EventHandler, CollaboratorHandler, transaction_scope
+from benchmarks.dataset import ensure_dataset, open_engine, scale_rows, PASSWORD
+import click
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import views.cli_views
+import views.col_views
+import views.con_views
+import views.event_views
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DATA_DIR = os.path.join(BENCHMARK_DIR, 'data')
+
+BASELINE_DIR = os.path.join(BENCHMARK_DIR, 'baselines')
+
+VIEW_MODULES = (views.cli_views, views.col_views, views.con_views, views.event_views)
+
+PAGE_SIZE = 100
+
+
+class Context:
+    """
+    What a case needs: a fresh session, a token per department and ids of
+    rows that the token owners may modify.
+    """
+    def __init__(self, session, fixtures):
+        self.session = session
+        self.__dict__.update(fixtures)
+
+    def handler(self, handler_class, department):
+        return handler_class(self.session, self.tokens[department])
+
+
+def load_fixtures(session, rows):
+    """
+    Picks the collaborators and rows used by the cases, see Context.
+    """
+    fixtures = {'rows': rows, 'tokens': {}, 'ids': {}}
+    for department in ('commercial', 'gestion', 'support'):
+        collaborator = session.scalars(select(Collaborator).where(Collaborator.department == department)
+                                       .order_by(Collaborator.id).limit(1)).one()
+        fixtures['tokens'][department] = collaborator.create_token()
+        fixtures['ids'][department] = collaborator.id
+
+    commercial_id, support_id = fixtures['ids']['commercial'], fixtures['ids']['support']
+    fixtures['client_id'] = session.scalar(select(Client.id).where(Client.commercial_id == commercial_id).limit(1))
+    fixtures['contract_id'] = session.scalar(select(Contract.id).where(Contract.commercial_id == commercial_id).limit(1))
+    fixtures['event_id'] = session.scalar(select(Event.id).where(Event.support_contact_id == support_id).limit(1))
+    fixtures['unassigned_event_id'] = session.scalar(select(Event.id).where(Event.support_contact_id.is_(None)).limit(1))
+    fixtures['middle_id'] = rows // 2
+    return fixtures
+
+
+class _Rollback(Exception):
+    pass
+
+
+def rolled_back(case):
+    """
+    Runs a writing case in a transaction scope that is always rolled back.
+    """
+    def run(ctx):
+        result = None
+        try:
+            with transaction_scope(ctx.session):
+                result = case(ctx)
+                raise _Rollback()
+        except _Rollback:
+            return result
+    return run
+
+
+def count(result):
+    """
+    Counts the rows of a listing or stream, 1 for a single instance.
+    """
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if hasattr(result, '__iter__') and not isinstance(result, (dict, str)):
+        return sum(1 for _ in result)
+    return 1
+
+
+def render(view, department):
+    """
+    Runs a view with the token of a department against the case session,
+    its output thrown away.
+    """
+    def run(ctx):
+        sessions = [module.session for module in VIEW_MODULES]
+        for module in VIEW_MODULES:
+            module.session = ctx.session
+        try:
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                view(ctx.tokens[department])
+        finally:
+            for module, session in zip(VIEW_MODULES, sessions):
+                module.session = session
+    return run
+
+
+def client_data(ctx):
+    return {'name': 'Bench client', 'email': 'bench@example.com', 'telephone': '+33100000000',
+            'company_name': 'Bench'}
+
+
+def event_data(ctx):
+    return {'contract_id': ctx.contract_id, 'location': 'Bench venue', 'attendees': 50, 'notes': 'Bench',
+            'end_date': datetime.utcnow() + timedelta(days=1)}
+
+
+CASES = [
+    # Handlers
+    ('ClientHandler.get_all_clients page', lambda ctx: ctx.handler(ClientHandler, 'commercial')
+     .get_all_clients(after_id=ctx.middle_id, limit=PAGE_SIZE)),
+    ('ClientHandler.get_all_clients by name', lambda ctx: ctx.handler(ClientHandler, 'commercial')
+     .get_all_clients(limit=PAGE_SIZE, sort_key='name')),
+    ('ClientHandler.stream_clients', lambda ctx: ctx.handler(ClientHandler, 'commercial').stream_clients()),
+    ('ClientHandler.create_client', rolled_back(lambda ctx: ctx.handler(ClientHandler, 'commercial')
+     .create_client(client_data(ctx)))),
+    ('ClientHandler.update_client', rolled_back(lambda ctx: ctx.handler(ClientHandler, 'commercial')
+     .update_client(ctx.client_id, {'telephone': '+33199999999'}))),
+    ('ContractHandler.get_all_contracts page', lambda ctx: ctx.handler(ContractHandler, 'gestion')
+     .get_all_contracts(after_id=ctx.middle_id, limit=PAGE_SIZE)),
+    ('ContractHandler.stream_contracts', lambda ctx: ctx.handler(ContractHandler, 'gestion').stream_contracts()),
+    ('ContractHandler.filter_contacts_not_paid', lambda ctx: ctx.handler(ContractHandler, 'commercial')
+     .filter_contacts_not_paid()),
+    ('ContractHandler.create_contract', rolled_back(lambda ctx: ctx.handler(ContractHandler, 'gestion')
+     .create_contract({'client_id': ctx.client_id, 'total_amount': 1000.0, 'amount_due': 500.0, 'status': False}))),
+    ('ContractHandler.update_contract', rolled_back(lambda ctx: ctx.handler(ContractHandler, 'gestion')
+     .update_contract(ctx.contract_id, {'amount_due': 0.0}))),
+    ('EventHandler.get_all_events page', lambda ctx: ctx.handler(EventHandler, 'support')
+     .get_all_events(after_id=ctx.middle_id, limit=PAGE_SIZE)),
+    ('EventHandler.stream_events', lambda ctx: ctx.handler(EventHandler, 'support').stream_events()),
+    ('EventHandler.filter_events_without_support', lambda ctx: ctx.handler(EventHandler, 'gestion')
+     .filter_events_without_support()),
+    ('EventHandler.filter_my_events', lambda ctx: ctx.handler(EventHandler, 'support').filter_my_events()),
+    ('EventHandler.create_event', rolled_back(lambda ctx: ctx.handler(EventHandler, 'commercial')
+     .create_event(event_data(ctx)))),
+    ('EventHandler.add_support_contact', rolled_back(lambda ctx: ctx.handler(EventHandler, 'gestion')
+     .add_support_contact(ctx.unassigned_event_id, ctx.ids['support']))),
+    ('EventHandler.update_event', rolled_back(lambda ctx: ctx.handler(EventHandler, 'support')
+     .update_event(ctx.event_id, {'attendees': 75}))),
+    ('CollaboratorHandler.get_all_collaborators', lambda ctx: ctx.handler(CollaboratorHandler, 'gestion')
+     .get_all_collaborators()),
+    ('CollaboratorHandler.create_collaborator', rolled_back(lambda ctx: ctx.handler(CollaboratorHandler, 'gestion')
+     .create_collaborator({'name': 'Bench', 'email': 'bench@epicevents.com', 'department': 'support',
+                           'password': PASSWORD}))),
+    ('Collaborator.authenticate', lambda ctx: Collaborator().authenticate(ctx.session, 'collaborator1@epicevents.com',
+                                                                          PASSWORD)),
+    # Views
+    ('show_clients', render(views.cli_views.show_clients, 'commercial')),
+    ('show_contracts', render(views.con_views.show_contracts, 'gestion')),
+    ('show_events', render(views.event_views.show_events, 'support')),
+    ('show_collaborators', render(views.col_views.show_collaborators, 'gestion')),
+    ('filter_contracts', render(views.con_views.filter_contracts, 'commercial')),
+    ('filter_events_ws', render(views.event_views.filter_events_ws, 'gestion')),
+    ('filter_my_events', render(views.event_views.filter_my_events, 'support')),
+]
+
+
+def run_case(Session, fixtures, case, repeat, memory=True):
+    """
+    Times a case.
+
+    Returns:
+        dict: Latency percentiles in seconds, calls and rows per second and
+              the peak traced memory in KiB.
+    """
+    latencies = []
+    rows = 0
+    for _ in range(repeat):
+        with Session() as session:
+            start = time.perf_counter()
+            rows += count(case(Context(session, fixtures)))
+            latencies.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        with Session() as session:
+            tracemalloc.start()
+            count(case(Context(session, fixtures)))
+            peak = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        'p50': statistics.median(latencies),
+        'p95': sorted(latencies)[max(0, round(0.95 * len(latencies)) - 1)],
+        'mean': total / len(latencies),
+        'calls_per_s': len(latencies) / total if total else 0.0,
+        'rows_per_s': rows / total if total else 0.0,
+        'rows': rows // len(latencies),
+        'peak_kib': peak
+    }
+
+
+def run_suite(scales, repeat=5, memory=True, selected=None, data_dir=DATA_DIR, echo=click.echo):
+    """
+    Runs every case, or the selected ones, on each scale.
+
+    Returns:
+        dict: The results by scale then by case, see run_case.
+    """
+    results = {}
+    for scale in scales:
+        rows = scale_rows(scale)
+        echo(f"Dataset of {rows} clients...")
+        engine = open_engine(ensure_dataset(data_dir, rows))
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            fixtures = load_fixtures(session, rows)
+
+        results[scale] = {}
+        for name, case in CASES:
+            if selected and not any(pattern in name for pattern in selected):
+                continue
+            result = results[scale][name] = run_case(Session, fixtures, case, repeat, memory)
+            echo(format_result(scale, name, result))
+        engine.dispose()
+    return results
+
+
+def format_result(scale, name, result):
+    peak = f"{result['peak_kib']:>10.0f}" if result['peak_kib'] is not None else f"{'-':>10}"
+    return (f"{scale:>5}  {name:<46} {result['p50'] * 1000:>10.2f} {result['p95'] * 1000:>10.2f} "
+            f"{result['calls_per_s']:>9.1f} {result['rows_per_s']:>11.0f} {peak}")
+
+
+def compare(results, baseline, threshold):
+    """
+    Lists the cases whose median latency grew by more than threshold.
+
+    Returns:
+        list: (scale, case, baseline p50, new p50) for each regression.
+    """
+    regressions = []
+    for scale, cases in results.items():
+        for name, result in cases.items():
+            before = baseline.get('results', {}).get(scale, {}).get(name)
+            if before and result['p50'] > before['p50'] * (1 + threshold):
+                regressions.append((scale, name, before['p50'], result['p50']))
+    return regressions
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f'{name}.json')
+
+
+@click.command()
+@click.option('--scale', 'scales', multiple=True, default=['10k'], show_default=True,
+              help="10k, 100k, 1m or a number of clients, can be repeated.")
+@click.option('--repeat', default=5, show_default=True, help="Timed runs per case.")
+@click.option('--case', 'selected', multiple=True, help="Only the cases whose name contains this text.")
+@click.option('--no-memory', is_flag=True, help="Skip the tracemalloc run of each case.")
+@click.option('--save', help="Save the results as this baseline.")
+@click.option('--compare', 'compare_with', help="Compare the results with this baseline.")
+@click.option('--threshold', default=0.2, show_default=True, help="Tolerated median slowdown, 0.2 for 20%.")
+def main(scales, repeat, selected, no_memory, save, compare_with, threshold):
+    click.echo(f"{'scale':>5}  {'case':<46} {'p50 ms':>10} {'p95 ms':>10} {'calls/s':>9} {'rows/s':>11} {'peak KiB':>10}")
+    results = run_suite(scales, repeat, not no_memory, selected)
+
+    if save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path(save), 'w', encoding='utf-8') as f:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(),
+                       'date': datetime.now().isoformat(timespec='seconds'), 'repeat': repeat,
+                       'results': results}, f, indent=2, sort_keys=True)
+        click.echo(f"Baseline saved to {baseline_path(save)}")
+
+    if compare_with:
+        with open(baseline_path(compare_with), encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), threshold)
+        for scale, name, before, after in regressions:
+            click.echo(f"Regression {scale} {name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        click.echo(f"No regression over {threshold:.0%} against {compare_with}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Measures the wall time of CLI invocations in fresh interpreters and fails
+when the median goes over the budget.
+
+Usage: python -m benchmarks.bench_startup [--runs 10] [--budget 0.3] [-- ARGS]
+"""
+import click
+import statistics
+import subprocess
+import sys
+import time
+
+
+def measure(args, runs):
+    """
+    Runs python epicEvents.py ARGS runs times.
+
+    Returns:
+        list: The wall time of each run, in seconds.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, 'epicEvents.py', *args], stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+@click.command(context_settings={'ignore_unknown_options': True})
+@click.option('--runs', default=10, show_default=True)
+@click.option('--budget', default=0.3, show_default=True, help="Maximum median startup time, in seconds.")
+@click.argument('args', nargs=-1, type=click.UNPROCESSED)
+def main(runs, budget, args):
+    args = list(args) or ['--help']
+    timings = measure(args, runs)
+    median = statistics.median(timings)
+    click.echo(f"epicEvents.py {' '.join(args)}: median {median * 1000:.0f} ms, "
+               f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms over {runs} runs")
+    if median > budget:
+        click.echo(f"Over the {budget * 1000:.0f} ms budget.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Synthetic datasets for the benchmarks: collaborators, clients, contracts and
+events in a standalone SQLite file, reused across runs.
+"""
+from sqlalchemy import create_engine, event
+from models import Base
+from config.database import apply_profile, enable_savepoints
+from controllers.seed import seed as seed_rows, DEPARTMENTS
+import os
+
+
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000
+}
+
+PASSWORD = 'password'
+
+
+def scale_rows(scale):
+    """
+    Converts a scale name of SCALES, or a plain number, to a number of clients.
+    """
+    return SCALES[scale] if scale in SCALES else int(scale)
+
+
+def collaborator_count(rows):
+    """
+    One collaborator per thousand clients, at least two per department.
+    """
+    return max(len(DEPARTMENTS) * 2, rows // 1000)
+
+
+def open_engine(path):
+    """
+    Creates an engine on a dataset file, with the read-heavy profile and the
+    savepoint setup of the application engine.
+    """
+    engine = create_engine(f'sqlite:///{path}')
+    event.listen(engine, 'connect', lambda dbapi_connection, record: apply_profile(dbapi_connection, 'read-heavy'))
+    enable_savepoints(engine)
+    return engine
+
+
+def build_dataset(path, rows, seed=0):
+    """
+    Writes a dataset with one contract per client and one event per signed
+    contract, generated by controllers.seed.
+
+    Every collaborator has PASSWORD as password, a quarter of the events have
+    no support contact and about a third of the contracts are not signed.
+
+    Args:
+        path (str): The SQLite file to create, replaced if it exists.
+        rows (int): The number of clients.
+        seed (int): The seed of the random amounts and flags.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    engine = open_engine(path)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        seed_rows(connection, collaborators=collaborator_count(rows), clients=rows, contracts_per_client=1,
+                  events_per_contract=1, distribution='fixed', signed_ratio=0.67, unassigned_ratio=0.25,
+                  password=PASSWORD, random_seed=seed)
+    engine.dispose()
+
+
+def dataset_path(directory, rows):
+    """
+    The file of the dataset with the given number of clients.
+    """
+    return os.path.join(directory, f'dataset_{rows}.db')
+
+
+def ensure_dataset(directory, rows, rebuild=False):
+    """
+    Returns the path of a dataset, building it when missing or asked to.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = dataset_path(directory, rows)
+    if rebuild or not os.path.exists(path):
+        build_dataset(path, rows)
+    return path
@@ -0,0 +1,91 @@
+from functools import wraps
+import atexit
+import click
+
+
+SENTRY_DSN = "https://6d33421778aa9658ef2b700b7467561c@o4507471152349184.ingest.de.sentry.io/4507471164473424"
+
+_runtime = {'ready': False, 'profiler': None}
+
+
+def bootstrap(profile=None, sql_profile=False):
+    """
+    Starts what a command needs to run: telemetry, the engine profile, the
+    database schema and the audit log writer. Done once per process, by the
+    first command that runs.
+
+    The metrics recorded by the command are added to the metrics file when
+    the process exits, see epicEvents stats.
+
+    Args:
+        profile (str): The engine profile, the configured default when None.
+        sql_profile (bool): Whether to profile the SQL statements, see sql_profiler.
+    """
+    import sentry_sdk
+    from config.database import engine, audit_engine, init_db, use_profile
+    from controllers.audit import audit_log
+    from metrics import metrics, METRICS_FILE
+
+    if _runtime['ready']:
+        return
+    sentry_sdk.init(
+        dsn=SENTRY_DSN,
+        # Set traces_sample_rate to 1.0 to capture 100%
+        # of transactions for performance monitoring.
+        traces_sample_rate=1.0,
+        # Set profiles_sample_rate to 1.0 to profile 100%
+        # of sampled transactions.
+        # We recommend adjusting this value in production.
+        profiles_sample_rate=1.0,
+    )
+    if profile:
+        use_profile(profile)
+    init_db()
+    audit_log.start(audit_engine)
+    atexit.register(audit_log.stop)
+    atexit.register(metrics.flush, METRICS_FILE)
+    if sql_profile:
+        from config.profiler import SqlProfiler
+        # The profile summary replaces the statement log.
+        engine.echo = False
+        _runtime['profiler'] = SqlProfiler(engine).start()
+    _runtime['ready'] = True
+
+
+def sql_profiler():
+    """
+    Returns the SQL profiler started by --sql-profile, None without it.
+    """
+    return _runtime['profiler']
+
+
+def print_sql_profile(title):
+    """
+    Prints the statements profiled since the last summary, then starts over.
+
+    Args:
+        title (str): The profiled command.
+    """
+    profiler = sql_profiler()
+    if profiler is None:
+        return
+    from views import show_sql_profile
+    show_sql_profile(profiler.report(), title)
+    profiler.reset()
+
+
+def runtime_command(function):
+    """
+    Decorator bootstrapping the application before a command callback runs,
+    with the --db-profile and --sql-profile given to the cli group.
+    """
+    @wraps(function)
+    @click.pass_context
+    def wrapper(ctx, *args, **kwargs):
+        options = ctx.find_root().params
+        bootstrap(options.get('db_profile'), options.get('sql_profile', False))
+        try:
+            return function(*args, **kwargs)
+        finally:
+            print_sql_profile(ctx.info_name)
+    return wrapper
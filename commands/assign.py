@@ -0,0 +1,31 @@
+import click
+from commands import runtime_command
+from commands.filter import DATE, read_token, flag_terms
+from views.output import OUTPUT_MODES
+
+
+@click.command(name='auto-assign', short_help="Command to assign the events without support contact.")
+@click.option('--starts-after', type=DATE, help="Only events starting on or after this date.")
+@click.option('--starts-before', type=DATE, help="Only events starting before this date.")
+@click.option('--where', multiple=True, metavar='EXPR',
+              help="Extra condition on the events such as client_id=3, can be repeated.")
+@click.option('--dry-run', is_flag=True, help="Only show the planned assignments.")
+@click.option('--limit', default=1000, show_default=True, help="Maximum number of listed assignments.")
+@click.option('--output', type=click.Choice(OUTPUT_MODES), default='auto', show_default=True)
+@runtime_command
+def auto_assign_command(starts_after, starts_before, where, dry_run, limit, output):
+    """
+    Command to assign the events without support contact, balancing the support loads.
+
+    Every event goes to the support contact with the fewest events who is
+    free during it, events overlapping every calendar stay unassigned.
+    """
+    from views import auto_assign_support
+    token = read_token()
+    if token is None:
+        return
+    terms = flag_terms([
+        ('start_date', '>=', starts_after),
+        ('start_date', '<', starts_before),
+    ], where)
+    auto_assign_support(token, terms, dry_run, limit, output)
@@ -0,0 +1,21 @@
+import click
+from commands import runtime_command
+from views import login as login_view, register as register_view
+
+
+@click.command(name='login', short_help="Command to initiate user login.")
+@runtime_command
+def login_command():
+    """
+    Command to initiate user login.
+    """
+    login_view()
+
+
+@click.command(name='register', short_help="Command to register a new user.")
+@runtime_command
+def register_command():
+    """
+    Command to register a new user.
+    """
+    register_view()
@@ -0,0 +1,99 @@
+import click
+from commands import runtime_command
+from commands.filter import read_token
+
+
+class IdList(click.ParamType):
+    """
+    Click type reading ids as a comma separated list of ids and inclusive
+    ranges, e.g. 1,4,10-20.
+    """
+    name = 'ids'
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, list):
+            return value
+        ids = []
+        for part in filter(None, (part.strip() for part in value.split(','))):
+            first, _, last = part.partition('-')
+            try:
+                first, last = int(first), int(last or first)
+            except ValueError:
+                self.fail(f"{part!r} is neither an id nor a range such as 10-20.", param, ctx)
+            if last < first:
+                self.fail(f"{part!r} is an empty range.", param, ctx)
+            ids.extend(range(first, last + 1))
+        return ids
+
+
+IDS = IdList()
+
+
+def collect_ids(values):
+    """
+    Joins the id lists given as arguments.
+    """
+    return [id_ for ids in values for id_ in ids]
+
+
+@click.group(name='batch', short_help="Command to update many events or contracts at once.")
+def batch_command():
+    """
+    Command to update many events or contracts at once, with one statement.
+    """
+
+
+@batch_command.command(name='assign-support')
+@click.argument('event_ids', nargs=-1, required=True, type=IDS)
+@click.option('--support', 'support_contact_id', type=int, required=True, help="The support contact to assign.")
+@click.option('--allow-overlap', is_flag=True, help="Assign without asking when some events overlap.")
+@runtime_command
+def assign_support_command(event_ids, support_contact_id, allow_overlap):
+    """
+    Assign a support contact to events, e.g. batch assign-support 12,15 40-60 --support 3.
+    """
+    from views import add_support_contact_batch
+    token = read_token()
+    if token is not None:
+        add_support_contact_batch(token, collect_ids(event_ids), support_contact_id, allow_overlap)
+
+
+@batch_command.command(name='sign')
+@click.argument('contract_ids', nargs=-1, required=True, type=IDS)
+@runtime_command
+def sign_command(contract_ids):
+    """
+    Mark contracts as signed.
+    """
+    from views import update_contracts_batch
+    token = read_token()
+    if token is not None:
+        update_contracts_batch(token, 'sign', collect_ids(contract_ids))
+
+
+@batch_command.command(name='pay')
+@click.argument('contract_ids', nargs=-1, required=True, type=IDS)
+@runtime_command
+def pay_command(contract_ids):
+    """
+    Mark contracts as paid, nothing being due anymore.
+    """
+    from views import update_contracts_batch
+    token = read_token()
+    if token is not None:
+        update_contracts_batch(token, 'pay', collect_ids(contract_ids))
+
+
+@batch_command.command(name='adjust-due')
+@click.argument('contract_ids', nargs=-1, required=True, type=IDS)
+@click.option('--by', 'delta', type=float, required=True,
+              help="Amount added to the amount due, negative for a payment. Kept between 0 and the total.")
+@runtime_command
+def adjust_due_command(contract_ids, delta):
+    """
+    Adjust the amount due of contracts.
+    """
+    from views import update_contracts_batch
+    token = read_token()
+    if token is not None:
+        update_contracts_batch(token, 'adjust-due', collect_ids(contract_ids), delta)
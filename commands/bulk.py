@@ -0,0 +1,46 @@
+import click
+import os
+from commands import runtime_command
+from views import import_data, export_data
+
+
+@click.command(name='import', short_help="Command to bulk import clients, contracts or events.")
+@click.argument('entity', type=click.Choice(['clients', 'contracts', 'events']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help="Input format, guessed from the extension by default.")
+@click.option('--batch-size', default=1000, show_default=True, help="Rows inserted per transaction.")
+@click.option('--workers', default=os.cpu_count(), show_default=True, help="Processes parsing the input.")
+@runtime_command
+def import_command(entity, path, fmt, batch_size, workers):
+    """
+    Command to bulk import clients, contracts or events from a CSV or JSONL file.
+    """
+    try:
+        with open('token.txt', 'r') as f:
+            token = f.read()
+    except FileNotFoundError:
+        click.echo("Please login first.")
+        return
+    import_data(token, entity, path, fmt, batch_size, workers)
+
+
+@click.command(name='export', short_help="Command to export clients, contracts and events.")
+@click.option('--entity', 'entities', multiple=True, type=click.Choice(['clients', 'contracts', 'events']),
+              help="Entity to export, can be repeated. All of them by default.")
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+@click.option('--output-dir', default='.', show_default=True, type=click.Path(file_okay=False))
+@click.option('--with-names', is_flag=True, help="Add commercial, client and support contact names.")
+@click.option('--workers', default=3, show_default=True, help="Tables exported in parallel.")
+@click.option('--chunk-size', default=5000, show_default=True, help="Rows fetched per round trip.")
+@runtime_command
+def export_command(entities, fmt, output_dir, with_names, workers, chunk_size):
+    """
+    Command to export clients, contracts and events to CSV or JSONL files.
+    """
+    try:
+        with open('token.txt', 'r') as f:
+            token = f.read()
+    except FileNotFoundError:
+        click.echo("Please login first.")
+        return
+    export_data(token, list(entities) or ['clients', 'contracts', 'events'], output_dir, fmt, with_names, workers, chunk_size)
@@ -0,0 +1,124 @@
+import click
+from commands import runtime_command
+from models import Contract, Event
+from views.output import OUTPUT_MODES
+
+
+DATE = click.DateTime(formats=['%Y-%m-%d', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M'])
+
+
+def read_token():
+    """
+    Reads the token saved by login, None when logged out.
+    """
+    try:
+        with open('token.txt', 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        click.echo("Please login first.")
+        return None
+
+
+def flag_terms(flags, where):
+    """
+    Turns the option values into filter terms, see compile_filters.
+
+    Args:
+        flags (list): (field, operator, value) triples, those without a value being skipped.
+        where (tuple): Raw expressions given with --where.
+
+    Returns:
+        list: The filter terms.
+    """
+    return [(field, op, value) for field, op, value in flags if value is not None] + list(where)
+
+
+def listing_options(sort_keys):
+    """
+    The --where, --sort, --limit and --output options shared by the filter commands.
+    """
+    def decorator(function):
+        for option in reversed((
+            click.option('--where', multiple=True, metavar='EXPR',
+                         help="Extra condition such as amount_due>0 or support_contact_id=null, can be repeated."),
+            click.option('--sort', 'sort_key', type=click.Choice(sort_keys), default='id', show_default=True),
+            click.option('--limit', type=int, help="Maximum number of rows."),
+            click.option('--output', type=click.Choice(OUTPUT_MODES), default='auto', show_default=True),
+        )):
+            function = option(function)
+        return function
+    return decorator
+
+
+@click.group(name='filter', short_help="Command to list the contracts or events matching filters.")
+def filter_command():
+    """
+    Command to list the contracts or events matching filters, evaluated by the database.
+    """
+
+
+@filter_command.command(name='contracts')
+@click.option('--min-amount', type=float, help="Minimum total amount.")
+@click.option('--max-amount', type=float, help="Maximum total amount.")
+@click.option('--unpaid', is_flag=True, default=None, help="Only contracts with an amount due.")
+@click.option('--signed/--unsigned', default=None, help="Only signed, or not signed, contracts.")
+@click.option('--client', 'client_id', type=int)
+@click.option('--commercial', 'commercial_id', type=int)
+@click.option('--created-after', type=DATE, help="Created on or after this date.")
+@click.option('--created-before', type=DATE, help="Created before this date.")
+@listing_options(Contract.SORT_KEYS)
+@runtime_command
+def filter_contracts_command(min_amount, max_amount, unpaid, signed, client_id, commercial_id, created_after,
+                             created_before, where, sort_key, limit, output):
+    """
+    List the contracts matching every given filter.
+    """
+    from views import find_contracts
+    token = read_token()
+    if token is None:
+        return
+    terms = flag_terms([
+        ('total_amount', '>=', min_amount),
+        ('total_amount', '<=', max_amount),
+        ('amount_due', '>', 0 if unpaid else None),
+        ('status', '=', signed),
+        ('client_id', '=', client_id),
+        ('commercial_id', '=', commercial_id),
+        ('creation_date', '>=', created_after),
+        ('creation_date', '<', created_before),
+    ], where)
+    find_contracts(token, terms, sort_key, limit, output)
+
+
+@filter_command.command(name='events')
+@click.option('--client', 'client_id', type=int)
+@click.option('--contract', 'contract_id', type=int)
+@click.option('--support', 'support_contact_id', type=int, help="Only events of this support contact.")
+@click.option('--unassigned', is_flag=True, default=None, help="Only events without support contact.")
+@click.option('--starts-after', type=DATE, help="Starting on or after this date.")
+@click.option('--starts-before', type=DATE, help="Starting before this date.")
+@click.option('--ends-after', type=DATE, help="Ending on or after this date.")
+@click.option('--ends-before', type=DATE, help="Ending before this date.")
+@listing_options(Event.SORT_KEYS)
+@runtime_command
+def filter_events_command(client_id, contract_id, support_contact_id, unassigned, starts_after, starts_before,
+                          ends_after, ends_before, where, sort_key, limit, output):
+    """
+    List the events matching every given filter.
+    """
+    from views import find_events
+    token = read_token()
+    if token is None:
+        return
+    terms = flag_terms([
+        ('client_id', '=', client_id),
+        ('contract_id', '=', contract_id),
+        ('support_contact_id', '=', support_contact_id),
+        ('start_date', '>=', starts_after),
+        ('start_date', '<', starts_before),
+        ('end_date', '>=', ends_after),
+        ('end_date', '<', ends_before),
+    ], where)
+    if unassigned:
+        terms.append(('support_contact_id', '=', None))
+    find_events(token, terms, sort_key, limit, output)
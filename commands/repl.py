@@ -0,0 +1,147 @@
+import click
+from commands import runtime_command, print_sql_profile
+from views import (show_clients, add_client, update_client,
+                   show_contracts, add_contract,update_contract, filter_contracts,
+                   show_events, add_event, add_support_contact, update_event, filter_events_ws, filter_my_events,
+                   show_collaborators, add_collaborator, update_collaborator, delete_collaborator)
+from views.output import OUTPUT_MODES
+
+
+def parse_options(args):
+    """
+    Parse the "--name value" options typed after a REPL command.
+
+    Args:
+        args (list): The words following the command name.
+
+    Returns:
+        dict: Option values keyed by name, with dashes replaced by underscores.
+              Options given without a value are set to True.
+    """
+    options = {}
+    i = 0
+    while i < len(args):
+        name = args[i]
+        if not name.startswith('--'):
+            raise click.BadParameter(f"Unexpected argument: {name}")
+        key = name[2:].replace('-', '_')
+        if i + 1 < len(args) and not args[i + 1].startswith('--'):
+            options[key] = args[i + 1]
+            i += 2
+        else:
+            options[key] = True
+            i += 1
+    return options
+
+
+def listing_options(options):
+    """
+    Extract the pagination options shared by the view_* commands.
+
+    Args:
+        options (dict): The parsed REPL options.
+
+    Returns:
+        dict: Keyword arguments for the show_* views.
+    """
+    page_size = options.get('page_size')
+    if page_size is not None and not str(page_size).isdigit():
+        raise click.BadParameter("--page-size expects a number of rows.")
+    output = options.get('output', 'auto')
+    if output not in OUTPUT_MODES:
+        raise click.BadParameter(f"--output expects one of: {', '.join(OUTPUT_MODES)}.")
+    return {
+        'page_size': int(page_size) if page_size else None,
+        'sort_key': options.get('sort', 'id'),
+        'output': output
+    }
+
+
+@click.command(short_help="Main command to run the Epic Events application.")
+@runtime_command
+def run():
+    """
+    Main command to run the Epic Events application.
+    """
+    try:
+        with open('token.txt', 'r') as f:
+            token = f.read()
+
+        while True:
+            commands = [
+                "add_client",
+                "update_client",
+                "view_clients",
+                "add_contract",
+                "update_contract",
+                "view_contracts",
+                "add_event",
+                "add_support_contact",
+                "filter_contracts",
+                "update_event",
+                "view_events",
+                "filter_events_ws",
+                "filter_my_events",
+                "add_collaborator",
+                "update_collaborator",
+                "delete_collaborator",
+                "view_collaborators",
+                "exit"
+            ]
+
+            words = click.prompt(
+                f"Enter a command ({', '.join(commands)}) "
+                "[view_* accept --page-size N --sort COLUMN --output auto|table|plain|tsv]", 
+                type=str
+            ).split()
+            if not words:
+                continue
+            command = words[0]
+            try:
+                options = parse_options(words[1:])
+                listing = listing_options(options)
+            except click.BadParameter as e:
+                click.echo(e.message)
+                continue
+           
+            if command == 'exit':
+                break
+            elif command == 'view_clients':
+                show_clients(token, **listing)
+            elif command == 'add_client':
+                add_client(token)
+            elif command == 'update_client':
+                update_client(token)
+            elif command == 'view_contracts':
+                show_contracts(token, **listing)
+            elif command == 'add_contract':
+                add_contract(token)
+            elif command == 'update_contract':
+                update_contract(token)
+            elif command == 'filter_contracts':
+                filter_contracts(token)
+            elif command == 'view_events':
+                show_events(token, **listing)
+            elif command == 'add_event':
+                add_event(token)
+            elif command == 'add_support_contact':
+                add_support_contact(token)
+            elif command == 'update_event':
+                update_event(token)
+            elif command == 'filter_events_ws':
+                filter_events_ws(token)
+            elif command == 'filter_my_events':
+                filter_my_events(token)
+            elif command == 'view_collaborators':
+                show_collaborators(token, **listing)
+            elif command == 'add_collaborator':
+                add_collaborator(token)
+            elif command == 'update_collaborator':
+                update_collaborator(token)
+            elif command == 'delete_collaborator':
+                delete_collaborator(token)
+            else:
+                click.echo("Unknown command.")
+            print_sql_profile(command)
+    except FileNotFoundError:
+        click.echo("Please login first.")
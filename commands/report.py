@@ -0,0 +1,72 @@
+import click
+from commands import runtime_command
+from commands.filter import read_token
+from models.audit import AUDITED_TABLES
+from views.output import OUTPUT_MODES
+
+
+@click.group(name='report', short_help="Command to show the management reports.")
+def report_command():
+    """
+    Command to show the management reports.
+    """
+
+
+@report_command.command(name='revenue')
+@click.option('--by', type=click.Choice(['commercial', 'client']), default='commercial', show_default=True)
+@click.option('--commercial', 'commercial_id', type=int, help="With --by client, only the clients of this commercial.")
+@click.option('--limit', type=int, help="With --by client, maximum number of clients.")
+@click.option('--output', type=click.Choice(OUTPUT_MODES), default='auto', show_default=True)
+@runtime_command
+def revenue_command(by, commercial_id, limit, output):
+    """
+    Show the contract counts, signed totals and outstanding amounts.
+    """
+    from views import show_revenue
+    token = read_token()
+    if token is not None:
+        show_revenue(token, by, commercial_id, limit, output)
+
+
+@report_command.command(name='rebuild-revenue')
+@click.option('--check', 'check_only', is_flag=True, help="Only compare the summaries with the contracts.")
+@runtime_command
+def rebuild_revenue_command(check_only):
+    """
+    Recompute the revenue summaries from the contracts.
+    """
+    from views import rebuild_revenue
+    token = read_token()
+    if token is not None:
+        rebuild_revenue(token, check_only)
+
+
+@report_command.command(name='conflicts')
+@click.option('--limit', default=1000, show_default=True, help="Maximum number of listed pairs, all of them are counted.")
+@click.option('--output', type=click.Choice(OUTPUT_MODES), default='auto', show_default=True)
+@runtime_command
+def conflicts_command(limit, output):
+    """
+    List the overlapping events of every support contact.
+    """
+    from views import show_scheduling_conflicts
+    token = read_token()
+    if token is not None:
+        show_scheduling_conflicts(token, limit, output)
+
+
+@report_command.command(name='audit')
+@click.option('--table', 'table_name', type=click.Choice(AUDITED_TABLES),
+              help="Only the changes of this table.")
+@click.option('--id', 'row_id', type=int, help="With --table, only the changes of this row.")
+@click.option('--limit', default=50, show_default=True, help="Maximum number of changes.")
+@click.option('--output', type=click.Choice(OUTPUT_MODES), default='auto', show_default=True)
+@runtime_command
+def audit_command(table_name, row_id, limit, output):
+    """
+    Show who changed which client, contract, event or collaborator, the latest first.
+    """
+    from views import show_audit_trail
+    token = read_token()
+    if token is not None:
+        show_audit_trail(token, table_name, row_id, limit, output)
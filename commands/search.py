@@ -0,0 +1,27 @@
+import click
+from commands import runtime_command
+from models.search import SEARCH_KINDS
+from views.output import OUTPUT_MODES
+
+
+@click.command(name='search', short_help="Command to find clients, events and collaborators.")
+@click.argument('words', nargs=-1, required=True)
+@click.option('--kind', 'kinds', multiple=True, type=click.Choice(SEARCH_KINDS),
+              help="Kind of result, can be repeated. All of them by default.")
+@click.option('--limit', default=20, show_default=True, help="Maximum number of results.")
+@click.option('--output', type=click.Choice(OUTPUT_MODES), default='auto', show_default=True)
+@runtime_command
+def search_command(words, kinds, limit, output):
+    """
+    Command to find clients, events and collaborators by name, email, company, location or notes.
+
+    Every word is matched as a prefix, e.g. "dup par" finds Dupont in Paris.
+    """
+    from views import search
+    try:
+        with open('token.txt', 'r') as f:
+            token = f.read()
+    except FileNotFoundError:
+        click.echo("Please login first.")
+        return
+    search(token, ' '.join(words), list(kinds) or None, limit, output)
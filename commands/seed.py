@@ -0,0 +1,83 @@
+import click
+import os
+import time
+from click.core import ParameterSource
+from commands import runtime_command
+from commands.filter import read_token
+from controllers.seed import DISTRIBUTIONS, SEED_BATCH_SIZE
+
+
+def profile_is_explicit():
+    """
+    Tells whether the engine profile was chosen with --db-profile or EPICEVENTS_DB_PROFILE.
+    """
+    source = click.get_current_context().find_root().get_parameter_source('db_profile')
+    return source == ParameterSource.COMMANDLINE or 'EPICEVENTS_DB_PROFILE' in os.environ
+
+
+@click.command(name='seed', short_help="Command to fill the database with generated data.")
+@click.option('--collaborators', default=30, show_default=True, help="Collaborators, spread over the departments.")
+@click.option('--clients', default=1000, show_default=True)
+@click.option('--contracts-per-client', default=1.5, show_default=True, help="Average contracts per client.")
+@click.option('--events-per-contract', default=1.0, show_default=True, help="Average events per signed contract.")
+@click.option('--distribution', type=click.Choice(DISTRIBUTIONS), default='poisson', show_default=True,
+              help="How the contracts and events counts are drawn around their average.")
+@click.option('--skew', default=0.0, show_default=True,
+              help="Favour the first commercials and support contacts, 1 is a Zipf law.")
+@click.option('--signed-ratio', default=0.7, show_default=True)
+@click.option('--paid-ratio', default=0.4, show_default=True, help="Share of fully paid signed contracts.")
+@click.option('--unassigned-ratio', default=0.25, show_default=True, help="Share of events without support contact.")
+@click.option('--password', default='password', show_default=True, help="Password of every generated collaborator.")
+@click.option('--seed', 'random_seed', default=0, show_default=True, help="Seed of the random generator.")
+@click.option('--batch-size', default=SEED_BATCH_SIZE, show_default=True, help="Rows per INSERT.")
+@click.option('--initial', is_flag=True,
+              help="Seed a database without any collaborator, where nobody can log in yet, without logging in.")
+@runtime_command
+def seed_command(random_seed, initial, **options):
+    """
+    Command to fill the database with generated, consistent collaborators, clients, contracts and events.
+
+    Restricted to the gestion department, except for the first seed of an
+    empty database with --initial.
+    """
+    from rich.console import Console
+    from sqlalchemy import select
+    from config.database import engine, use_profile, SessionLocal
+    from controllers import CollaboratorHandler
+    from models import Collaborator
+    from controllers.seed import seed
+
+    console = Console()
+    try:
+        with SessionLocal() as session:
+            if initial:
+                if session.scalar(select(Collaborator.id).limit(1)) is not None:
+                    raise Exception("--initial only seeds a database without collaborators, "
+                                    "log in as a gestion collaborator instead.")
+            else:
+                token = read_token()
+                if token is None:
+                    return
+                CollaboratorHandler(session, token).check_permission('gestion')
+    except Exception as e:
+        console.print(f"[red]{e}[/red]")
+        return
+
+    # The whole load is one transaction, written with the bulk-load pragmas
+    # unless another profile was asked for.
+    if not profile_is_explicit():
+        use_profile('bulk-load')
+    echo, engine.echo = engine.echo, False
+    start = time.perf_counter()
+    try:
+        with engine.begin() as connection:
+            counts = seed(connection, random_seed=random_seed, **options)
+    except Exception as e:
+        console.print(f"[red]{e}[/red]")
+        return
+    finally:
+        engine.echo = echo
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    console.print(', '.join(f"{count} {table}" for table, count in counts.items()))
+    console.print(f"[green]{total} rows inserted in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s).[/green]")
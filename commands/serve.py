@@ -0,0 +1,16 @@
+import click
+from commands import runtime_command
+from api import serve
+
+
+@click.command(name='serve', short_help="Command to serve the handlers as a JSON API.")
+@click.option('--host', default='127.0.0.1', show_default=True, help="Interface to listen on.")
+@click.option('--port', default=8000, show_default=True, help="Port to listen on.")
+@click.option('--workers', default=8, show_default=True, help="Connections served at once.")
+@runtime_command
+def serve_command(host, port, workers):
+    """
+    Command to serve the handlers as a JSON API, authenticated with bearer tokens.
+    """
+    click.echo(f"Serving the Epic Events API on http://{host}:{port} with {workers} workers")
+    serve(host, port, workers)
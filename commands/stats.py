@@ -0,0 +1,51 @@
+import click
+import os
+from rich.console import Console
+from rich.table import Table
+from metrics import MetricsRegistry, METRICS_FILE, locked_metrics_file
+
+
+def metrics_table(registry, title):
+    """
+    Builds a table with one line per operation, slowest p95 first.
+    """
+    table = Table(title=title)
+    for column in ('Kind', 'Operation', 'Calls', 'Errors', 'Rows', 'p50 ms', 'p95 ms', 'p99 ms', 'Max ms'):
+        table.add_column(column, justify='left' if column in ('Kind', 'Operation') else 'right')
+    for row in registry.summary():
+        table.add_row(row['kind'], row['operation'], str(row['calls']), str(row['errors']), str(row['rows']),
+                      *(f"{row[key] * 1000:.2f}" for key in ('p50', 'p95', 'p99', 'max')))
+    return table
+
+
+@click.command(name='stats', short_help="Command to show the call metrics of the handlers and views.")
+@click.option('--file', 'path', default=METRICS_FILE, show_default=True, help="Metrics file written by the commands.")
+@click.option('--format', 'fmt', type=click.Choice(['table', 'json', 'prometheus']), default='table', show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), help="Write to this file instead of the terminal.")
+@click.option('--reset', is_flag=True, help="Delete the metrics file after reading it.")
+def stats_command(path, fmt, output, reset):
+    """
+    Command to show the call counts, rows and latency percentiles of the handlers and views.
+    """
+    if reset:
+        # Read and deleted under the flush lock, so no run lands in between and is lost.
+        with locked_metrics_file(path):
+            registry = MetricsRegistry.load(path)
+            if os.path.exists(path):
+                os.remove(path)
+    else:
+        registry = MetricsRegistry.load(path)
+    if fmt == 'table':
+        table = metrics_table(registry, f"Metrics from {path}")
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                Console(file=f).print(table)
+        else:
+            Console().print(table)
+    else:
+        text = registry.to_json() if fmt == 'json' else registry.to_prometheus()
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            click.echo(text, nl=False)
@@ -1,15 +1,140 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from models import Base
+from config.migrations import migrate, current_version, SCHEMA_VERSION
+from config.profiles import ENGINE_PROFILES, DEFAULT_PROFILE
 
 DATABASE_URL = "sqlite:///file.db"
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///file.db"
+AUDIT_DATABASE_URL = "sqlite:///audit.db"
 
 engine = create_engine(DATABASE_URL, echo=True)
 
+# The audit log is a separate file, written by a background thread, see
+# controllers.audit, so that it never holds the lock of the main database.
+audit_engine = create_engine(AUDIT_DATABASE_URL)
+engine_settings = {'profile': DEFAULT_PROFILE}
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+_async_sessionmakers = {}
+
+
+def apply_profile(dbapi_connection, profile):
+    """
+    Applies the pragmas of an engine profile to a raw SQLite connection.
+
+    Args:
+        dbapi_connection: The sqlite3 connection.
+        profile (str): The name of the profile, a key of ENGINE_PROFILES.
+    """
+    cursor = dbapi_connection.cursor()
+    for pragma, value in ENGINE_PROFILES[profile].items():
+        cursor.execute(f"PRAGMA {pragma} = {value}")
+    cursor.close()
+
+
+@event.listens_for(engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    apply_profile(dbapi_connection, engine_settings['profile'])
+
+
+@event.listens_for(audit_engine, 'connect')
+def _on_audit_connect(dbapi_connection, connection_record):
+    # WAL with synchronous NORMAL, whatever the profile of the main database.
+    apply_profile(dbapi_connection, 'interactive')
+
+
+def enable_savepoints(engine):
+    """
+    Lets SQLAlchemy emit BEGIN itself on a SQLite engine.
+
+    The sqlite3 driver only opens a transaction before the first INSERT or
+    UPDATE, so a SAVEPOINT issued first would become the whole transaction and
+    its RELEASE would commit it. Transaction scopes nest savepoints, hence
+    this setup, as recommended by the SQLAlchemy SQLite dialect notes.
+
+    Args:
+        engine: The SQLite engine.
+    """
+    @event.listens_for(engine, 'connect')
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _begin(connection):
+        connection.exec_driver_sql('BEGIN')
+
+
+enable_savepoints(engine)
+
+
+def use_profile(profile):
+    """
+    Switches the engine to another profile.
+
+    Pooled connections are discarded so that every new connection, including
+    those of already created sessions, gets the pragmas of the new profile.
+
+    Args:
+        profile (str): The name of the profile, a key of ENGINE_PROFILES.
+
+    Raises:
+        Exception: If the profile does not exist.
+    """
+    if profile not in ENGINE_PROFILES:
+        raise Exception(f"Unknown engine profile: {profile}")
+    engine_settings['profile'] = profile
+    engine.dispose()
+
+
+def get_async_sessionmaker(url=ASYNC_DATABASE_URL):
+    """
+    Returns the factory of asynchronous sessions, used by the async handlers.
+
+    The async engine is created on first use, so that aiosqlite is only
+    imported by the code paths that need it. It gets the same profile pragmas
+    and savepoint setup as the synchronous engine.
+
+    Args:
+        url (str): The aiosqlite database URL.
+
+    Returns:
+        async_sessionmaker: The session factory bound to the async engine.
+    """
+    if url not in _async_sessionmakers:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        async_engine = create_async_engine(url)
+        event.listen(async_engine.sync_engine, 'connect',
+                     lambda dbapi_connection, connection_record: apply_profile(dbapi_connection, engine_settings['profile']))
+        enable_savepoints(async_engine.sync_engine)
+        _async_sessionmakers[url] = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_sessionmakers[url]
+
+
 def init_db():
     """
-    Initializes the database by creating all tables.
+    Initializes the database by creating all tables, then brings existing
+    databases up to date with the migrations.
+
+    When the stored schema version is already the current one, the schema
+    is known to be complete and the table reflection of create_all is
+    skipped, startup then costs a single PRAGMA.
+
+    Returns:
+        bool: True if the schema had to be created or migrated.
     """
+    with engine.connect() as connection:
+        if current_version(connection) == SCHEMA_VERSION:
+            return False
+        fresh = not connection.exec_driver_sql("SELECT count(*) FROM sqlite_master WHERE type = 'table'").scalar()
+
     Base.metadata.create_all(bind=engine)
+    if fresh:
+        # create_all built the current schema, there is nothing to migrate.
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    else:
+        migrate(engine)
+    return True
@@ -0,0 +1,184 @@
+import logging
+from sqlalchemy import text, update, delete
+from models import (Base, create_search_index, rebuild_search_index, REVENUE_TABLES, create_revenue_triggers,
+                    rebuild_revenue)
+
+logger = logging.getLogger(__name__)
+
+
+def current_version(connection):
+    """
+    Reads the schema version stored in the SQLite user_version pragma.
+
+    Args:
+        connection: The database connection.
+
+    Returns:
+        int: The version of the last applied migration, 0 for none.
+    """
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def create_missing_indexes(connection):
+    """
+    Creates the indexes declared on the models that do not exist yet.
+
+    Existing indexes are read from sqlite_master, the SQLAlchemy inspector
+    does not report expression indexes such as lower(email).
+
+    Args:
+        connection: The database connection.
+    """
+    existing = set(connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+
+
+def merge_duplicate_collaborators(connection):
+    """
+    Merges the collaborators sharing an email, case-insensitively, into the
+    first one created: the clients, contracts and events of the others are
+    repointed to it, then the others are deleted. The revenue summaries are
+    left out, they are rebuilt from the contracts by migration 4.
+
+    Collaborators of different departments are never merged: the migration
+    stops and lists them, they have to be resolved by hand.
+
+    Args:
+        connection: The database connection.
+
+    Returns:
+        dict: The kept collaborator id of every deleted one.
+
+    Raises:
+        Exception: If collaborators sharing an email belong to different departments.
+    """
+    conflicts = connection.execute(text(
+        "SELECT lower(email), group_concat(id || ' ' || department, ', ') FROM "
+        "(SELECT id, email, department FROM collaborators ORDER BY id) "
+        "GROUP BY lower(email) HAVING count(DISTINCT department) > 1 ORDER BY lower(email)"
+    )).all()
+    if conflicts:
+        report = '; '.join(f"{email} ({members})" for email, members in conflicts)
+        raise Exception(f"Collaborators sharing an email belong to different departments, "
+                        f"resolve them before migrating: {report}")
+
+    merged = dict(connection.execute(text(
+        "SELECT id, kept FROM (SELECT id, min(id) OVER (PARTITION BY lower(email)) AS kept FROM collaborators) "
+        "WHERE id != kept"
+    )).all())
+    if not merged:
+        return merged
+
+    existing = set(connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'").scalars())
+    derived = {table.name for table in REVENUE_TABLES}
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing or table.name in derived:
+            continue
+        for foreign_key in table.foreign_keys:
+            if foreign_key.column.table.name != 'collaborators':
+                continue
+            column = foreign_key.parent
+            for duplicate, kept in merged.items():
+                connection.execute(update(table).where(column == duplicate).values({column.name: kept}))
+    connection.execute(delete(Base.metadata.tables['collaborators'])
+                       .where(Base.metadata.tables['collaborators'].c.id.in_(list(merged))))
+    return merged
+
+
+def add_lookup_indexes(connection):
+    """
+    Migration 1: indexes for the login lookup, the listing filters and every
+    foreign key. Collaborators whose emails only differ by case would
+    prevent creating the unique email index, they are merged first.
+    """
+    merged = merge_duplicate_collaborators(connection)
+    for duplicate, kept in sorted(merged.items()):
+        logger.warning("Merged collaborator %s into collaborator %s, their emails only differed by case.",
+                       duplicate, kept)
+    create_missing_indexes(connection)
+
+
+def add_search_index(connection):
+    """
+    Migration 2: the full-text index of clients, events and collaborators,
+    its sync triggers, and its initial content.
+    """
+    create_search_index(connection)
+    rebuild_search_index(connection)
+
+
+def add_filter_indexes(connection):
+    """
+    Migration 3: indexes for the date ranges and sorts of the contract and
+    event filters.
+    """
+    create_missing_indexes(connection)
+
+
+def add_revenue_summaries(connection):
+    """
+    Migration 4: the revenue summaries per commercial and per client, their
+    triggers, and their initial content.
+    """
+    Base.metadata.create_all(connection, tables=REVENUE_TABLES)
+    create_revenue_triggers(connection)
+    rebuild_revenue(connection)
+
+
+def add_schedule_index(connection):
+    """
+    Migration 5: the (support contact, start, end) index of the overlap checks.
+    """
+    create_missing_indexes(connection)
+
+
+VERSIONED_TABLES = ('clients', 'contracts', 'events')
+
+
+def add_version_columns(connection):
+    """
+    Migration 6: the version column of the optimistic concurrency checks,
+    every existing row starting at version 1.
+    """
+    for table in VERSIONED_TABLES:
+        columns = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if 'version' not in columns:
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+MIGRATIONS = [
+    add_lookup_indexes,
+    add_search_index,
+    add_filter_indexes,
+    add_revenue_summaries,
+    add_schedule_index,
+    add_version_columns,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(engine):
+    """
+    Applies the migrations newer than the stored schema version.
+
+    Migrations are idempotent and the version is bumped right after each of
+    them, so an interrupted upgrade resumes at the failed step.
+
+    Args:
+        engine: The database engine.
+
+    Returns:
+        int: The schema version after migrating.
+    """
+    with engine.connect() as connection:
+        version = current_version(connection)
+
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with engine.begin() as connection:
+            migration(connection)
+            connection.exec_driver_sql(f"PRAGMA user_version = {number}")
+    return max(version, SCHEMA_VERSION)
@@ -0,0 +1,137 @@
+from sqlalchemy import event
+import heapq
+import itertools
+import threading
+import time
+
+
+SLOWEST_STATEMENTS = 3
+
+EXPLAINED_PREFIXES = ('select', 'with')
+
+IGNORED_PREFIXES = ('begin', 'commit', 'rollback', 'savepoint', 'release', 'pragma', 'explain')
+
+
+class SqlProfiler:
+    """
+    Records the statements run by an engine: count, total and per-statement
+    time, repeated statements and the query plans of the slowest ones.
+
+    A statement repeated with different parameters inside one command is
+    the mark of an N+1 loop, one repeated with the same parameters is a
+    redundant query; both are reported as duplicates.
+    """
+    def __init__(self, engine, slowest=SLOWEST_STATEMENTS):
+        """
+        Initializes a stopped profiler.
+
+        Args:
+            engine: The SQLAlchemy engine to profile.
+            slowest (int): The number of slowest statements whose plan is captured.
+        """
+        self.engine = engine
+        self.slowest = slowest
+        self._lock = threading.Lock()
+        self._explaining = threading.local()
+        self._sequence = itertools.count()
+        self.reset()
+
+    def start(self):
+        """
+        Starts listening to the engine.
+
+        Returns:
+            SqlProfiler: The profiler itself.
+        """
+        event.listen(self.engine, 'before_cursor_execute', self._before)
+        event.listen(self.engine, 'after_cursor_execute', self._after)
+        return self
+
+    def stop(self):
+        """
+        Stops listening to the engine.
+        """
+        event.remove(self.engine, 'before_cursor_execute', self._before)
+        event.remove(self.engine, 'after_cursor_execute', self._after)
+
+    def reset(self):
+        """
+        Forgets the recorded statements.
+        """
+        with self._lock:
+            self._statements = {}
+            self._slowest = []
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiler_start', []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['profiler_start'].pop()
+        if getattr(self._explaining, 'active', False) or statement.lstrip().lower().startswith(IGNORED_PREFIXES):
+            return
+
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        with self._lock:
+            stats = self._statements.get(statement)
+            if stats is None:
+                stats = self._statements[statement] = {'count': 0, 'total': 0.0, 'max': 0.0, 'parameters': set()}
+            stats['count'] += 1
+            stats['total'] += duration
+            stats['max'] = max(stats['max'], duration)
+            stats['parameters'].add(repr(parameters))
+
+            entry = (duration, next(self._sequence), statement, parameters)
+            if len(self._slowest) < self.slowest:
+                heapq.heappush(self._slowest, entry)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def explain(self, statement, parameters):
+        """
+        Captures the query plan of a SELECT statement.
+
+        Returns:
+            list: The plan details, one string per step, empty for other statements.
+        """
+        if not statement.lstrip().lower().startswith(EXPLAINED_PREFIXES):
+            return []
+        self._explaining.active = True
+        try:
+            with self.engine.connect() as connection:
+                rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            return [row[-1] for row in rows]
+        except Exception as e:
+            return [f"Plan unavailable: {e}"]
+        finally:
+            self._explaining.active = False
+
+    def report(self):
+        """
+        Summarizes the statements recorded since the last reset.
+
+        Returns:
+            dict: queries (int), total (seconds), statements (list of dicts with
+                  sql, count, distinct, total and max, by total time), duplicates
+                  (the statements run more than once) and slowest (list of dicts
+                  with sql, duration, parameters and plan, slowest first).
+        """
+        with self._lock:
+            statements = [
+                {'sql': sql, 'count': stats['count'], 'distinct': len(stats['parameters']),
+                 'total': stats['total'], 'max': stats['max']}
+                for sql, stats in self._statements.items()
+            ]
+            slowest = sorted(self._slowest, reverse=True)
+
+        statements.sort(key=lambda stats: stats['total'], reverse=True)
+        return {
+            'queries': sum(stats['count'] for stats in statements),
+            'total': sum(stats['total'] for stats in statements),
+            'statements': statements,
+            'duplicates': [stats for stats in statements if stats['count'] > 1],
+            'slowest': [
+                {'sql': sql, 'duration': duration, 'parameters': parameters, 'plan': self.explain(sql, parameters)}
+                for duration, _, sql, parameters in slowest
+            ]
+        }
@@ -0,0 +1,38 @@
+import os
+
+# Kept apart from config.database so that the CLI can list the profiles
+# without importing SQLAlchemy.
+ENGINE_PROFILES = {
+    # Short transactions from the REPL, readers never wait for a writer.
+    'interactive': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000
+    },
+    # Imports and seeding: large batches, no fsync, the job is simply rerun
+    # if the machine crashes during the load.
+    'bulk-load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -262144,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000
+    },
+    # Exports, listings and reports over large tables.
+    'read-heavy': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -131072,
+        'mmap_size': 1024 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000
+    }
+}
+
+DEFAULT_PROFILE = os.environ.get('EPICEVENTS_DB_PROFILE', 'interactive')
+if DEFAULT_PROFILE not in ENGINE_PROFILES:
+    raise Exception(f"Unknown engine profile in EPICEVENTS_DB_PROFILE: {DEFAULT_PROFILE}")
@@ -1,3 +1,12 @@
 from .controllers import ClientHandler, ContractHandler, EventHandler, CollaboratorHandler
+from .async_controllers import AsyncClientHandler, AsyncContractHandler, AsyncEventHandler, AsyncCollaboratorHandler
+from .bulk import ImportHandler, ExportHandler
+from .search import SearchHandler
+from .reports import ReportHandler
+from .scheduling import SchedulingConflict
+from .transaction import transaction_scope, transactional, async_transaction_scope, retry_on_conflict
 
-__all__ = [ClientHandler, ContractHandler, EventHandler, CollaboratorHandler]
+__all__ = [ClientHandler, ContractHandler, EventHandler, CollaboratorHandler,
+           AsyncClientHandler, AsyncContractHandler, AsyncEventHandler, AsyncCollaboratorHandler,
+           ImportHandler, ExportHandler, SearchHandler, ReportHandler, SchedulingConflict, transaction_scope, transactional, async_transaction_scope,
+           retry_on_conflict]
@@ -0,0 +1,660 @@
+from models import Client, Contract, Event, Collaborator, NotFound, ConcurrentUpdateError
+from models.models import is_write_conflict
+from models.passwords import password_hasher
+from controllers.controllers import (BaseHandler, ClientHandler, ContractHandler, EventHandler, CollaboratorHandler,
+                                     CLIENT_LOADS, CONTRACT_LOADS, EVENT_LOADS, ID_BATCH_SIZE, keyset_page)
+from controllers.transaction import async_transaction_scope
+from controllers.cache import principal_cache
+from controllers.filters import compile_filters
+from controllers.scheduling import CONFLICT_LIMIT
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from sentry_sdk import capture_exception
+import asyncio
+
+
+async def async_commit(session):
+    """
+    Commits an AsyncSession, or only flushes it inside a transaction scope,
+    like models.commit does for synchronous sessions.
+
+    Args:
+        session (AsyncSession): The asynchronous database session.
+    """
+    try:
+        if session.sync_session.info.get('transaction_depth'):
+            await session.flush()
+        else:
+            await session.commit()
+    except (StaleDataError, OperationalError) as e:
+        if not is_write_conflict(e):
+            raise
+        if not session.sync_session.info.get('transaction_depth'):
+            await session.rollback()
+        raise ConcurrentUpdateError() from e
+
+
+class AsyncBaseHandler(BaseHandler):
+    """
+    Base class of the asyncio handlers, built on an AsyncSession.
+
+    The async handlers inherit the permission checks and the validation
+    helpers of the synchronous handlers and only replace their database
+    round trips with awaited ones. bcrypt work runs on the password hasher
+    pool so that it never blocks the event loop.
+    """
+    def __init__(self, session, token_data, collaborator):
+        """
+        Initializes the handler with an already authenticated principal, see create.
+
+        Args:
+            session (AsyncSession): The asynchronous database session.
+            token_data (dict): The decoded token.
+            collaborator (Collaborator): The collaborator the token belongs to.
+        """
+        self.session = session
+        self.token_data = token_data
+        self.collaborator = collaborator
+        session.sync_session.info['collaborator_id'] = collaborator.id if collaborator else None
+
+    @classmethod
+    async def create(cls, session, token):
+        """
+        Builds a handler for a token, going through the principal cache.
+
+        Use it instead of the constructor, which cannot await the query.
+
+        Args:
+            session (AsyncSession): The asynchronous database session.
+            token (str): The JWT token.
+
+        Returns:
+            The handler instance.
+        """
+        cached = await principal_cache.async_get(token, session)
+        if cached:
+            token_data, collaborator = cached
+        else:
+            token_data = Collaborator().verify_token(token)
+            collaborator = None
+            if token_data and token_data != 'expired':
+                collaborator = await session.get(Collaborator, token_data['id'])
+                if collaborator:
+                    principal_cache.put(token, token_data)
+
+        # A rollback expires every instance of the session and an expired
+        # attribute cannot be lazy loaded outside of an await, so the
+        # principal is kept detached for the permission checks.
+        if collaborator is not None:
+            session.expunge(collaborator)
+        return cls(session, token_data, collaborator)
+
+    def transaction(self):
+        """
+        Opens a transaction scope on the handler session.
+
+        Returns:
+            Async context manager committing every write of the block at once.
+        """
+        return async_transaction_scope(self.session)
+
+    async def _save(self, instance):
+        """
+        Validates and saves a model instance, like its save method does.
+
+        Raises:
+            ValidationError: If the instance is not valid.
+        """
+        instance.validate()
+        self.session.add(instance)
+        await async_commit(self.session)
+        return instance
+
+    async def _page(self, statement, model, after_id=None, limit=None, sort_key='id'):
+        """
+        Runs one keyset page of a select statement, see keyset_page.
+
+        Returns:
+            List of rows for the requested page.
+        """
+        result = await self.session.scalars(keyset_page(statement, model, after_id, limit, sort_key))
+        return result.all()
+
+    async def _stream(self, statement, model, sort_key='id', chunk_size=1000):
+        """
+        Iterates over a select statement in chunks with a server side cursor.
+
+        Returns:
+            Async iterator over the rows.
+        """
+        statement = keyset_page(statement, model, sort_key=sort_key).execution_options(yield_per=chunk_size)
+        async for row in await self.session.stream_scalars(statement):
+            yield row
+
+    async def _update_many(self, statement, ids):
+        """
+        Runs a set-based UPDATE on the rows of a list of ids, see BaseHandler._update_many.
+
+        Returns:
+            dict: requested and updated counts.
+        """
+        ids = sorted(set(ids))
+        updated = 0
+        async with self.transaction():
+            for start in range(0, len(ids), ID_BATCH_SIZE):
+                result = await self.session.execute(statement, {'ids': ids[start:start + ID_BATCH_SIZE]})
+                updated += result.rowcount
+        self.session.expire_all()
+        return {'requested': len(ids), 'updated': updated}
+
+    async def _run(self, coroutine):
+        """
+        Awaits a database coroutine, reporting its failure to Sentry.
+        """
+        try:
+            return await coroutine
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+
+class AsyncClientHandler(AsyncBaseHandler, ClientHandler):
+    """
+    Asyncio handler class for managing clients.
+    """
+    async def get_all_clients(self, after_id=None, limit=None, sort_key='id'):
+        """
+        Retrieves clients from the database, one page at a time.
+
+        Args:
+            after_id (int): The id of the last client of the previous page.
+            limit (int): The page size, all remaining clients when None.
+            sort_key (str): The column to sort on.
+
+        Returns:
+            List of clients.
+        """
+        self.token_is_valid()
+        return await self._run(self._page(select(Client).options(*CLIENT_LOADS), Client, after_id, limit, sort_key))
+
+    def stream_clients(self, sort_key='id', chunk_size=1000):
+        """
+        Iterates over all clients without loading them all at once.
+
+        Returns:
+            Async iterator over clients.
+        """
+        self.token_is_valid()
+        return self._stream(select(Client).options(*CLIENT_LOADS), Client, sort_key, chunk_size)
+
+    async def create_client(self, data):
+        """
+        Creates a new client in the database.
+
+        Args:
+            data (dict): The client data.
+
+        Returns:
+            The created client instance.
+        """
+        self.check_permission('commercial')
+        return await self._run(self._save(self._new_client(data)))
+
+    async def update_client(self, client_id, data):
+        """
+        Updates an existing client in the database.
+
+        Args:
+            client_id (int): The ID of the client to update.
+            data (dict): The updated client data.
+
+        Returns:
+            The updated client instance.
+        """
+        self.check_permission('commercial')
+
+        client = await self.session.get(Client, client_id)
+        self._apply_client_update(client, data)
+        return await self._run(self._save(client))
+
+
+class AsyncContractHandler(AsyncBaseHandler, ContractHandler):
+    """
+    Asyncio handler class for managing contracts.
+    """
+    async def get_all_contracts(self, after_id=None, limit=None, sort_key='id'):
+        """
+        Retrieves contracts from the database, one page at a time.
+
+        Args:
+            after_id (int): The id of the last contract of the previous page.
+            limit (int): The page size, all remaining contracts when None.
+            sort_key (str): The column to sort on.
+
+        Returns:
+            List of contracts.
+        """
+        self.token_is_valid()
+        return await self._run(self._page(select(Contract).options(*CONTRACT_LOADS), Contract, after_id, limit, sort_key))
+
+    def stream_contracts(self, sort_key='id', chunk_size=1000):
+        """
+        Iterates over all contracts without loading them all at once.
+
+        Returns:
+            Async iterator over contracts.
+        """
+        self.token_is_valid()
+        return self._stream(select(Contract).options(*CONTRACT_LOADS), Contract, sort_key, chunk_size)
+
+    async def filter_contracts(self, terms=(), sort_key='id', limit=None, after_id=None):
+        """
+        Retrieves the contracts matching every filter term, see ContractHandler.filter_contracts.
+
+        Returns:
+            List of contracts.
+        """
+        self.token_is_valid()
+        statement = select(Contract).options(*CONTRACT_LOADS).where(*compile_filters(Contract, terms))
+        return await self._run(self._page(statement, Contract, after_id, limit, sort_key))
+
+    async def filter_contacts_not_paid(self):
+        """
+        Retrieves all contracts that are not paid.
+
+        Returns:
+            List of contracts not paid.
+        """
+        self.check_permission('commercial')
+        statement = select(Contract).options(*CONTRACT_LOADS).where(Contract.status.is_(False))
+        return await self._run(self._page(statement, Contract))
+
+    async def create_contract(self, data):
+        """
+        Creates a new contract in the database.
+
+        Args:
+            data (dict): The contract data.
+
+        Returns:
+            The created contract instance.
+        """
+        self.check_permission('gestion')
+
+        client = await self.session.get(Client, data.get('client_id'))
+        return await self._run(self._save(self._new_contract(data, client)))
+
+    async def update_contract(self, contract_id, data):
+        """
+        Updates an existing contract in the database.
+
+        Args:
+            contract_id (int): The ID of the contract to update.
+            data (dict): The updated contract data.
+
+        Returns:
+            The updated contract instance.
+        """
+        self.token_is_valid()
+
+        contract = await self.session.get(Contract, contract_id)
+        self._apply_contract_update(contract, data)
+        return await self._run(self._save(contract))
+
+    async def update_contracts(self, contract_ids, **values):
+        """
+        Updates a list of contracts with a single UPDATE ... WHERE id IN,
+        see ContractHandler.update_contracts.
+
+        Returns:
+            dict: requested and updated counts.
+        """
+        self.token_is_valid()
+        return await self._run(self._update_many(self._contracts_update(values), contract_ids))
+
+    async def mark_contracts_signed(self, contract_ids):
+        """
+        Marks a list of contracts as signed with one UPDATE, see update_contracts.
+        """
+        return await self.update_contracts(contract_ids, status=True)
+
+    async def mark_contracts_paid(self, contract_ids):
+        """
+        Sets the amount due of a list of contracts to 0 with one UPDATE, see update_contracts.
+        """
+        return await self.update_contracts(contract_ids, amount_due=0)
+
+    async def adjust_amount_due(self, contract_ids, delta):
+        """
+        Adds delta to the amount due of a list of contracts, kept between 0
+        and the total amount, with one UPDATE, see update_contracts.
+        """
+        return await self.update_contracts(contract_ids, amount_due=self._adjusted_amount_due(delta))
+
+
+class AsyncEventHandler(AsyncBaseHandler, EventHandler):
+    """
+    Asyncio handler class for managing events.
+    """
+    async def get_all_events(self, after_id=None, limit=None, sort_key='id'):
+        """
+        Retrieves events from the database, one page at a time.
+
+        Args:
+            after_id (int): The id of the last event of the previous page.
+            limit (int): The page size, all remaining events when None.
+            sort_key (str): The column to sort on.
+
+        Returns:
+            List of events.
+        """
+        self.token_is_valid()
+        return await self._run(self._page(select(Event).options(*EVENT_LOADS), Event, after_id, limit, sort_key))
+
+    def stream_events(self, sort_key='id', chunk_size=1000):
+        """
+        Iterates over all events without loading them all at once.
+
+        Returns:
+            Async iterator over events.
+        """
+        self.token_is_valid()
+        return self._stream(select(Event).options(*EVENT_LOADS), Event, sort_key, chunk_size)
+
+    async def filter_events(self, terms=(), sort_key='id', limit=None, after_id=None):
+        """
+        Retrieves the events matching every filter term, see EventHandler.filter_events.
+
+        Returns:
+            List of events.
+        """
+        self.token_is_valid()
+        statement = select(Event).options(*EVENT_LOADS).where(*compile_filters(Event, terms))
+        return await self._run(self._page(statement, Event, after_id, limit, sort_key))
+
+    async def filter_events_without_support(self):
+        """
+        Retrieves all events without a support contact.
+
+        Returns:
+            List of events without a support contact.
+        """
+        self.check_permission('gestion')
+        statement = select(Event).options(*EVENT_LOADS).where(Event.support_contact_id.is_(None))
+        return await self._run(self._page(statement, Event))
+
+    async def filter_my_events(self):
+        """
+        Retrieves all events assigned to the current collaborator.
+
+        Returns:
+            List of events assigned to the current collaborator.
+        """
+        self.check_permission('support')
+        statement = select(Event).options(*EVENT_LOADS).where(Event.support_contact_id == self.collaborator.id)
+        return await self._run(self._page(statement, Event))
+
+    async def create_event(self, data):
+        """
+        Creates a new event in the database.
+
+        Args:
+            data (dict): The event data.
+
+        Returns:
+            The created event instance.
+        """
+        self.check_permission('commercial')
+
+        contract = await self.session.get(Contract, data.get('contract_id'))
+        return await self._run(self._save(self._new_event(data, contract)))
+
+    async def add_support_contact(self, event_id, support_contact_id, allow_overlap=False):
+        """
+        Adds a support contact to an existing event.
+
+        Args:
+            event_id (int): The ID of the event.
+            support_contact_id (int): The ID of the support contact to add.
+            allow_overlap (bool): Assign even if the support contact has overlapping events.
+
+        Returns:
+            The updated event instance.
+
+        Raises:
+            SchedulingConflict: If the support contact is booked on overlapping events.
+        """
+        self.check_permission('gestion')
+
+        event = await self.session.get(Event, event_id)
+        support_contact = await self.session.get(Collaborator, support_contact_id)
+        self._check_support_contact(event, support_contact)
+        if not allow_overlap:
+            conflicts = await self.session.scalars(self._overlap_statement(event, support_contact_id))
+            self._check_overlaps(support_contact_id, conflicts.all())
+
+        event.support_contact_id = support_contact_id
+        await self._run(async_commit(self.session))
+        return event
+
+    async def add_support_contact_many(self, event_ids, support_contact_id, allow_overlap=False):
+        """
+        Assigns one support contact to a list of events with a single
+        UPDATE ... WHERE id IN, see EventHandler.add_support_contact_many.
+
+        Returns:
+            dict: requested and updated counts.
+
+        Raises:
+            SchedulingConflict: If some events overlap, listing the events they overlap.
+        """
+        self.check_permission('gestion')
+        try:
+            support_contact = await self.session.get(Collaborator, support_contact_id)
+            if not support_contact:
+                raise NotFound('Support contact not found')
+            if support_contact.department != 'support':
+                raise Exception('Support contact must be in support department')
+
+            event_ids = sorted(set(event_ids))
+            if not allow_overlap:
+                self._check_overlaps(support_contact_id,
+                                     await self.session.run_sync(self._batch_overlaps, event_ids, support_contact_id))
+            return await self._update_many(self._support_update(support_contact_id), event_ids)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    async def scheduling_conflicts(self, limit=CONFLICT_LIMIT):
+        """
+        Finds the pairs of overlapping events of a same support contact, see
+        EventHandler.scheduling_conflicts.
+
+        The schedule is still streamed, the sweep running on the synchronous
+        session with run_sync.
+
+        Returns:
+            dict: total, by_support_contact and conflicts.
+        """
+        self.check_permission('gestion')
+        return await self._run(self.session.run_sync(self._conflict_report, limit))
+
+    async def auto_assign_support(self, terms=(), dry_run=False):
+        """
+        Assigns the events without support contact to the support department,
+        see EventHandler.auto_assign_support.
+
+        The calendars are read and the plan computed on the synchronous
+        session with run_sync, the plan is written by one awaited UPDATE
+        executed for every assignment, in one transaction.
+
+        Returns:
+            dict: assignments, unassigned, loads and updated.
+        """
+        self.check_permission('gestion')
+        try:
+            calendars, assignments, unassigned = await self.session.run_sync(
+                self._plan_support, compile_filters(Event, terms))
+
+            updated = 0
+            if assignments and not dry_run:
+                async with self.transaction():
+                    updated = (await self.session.execute(*self._assignment_update(assignments))).rowcount
+                self.session.expire_all()
+            return self._assignment_report(calendars, assignments, unassigned, updated)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    async def update_event(self, event_id, data):
+        """
+        Updates an existing event in the database.
+
+        Args:
+            event_id (int): The ID of the event to update.
+            data (dict): The updated event data.
+
+        Returns:
+            The updated event instance.
+        """
+        self.check_permission('support')
+
+        event = await self.session.get(Event, event_id)
+        self._apply_event_update(event, data)
+        return await self._run(self._save(event))
+
+
+class AsyncCollaboratorHandler(AsyncBaseHandler, CollaboratorHandler):
+    """
+    Asyncio handler class for managing collaborators.
+    """
+    async def get_all_collaborators(self, after_id=None, limit=None, sort_key='id'):
+        """
+        Retrieves collaborators from the database, one page at a time.
+
+        Args:
+            after_id (int): The id of the last collaborator of the previous page.
+            limit (int): The page size, all remaining collaborators when None.
+            sort_key (str): The column to sort on.
+
+        Returns:
+            List of collaborators.
+        """
+        self.token_is_valid()
+        return await self._run(self._page(select(Collaborator), Collaborator, after_id, limit, sort_key))
+
+    def stream_collaborators(self, sort_key='id', chunk_size=1000):
+        """
+        Iterates over all collaborators without loading them all at once.
+
+        Returns:
+            Async iterator over collaborators.
+        """
+        self.token_is_valid()
+        return self._stream(select(Collaborator), Collaborator, sort_key, chunk_size)
+
+    async def create_collaborator(self, data):
+        """
+        Creates a new collaborator in the database.
+
+        Args:
+            data (dict): The collaborator data.
+
+        Returns:
+            The created collaborator instance.
+        """
+        self.check_permission('gestion')
+
+        collaborator = Collaborator(
+            name=data.get('name'),
+            email=data.get('email'),
+            department=data.get('department'),
+            password=await asyncio.wrap_future(password_hasher.hash_async(data.get('password')))
+        )
+        return await self._run(self._save(collaborator))
+
+    async def create_collaborators(self, data_list):
+        """
+        Creates several collaborators in one transaction, hashing their
+        passwords in parallel.
+
+        Args:
+            data_list (list): The collaborator data, one dict per collaborator.
+
+        Returns:
+            List of the created collaborator instances.
+        """
+        self.check_permission('gestion')
+
+        hashes = await asyncio.gather(*(asyncio.wrap_future(password_hasher.hash_async(data.get('password')))
+                                        for data in data_list))
+        collaborators = [
+            Collaborator(
+                name=data.get('name'),
+                email=data.get('email'),
+                department=data.get('department'),
+                password=hashed
+            )
+            for data, hashed in zip(data_list, hashes)
+        ]
+
+        try:
+            async with self.transaction():
+                for collaborator in collaborators:
+                    await self._save(collaborator)
+            return collaborators
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    async def update_collaborator(self, collaborator_id, data):
+        """
+        Updates an existing collaborator in the database.
+
+        The password is only hashed again when a new one is supplied.
+
+        Args:
+            collaborator_id (int): The ID of the collaborator to update.
+            data (dict): The updated collaborator data.
+
+        Returns:
+            The updated collaborator instance.
+        """
+        self.check_permission('gestion')
+
+        collaborator = await self.session.get(Collaborator, collaborator_id)
+        self._apply_collaborator_update(collaborator, data)
+        password = data.get('password')
+        if password:
+            loop = asyncio.get_running_loop()
+            unchanged = await loop.run_in_executor(password_hasher.executor, password_hasher.verify,
+                                                   password, collaborator.password)
+            if not unchanged:
+                collaborator.password = await asyncio.wrap_future(password_hasher.hash_async(password))
+
+        await self._run(self._save(collaborator))
+        principal_cache.invalidate(collaborator_id)
+        return collaborator
+
+    async def delete_collaborator(self, collaborator_id):
+        """
+        Deletes a collaborator from the database.
+
+        Args:
+            collaborator_id (int): The ID of the collaborator to delete.
+
+        Returns:
+            dict: A success message.
+        """
+        self.check_permission('gestion')
+
+        collaborator = await self.session.get(Collaborator, collaborator_id)
+
+        if not collaborator:
+            raise NotFound('Collaborator not found')
+
+        await self.session.delete(collaborator)
+        await self._run(async_commit(self.session))
+        principal_cache.invalidate(collaborator_id)
+        return {'message': 'Collaborator deleted successfully'}, 200
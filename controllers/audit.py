@@ -0,0 +1,323 @@
+from datetime import datetime
+from sqlalchemy import event, insert, select, inspect
+from sqlalchemy.orm import Session
+from models import AuditBase, AuditEntry
+from models.audit import AUDITED_TABLES
+from sentry_sdk import capture_exception
+import json
+import threading
+
+
+# Columns whose values are never written to the log, only the fact they changed.
+HIDDEN_COLUMNS = ('password',)
+HIDDEN_VALUE = '<hidden>'
+
+AUDIT_BATCH_SIZE = 500
+AUDIT_FLUSH_INTERVAL = 1.0
+
+_PENDING = 'audit_pending'
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _value(key, value):
+    return HIDDEN_VALUE if key in HIDDEN_COLUMNS and value is not None else _json_value(value)
+
+
+def row_changes(instance, action):
+    """
+    Computes the [before, after] values of the changed columns of a flushed instance.
+
+    Read from the attribute history, which still holds the previous values
+    in after_flush, so no query is needed.
+
+    Args:
+        instance: The model instance.
+        action (str): insert, update or delete.
+
+    Returns:
+        dict: [before, after] by column, only the changed ones for an update.
+    """
+    state = inspect(instance)
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        key = attr.key
+        if action == 'insert':
+            value = getattr(instance, key)
+            if value is not None:
+                changes[key] = [None, _value(key, value)]
+        elif action == 'delete':
+            value = state.dict.get(key)
+            if value is not None:
+                changes[key] = [_value(key, value), None]
+        else:
+            history = state.attrs[key].history
+            if history.added or history.deleted:
+                before = history.deleted[0] if history.deleted else None
+                after = history.added[0] if history.added else None
+                if before != after:
+                    changes[key] = [_value(key, before), _value(key, after)]
+    return changes
+
+
+def _within(transaction, ancestor):
+    """
+    Tells whether a session transaction is ancestor or one of its nested transactions.
+    """
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+class AuditLog:
+    """
+    Records who changed which client, contract, event or collaborator.
+
+    Session events capture a before/after diff of every flushed instance,
+    and of every row written by a Core INSERT or a set-based UPDATE or
+    DELETE run through the session.
+    Entries wait in the session until its transaction commits, those of a
+    rolled back transaction or savepoint being dropped, then in a process
+    buffer. A background thread writes the buffer to the append-only
+    audit_log table in batches, one transaction per batch, so a handler
+    write only pays for building its entries in memory.
+    """
+    def __init__(self, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL):
+        """
+        Initializes a stopped audit log.
+
+        Args:
+            batch_size (int): The number of buffered entries waking the writer up.
+            flush_interval (float): The longest time an entry is buffered, in seconds.
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.engine = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self, engine, target=Session):
+        """
+        Creates the audit table if needed, listens to the sessions and starts the writer thread.
+
+        Args:
+            engine: The engine of the audit database.
+            target: The sessions to audit, a Session class or sessionmaker.
+
+        Returns:
+            AuditLog: self.
+        """
+        AuditBase.metadata.create_all(engine)
+        self.engine = engine
+        self.target = target
+        event.listen(target, 'after_flush', self._after_flush)
+        event.listen(target, 'do_orm_execute', self._on_execute)
+        event.listen(target, 'after_commit', self._after_commit)
+        event.listen(target, 'after_soft_rollback', self._after_rollback)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops listening and the writer thread, then writes the remaining entries.
+        """
+        if self._thread is None:
+            return
+        for name, listener in (('after_flush', self._after_flush), ('do_orm_execute', self._on_execute),
+                               ('after_commit', self._after_commit), ('after_soft_rollback', self._after_rollback)):
+            event.remove(self.target, name, listener)
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def record(self, entries):
+        """
+        Adds committed entries to the buffer, waking the writer up when a batch is full.
+
+        Args:
+            entries (list): Dicts of AuditEntry column values.
+        """
+        with self._lock:
+            self._buffer.extend(entries)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Writes the buffered entries in one transaction.
+
+        On failure the entries are put back in the buffer for the next flush.
+
+        Returns:
+            int: The number of written entries.
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries, self._buffer = self._buffer, []
+            if not entries:
+                return 0
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(insert(AuditEntry.__table__), entries)
+            except Exception as e:
+                capture_exception(e)
+                with self._lock:
+                    self._buffer[:0] = entries
+                return 0
+            return len(entries)
+
+    def entries(self, table_name=None, row_id=None, limit=50):
+        """
+        Reads the latest entries, flushing the buffer first.
+
+        Args:
+            table_name (str): Only the entries of this table, all when None.
+            row_id (int): Only the entries of this row of table_name.
+            limit (int): The maximum number of entries.
+
+        Returns:
+            List of dicts of AuditEntry column values, the latest first.
+        """
+        self.flush()
+        statement = select(AuditEntry.__table__).order_by(AuditEntry.id.desc()).limit(limit)
+        if table_name is not None:
+            statement = statement.where(AuditEntry.table_name == table_name)
+        if row_id is not None:
+            statement = statement.where(AuditEntry.row_id == row_id)
+        with self.engine.connect() as connection:
+            return [dict(row) for row in connection.execute(statement).mappings()]
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _entry(self, session, table_name, row_id, action, changes):
+        return {
+            'recorded_at': datetime.utcnow(),
+            'collaborator_id': session.info.get('collaborator_id'),
+            'table_name': table_name,
+            'row_id': row_id,
+            'action': action,
+            'changes': json.dumps(changes, default=str),
+        }
+
+    def _pend(self, session, entries):
+        transaction = session.get_nested_transaction() or session.get_transaction()
+        session.info.setdefault(_PENDING, []).extend((transaction, entry) for entry in entries)
+
+    def _after_flush(self, session, flush_context):
+        entries = []
+        for action, instances in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+            for instance in instances:
+                state = inspect(instance)
+                table_name = state.mapper.local_table.name
+                if table_name not in AUDITED_TABLES:
+                    continue
+                changes = row_changes(instance, action)
+                if changes:
+                    entries.append(self._entry(session, table_name, state.dict.get('id'), action, changes))
+        if entries:
+            self._pend(session, entries)
+
+    def _on_execute(self, orm_execute_state):
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return None
+        statement = orm_execute_state.statement
+        table = statement.table
+        if table.name not in AUDITED_TABLES:
+            return None
+        parameters = orm_execute_state.parameters
+        parameter_sets = parameters if isinstance(parameters, list) else [parameters or {}]
+        if orm_execute_state.is_insert:
+            return self._audit_insert(orm_execute_state, table, parameter_sets)
+        return self._audit_set_based(orm_execute_state, table, parameter_sets)
+
+    def _audit_insert(self, orm_execute_state, table, parameter_sets):
+        """
+        Runs a Core INSERT, such as the executemany of the bulk import, and
+        pends one entry per inserted row. return_defaults() makes SQLite
+        return the ids in the order of the parameter sets.
+        """
+        statement = orm_execute_state.statement
+        if statement.returning_column_descriptions:
+            # The caller reads its own RETURNING rows, they are left untouched.
+            return None
+        result = orm_execute_state.invoke_statement(statement.return_defaults(sort_by_parameter_order=True))
+        defaults = {key: value for key, value in statement.compile().params.items() if value is not None}
+        session = orm_execute_state.session
+        entries = []
+        for values, primary_key in zip(parameter_sets, result.inserted_primary_key_rows):
+            row = {**defaults, **values, 'id': primary_key[0]}
+            changes = {key: [None, _value(key, value)] for key, value in row.items() if value is not None}
+            entries.append(self._entry(session, table.name, primary_key[0], 'insert', changes))
+        self._pend(session, entries)
+        return result
+
+    def _audit_set_based(self, orm_execute_state, table, parameter_sets):
+        """
+        Runs a set-based UPDATE or DELETE and pends one entry per affected row.
+
+        The rows matching the WHERE clause are read before the statement,
+        once per parameter set of an executemany, and the updated ones again
+        after it, so each entry holds the [before, after] values of the
+        columns that changed.
+        """
+        session = orm_execute_state.session
+        statement = orm_execute_state.statement
+        matching = select(table)
+        if statement.whereclause is not None:
+            matching = matching.where(statement.whereclause)
+        before = {}
+        for values in parameter_sets:
+            for row in session.execute(matching, values).mappings():
+                before[row['id']] = dict(row)
+        result = orm_execute_state.invoke_statement()
+        if not before:
+            return result
+
+        if orm_execute_state.is_delete:
+            action, after = 'delete', {}
+        else:
+            action = 'update'
+            rows = session.execute(select(table).where(table.c.id.in_(list(before)))).mappings()
+            after = {row['id']: dict(row) for row in rows}
+        entries = []
+        for row_id, previous in sorted(before.items()):
+            current = after.get(row_id, {})
+            changes = {key: [_value(key, value), _value(key, current.get(key))]
+                       for key, value in previous.items() if value != current.get(key)}
+            if action == 'update':
+                changes = {key: change for key, change in changes.items() if key in current}
+            if changes:
+                entries.append(self._entry(session, table.name, row_id, action, changes))
+        self._pend(session, entries)
+        return result
+
+    def _after_commit(self, session):
+        pending = session.info.pop(_PENDING, None)
+        if pending:
+            self.record([entry for _, entry in pending])
+
+    def _after_rollback(self, session, previous_transaction):
+        pending = session.info.get(_PENDING)
+        if pending:
+            pending[:] = [(transaction, entry) for transaction, entry in pending
+                          if not _within(transaction, previous_transaction)]
+
+
+audit_log = AuditLog()
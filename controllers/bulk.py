@@ -0,0 +1,416 @@
+from models import Client, Contract, Event, Collaborator, ValidationError, Base
+from controllers.controllers import BaseHandler
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from types import SimpleNamespace
+from sqlalchemy import insert, select
+import os
+from sentry_sdk import capture_exception
+import csv
+import itertools
+import json
+
+
+def _to_bool(value):
+    """
+    Converts a CSV/JSON value to a boolean.
+    """
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('true', 'yes', '1'):
+        return True
+    if text in ('false', 'no', '0'):
+        return False
+    raise ValueError(f'invalid boolean {value!r}')
+
+
+def _to_datetime(value):
+    """
+    Converts an ISO formatted CSV/JSON value to a datetime.
+    """
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).strip())
+
+
+IMPORT_FIELDS = {
+    'clients': {
+        'name': str,
+        'email': str,
+        'telephone': str,
+        'company_name': str,
+        'commercial_id': int
+    },
+    'contracts': {
+        'client_id': int,
+        'total_amount': float,
+        'amount_due': float,
+        'status': _to_bool
+    },
+    'events': {
+        'contract_id': int,
+        'start_date': _to_datetime,
+        'end_date': _to_datetime,
+        'location': str,
+        'attendees': int,
+        'notes': str
+    }
+}
+
+IMPORT_REFERENCES = {
+    'clients': ('commercial_id', Collaborator, None),
+    'contracts': ('client_id', Client, 'commercial_id'),
+    'events': ('contract_id', Contract, 'client_id')
+}
+
+IMPORT_MODELS = {
+    'clients': Client,
+    'contracts': Contract,
+    'events': Event
+}
+
+EXPORT_NAMES = {
+    'clients': [('commercial_name', 'commercial_id', 'collaborators')],
+    'contracts': [('client_name', 'client_id', 'clients'), ('commercial_name', 'commercial_id', 'collaborators')],
+    'events': [('client_name', 'client_id', 'clients'), ('support_contact_name', 'support_contact_id', 'collaborators')]
+}
+
+
+def read_records(path, fmt=None):
+    """
+    Reads the raw records of a CSV or JSONL file lazily.
+
+    CSV lines are returned as dicts, JSONL lines as text so that decoding
+    happens in the parsing workers.
+
+    Args:
+        path (str): The file to read.
+        fmt (str): 'csv' or 'jsonl', guessed from the extension when None.
+
+    Returns:
+        Iterator over (line number, raw record) pairs.
+    """
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, line
+
+
+def parse_batch(entity, batch):
+    """
+    Decodes and converts a batch of raw records to column values.
+
+    Runs in the import worker processes, so it only depends on its arguments.
+
+    Args:
+        entity (str): 'clients', 'contracts' or 'events'.
+        batch (list): (line number, raw record) pairs.
+
+    Returns:
+        List of (line number, values, errors) triples, values being None when
+        the record could not be converted.
+    """
+    fields = IMPORT_FIELDS[entity]
+    parsed = []
+    for line_number, raw in batch:
+        errors = []
+        values = {}
+        try:
+            record = json.loads(raw) if isinstance(raw, str) else raw
+        except ValueError as e:
+            parsed.append((line_number, None, [f"Invalid JSON: {e}"]))
+            continue
+
+        for name, convert in fields.items():
+            value = record.get(name)
+            if value is None or value == '':
+                values[name] = None
+                continue
+            try:
+                values[name] = convert(value)
+            except (TypeError, ValueError):
+                errors.append(f"Invalid value for {name}: {value!r}")
+
+        if entity == 'events' and values.get('start_date') is None:
+            values['start_date'] = datetime.utcnow()
+        parsed.append((line_number, None if errors else values, errors))
+    return parsed
+
+
+def _batches(records, batch_size):
+    """
+    Splits an iterator into lists of at most batch_size items.
+    """
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _parallel_map(function, batches, workers):
+    """
+    Maps function over batches in a process pool, keeping the input order.
+
+    At most two batches per worker are in flight, so the whole file is never
+    read ahead into memory.
+
+    Args:
+        function (callable): A picklable function taking one batch.
+        batches (iterable): The batches to process.
+        workers (int): The number of processes, in-process when 1 or None.
+
+    Returns:
+        Iterator over the results.
+    """
+    if not workers or workers <= 1:
+        yield from map(function, batches)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for batch in batches:
+            pending.append(executor.submit(function, batch))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+class ImportHandler(BaseHandler):
+    """
+    Handler class for bulk loading clients, contracts and events.
+    """
+    def import_records(self, entity, records, batch_size=1000, workers=None):
+        """
+        Imports records in batches, one transaction per batch.
+
+        Records are parsed in a process pool, their references are checked
+        with one query per batch, then each batch is validated with the model
+        rules and written with a single executemany INSERT. Invalid rows are
+        reported and skipped, they never abort the load.
+
+        Importing is reserved to the gestion department: clients keep the
+        commercial_id of the file, contracts and events take their commercial
+        and client from the referenced client and contract, like create_contract
+        and create_event.
+
+        Args:
+            entity (str): 'clients', 'contracts' or 'events'.
+            records (iterable): (line number, raw record) pairs, see read_records.
+            batch_size (int): The number of rows per transaction.
+            workers (int): The number of parsing processes.
+
+        Returns:
+            dict: The number of inserted rows and the (line, messages) errors.
+        """
+        self.check_permission('gestion')
+
+        if entity not in IMPORT_MODELS:
+            raise Exception(f'Unknown entity: {entity}')
+        model = IMPORT_MODELS[entity]
+
+        report = {'inserted': 0, 'errors': []}
+        parsed_batches = _parallel_map(partial(parse_batch, entity), _batches(records, batch_size), workers)
+        for parsed in parsed_batches:
+            rows = []
+            for line_number, values, errors in parsed:
+                if errors:
+                    report['errors'].append((line_number, errors))
+                else:
+                    rows.append((line_number, values))
+
+            rows = self._resolve_references(entity, rows, report)
+            rows = self._validate(model, rows, report)
+            if rows:
+                self._insert_batch(model, rows, report)
+        return report
+
+    def _resolve_references(self, entity, rows, report):
+        """
+        Checks the referenced rows of a batch with one query and fills the
+        column derived from them, see IMPORT_REFERENCES.
+
+        Returns:
+            List of the (line number, values) pairs whose references exist.
+        """
+        key, target, derived = IMPORT_REFERENCES[entity]
+        column = getattr(target, derived) if derived else target.id
+        ids = {values[key] for _, values in rows if values[key] is not None}
+        found = dict(self.session.execute(select(target.id, column).where(target.id.in_(ids))).all()) if ids else {}
+
+        resolved = []
+        for line_number, values in rows:
+            if values[key] is not None and values[key] not in found:
+                report['errors'].append((line_number, [f"{key} {values[key]} does not exist."]))
+                continue
+            if derived:
+                values[derived] = found.get(values[key])
+            resolved.append((line_number, values))
+        return resolved
+
+    def _validate(self, model, rows, report):
+        """
+        Applies the model validation rules to each row of a batch.
+
+        Returns:
+            List of the valid (line number, values) pairs.
+        """
+        valid = []
+        for line_number, values in rows:
+            try:
+                model.validate(SimpleNamespace(**values))
+                valid.append((line_number, values))
+            except ValidationError as e:
+                report['errors'].append((line_number, e.args[0]))
+        return valid
+
+    def _insert_batch(self, model, rows, report):
+        """
+        Inserts a batch with one executemany statement and one commit.
+
+        When the batch is rejected by the database, its rows are retried one
+        by one so that only the offending rows are reported.
+        """
+        try:
+            self.session.execute(insert(model.__table__), [values for _, values in rows])
+            self.session.commit()
+            report['inserted'] += len(rows)
+            return
+        except Exception as e:
+            self.session.rollback()
+            capture_exception(e)
+
+        for line_number, values in rows:
+            try:
+                self.session.execute(insert(model.__table__), [values])
+                self.session.commit()
+                report['inserted'] += 1
+            except Exception as e:
+                self.session.rollback()
+                report['errors'].append((line_number, [str(e.orig if hasattr(e, 'orig') else e)]))
+
+
+def _export_query(entity, with_names):
+    """
+    Builds the Core SELECT exporting an entity, ordered by id.
+
+    Args:
+        entity (str): 'clients', 'contracts' or 'events'.
+        with_names (bool): Whether to add the names of the referenced rows.
+
+    Returns:
+        Select: The statement to stream.
+    """
+    table = IMPORT_MODELS[entity].__table__
+    columns = list(table.columns)
+    source = table
+    if with_names:
+        for label, foreign_key, target in EXPORT_NAMES[entity]:
+            alias = Base.metadata.tables[target].alias(label)
+            source = source.outerjoin(alias, table.c[foreign_key] == alias.c.id)
+            columns.append(alias.c.name.label(label))
+    return select(*columns).select_from(source).order_by(table.c.id)
+
+
+def _json_default(value):
+    """
+    Serializes the datetimes of exported rows.
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def write_rows(connection, entity, out, fmt='csv', with_names=False, chunk_size=5000):
+    """
+    Streams an entity to an open text file.
+
+    Rows are fetched chunk_size at a time and written right away, so memory
+    does not grow with the size of the table.
+
+    Args:
+        connection: The database connection to read from.
+        entity (str): 'clients', 'contracts' or 'events'.
+        out: The text file to write to.
+        fmt (str): 'csv' or 'jsonl'.
+        with_names (bool): Whether to add the names of the referenced rows.
+        chunk_size (int): The number of rows fetched per round trip.
+
+    Returns:
+        int: The number of exported rows.
+    """
+    result = connection.execute(_export_query(entity, with_names).execution_options(yield_per=chunk_size))
+    keys = list(result.keys())
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(keys)
+        for partition in result.partitions():
+            writer.writerows(partition)
+            count += len(partition)
+    else:
+        for partition in result.partitions():
+            out.writelines(json.dumps(dict(zip(keys, row)), default=_json_default) + '\n' for row in partition)
+            count += len(partition)
+    return count
+
+
+class ExportHandler(BaseHandler):
+    """
+    Handler class for exporting clients, contracts and events.
+    """
+    def export_entities(self, entities, directory, fmt='csv', with_names=False, workers=None, chunk_size=5000):
+        """
+        Exports entities to one file each, in parallel threads.
+
+        Each thread streams its table over its own connection, files are named
+        after the entity, e.g. clients.csv. Exporting is reserved to the
+        gestion department.
+
+        Args:
+            entities (list): Entities among 'clients', 'contracts' and 'events'.
+            directory (str): The directory receiving the files.
+            fmt (str): 'csv' or 'jsonl'.
+            with_names (bool): Whether to add the names of the referenced rows.
+            workers (int): The number of threads, the session connection is
+                used sequentially when 1 or None.
+            chunk_size (int): The number of rows fetched per round trip.
+
+        Returns:
+            dict: The number of exported rows per entity.
+        """
+        self.check_permission('gestion')
+
+        for entity in entities:
+            if entity not in IMPORT_MODELS:
+                raise Exception(f'Unknown entity: {entity}')
+        os.makedirs(directory, exist_ok=True)
+
+        def export(entity, connection):
+            path = os.path.join(directory, f'{entity}.{fmt}')
+            with open(path, 'w', newline='', encoding='utf-8') as out:
+                return write_rows(connection, entity, out, fmt, with_names, chunk_size)
+
+        def export_in_thread(entity):
+            with self.session.get_bind().connect() as connection:
+                return export(entity, connection)
+
+        try:
+            if not workers or workers <= 1:
+                connection = self.session.connection()
+                return {entity: export(entity, connection) for entity in entities}
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return dict(zip(entities, executor.map(export_in_thread, entities)))
+        except Exception as e:
+            capture_exception(e)
+            raise
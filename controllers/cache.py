@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from models import Collaborator
+import threading
+import time
+
+
+PRINCIPAL_CACHE_SIZE = 256
+PRINCIPAL_CACHE_TTL = 300
+
+
+class PrincipalCache:
+    """
+    Process-wide LRU cache of decoded tokens.
+
+    Entries expire after ttl seconds or when the token itself expires,
+    whichever comes first. Only the token verification is cached: the
+    collaborator is read from the session of every hit, from its identity
+    map or by primary key, so that a department change or a deletion
+    applies at once, whichever process made it.
+    """
+    def __init__(self, maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL):
+        """
+        Initializes an empty cache.
+
+        Args:
+            maxsize (int): The maximum number of cached tokens.
+            ttl (int): The maximum lifetime of an entry, in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, token):
+        """
+        Looks a token up.
+
+        Args:
+            token (str): The JWT token.
+
+        Returns:
+            dict/None: The decoded token on a hit, None otherwise.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, token_data = entry
+            if expires_at <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+        return token_data
+
+    def get(self, token, session):
+        """
+        Looks a token up and reads its collaborator from the session.
+
+        Args:
+            token (str): The JWT token.
+            session: The database session of the caller.
+
+        Returns:
+            tuple/None: (token data, collaborator) on a hit, None otherwise.
+        """
+        token_data = self.lookup(token)
+        if token_data is None:
+            return None
+        return self._principal(token_data, session.get(Collaborator, token_data['id']))
+
+    async def async_get(self, token, session):
+        """
+        Looks a token up and reads its collaborator from an asynchronous session.
+
+        Args:
+            token (str): The JWT token.
+            session (AsyncSession): The asynchronous database session of the caller.
+
+        Returns:
+            tuple/None: (token data, collaborator) on a hit, None otherwise.
+        """
+        token_data = self.lookup(token)
+        if token_data is None:
+            return None
+        return self._principal(token_data, await session.get(Collaborator, token_data['id']))
+
+    def _principal(self, token_data, collaborator):
+        if collaborator is None:
+            self.invalidate(token_data['id'])
+            return None
+        return token_data, collaborator
+
+    def put(self, token, token_data):
+        """
+        Caches a decoded token.
+
+        Args:
+            token (str): The JWT token.
+            token_data (dict): The decoded token.
+        """
+        expires_at = min(time.time() + self.ttl, token_data.get('exp', float('inf')))
+        with self._lock:
+            self._entries[token] = (expires_at, token_data)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, collaborator_id):
+        """
+        Drops every cached token of a collaborator.
+
+        Args:
+            collaborator_id (int): The ID of the updated or deleted collaborator.
+        """
+        with self._lock:
+            for token in [token for token, (_, token_data) in self._entries.items()
+                          if token_data['id'] == int(collaborator_id)]:
+                del self._entries[token]
+
+    def clear(self):
+        """
+        Empties the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
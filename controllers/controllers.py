@@ -1,37 +1,134 @@
-from models import Client, Contract, Event, Collaborator, ValidationError
+from models import (Client, Contract, Event, Collaborator, ValidationError, NotFound, PermissionDenied, TokenExpired,
+                    ConcurrentUpdateError, commit)
+from models.passwords import password_hasher
 from datetime import datetime
+from sqlalchemy import and_, or_, select, update, bindparam, func
+from sqlalchemy.orm import joinedload
+from controllers.transaction import transaction_scope
+from controllers.cache import principal_cache
+from controllers.filters import compile_filters
+from controllers.scheduling import (SchedulingConflict, CONFLICT_LIMIT, Calendar, overlap_statement,
+                                    schedule_statement, unassigned_statement, find_conflicts, plan_assignments)
+from metrics import metrics
 from sentry_sdk import capture_exception
 
 
+CLIENT_LOADS = (joinedload(Client.commercial),)
+CONTRACT_LOADS = (joinedload(Contract.client), joinedload(Contract.commercial))
+EVENT_LOADS = (joinedload(Event.client), joinedload(Event.support_contact))
+
+# Ids bound per statement by the batch updates, below the SQLite limit of
+# 32766 variables.
+ID_BATCH_SIZE = 10000
+
+
+def keyset_page(query, model, after_id=None, limit=None, sort_key='id'):
+    """
+    Restricts a query or select statement to one keyset page.
+
+    Rows are ordered by the sort key then by id, and the page starts right
+    after the row identified by after_id, so each page is an index range
+    scan instead of an OFFSET over every previous row.
+
+    NULLs of a nullable sort key come first. When the cursor row has one,
+    the page goes on with the NULL rows of greater id, then every non-NULL
+    row, instead of comparing with NULL and ending early.
+
+    Args:
+        query: The ORM query or select statement to paginate.
+        model: The mapped class the query selects.
+        after_id (int): The id of the last row of the previous page.
+        limit (int): The maximum number of rows to return.
+        sort_key (str): The column to sort on, one of model.SORT_KEYS.
+
+    Returns:
+        The paginated query or statement.
+
+    Raises:
+        Exception: If the sort key is not supported.
+    """
+    if sort_key not in model.SORT_KEYS:
+        raise Exception(f'Unknown sort key: {sort_key}')
+
+    column = getattr(model, sort_key)
+    if sort_key == 'id':
+        order = [model.id]
+        if after_id is not None:
+            query = query.filter(model.id > after_id)
+    else:
+        nullable = model.__table__.c[sort_key].nullable
+        order = [column.nulls_first() if nullable else column, model.id]
+        if after_id is not None:
+            cursor = select(column).where(model.id == after_id).scalar_subquery()
+            after = [column > cursor, and_(column == cursor, model.id > after_id)]
+            if nullable:
+                after.append(and_(cursor.is_(None), or_(column.is_not(None), model.id > after_id)))
+            query = query.filter(or_(*after))
+
+    query = query.order_by(None).order_by(*order)
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
 class BaseHandler:
     """
     Base handler class for managing session and token authentication.
+
+    The public methods of every handler subclass are timed, see metrics.
     """
+    UNTIMED_METHODS = ('transaction', 'token_is_valid', 'check_permission')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        metrics.instrument(cls, 'handler', exclude=BaseHandler.UNTIMED_METHODS)
+
     def __init__(self, session, token):
         """
         Initializes the BaseHandler with session and token.
+
+        Decoded tokens are kept in the process-wide principal cache, so only
+        the first handler built for a token pays for the verification. The
+        collaborator is always read from the session.
         
         Args:
             session: The database session.
             token: The JWT token.
         """
         self.session = session
-        collab = Collaborator()
-        self.token_data = collab.verify_token(token)
-        if self.token_data and self.token_data != 'expired':
-            self.collaborator = session.query(Collaborator).get(self.token_data['id'])
+        cached = principal_cache.get(token, session)
+        if cached:
+            self.token_data, self.collaborator = cached
         else:
-            self.collaborator = None
+            collab = Collaborator()
+            self.token_data = collab.verify_token(token)
+            if self.token_data and self.token_data != 'expired':
+                self.collaborator = session.query(Collaborator).get(self.token_data['id'])
+                if self.collaborator:
+                    principal_cache.put(token, self.token_data)
+            else:
+                self.collaborator = None
+        # The author of the writes of the session, see controllers.audit.
+        session.info['collaborator_id'] = self.collaborator.id if self.collaborator else None
+
+    def transaction(self):
+        """
+        Opens a transaction scope on the handler session.
+
+        Returns:
+            Context manager committing every write of the block at once.
+        """
+        return transaction_scope(self.session)
 
     def token_is_valid(self):
         """
         Checks if the token is valid and not expired.
         
         Raises:
-            Exception: If the token is expired.
+            TokenExpired: If the token is expired.
         """
         if not self.token_data or self.token_data == 'expired':
-            raise Exception('Token is expired. Please log in again.')
+            raise TokenExpired('Token is expired. Please log in again.')
 
     def check_permission(self, department):
         """
@@ -41,27 +138,138 @@ class BaseHandler:
             department (str): The required department for permission.
         
         Raises:
-            Exception: If the collaborator does not have the required permission.
+            PermissionDenied: If the collaborator does not have the required permission.
         """
         self.token_is_valid()
         if not self.collaborator or self.collaborator.department != department:
-            raise Exception('Permission denied')
+            raise PermissionDenied('Permission denied')
+
+    def _paginate(self, query, model, after_id=None, limit=None, sort_key='id'):
+        """
+        Applies keyset pagination to a query, see keyset_page.
+
+        Args:
+            query: The query to paginate.
+            model: The mapped class the query selects.
+            after_id (int): The id of the last row of the previous page.
+            limit (int): The maximum number of rows to return.
+            sort_key (str): The column to sort on, one of model.SORT_KEYS.
+
+        Returns:
+            List of rows for the requested page.
+        """
+        return keyset_page(query, model, after_id, limit, sort_key).all()
+
+    def _stream(self, query, model, sort_key='id', chunk_size=1000):
+        """
+        Iterates over a query in chunks instead of loading every row.
+
+        Rows are fetched from the cursor chunk_size at a time, so memory is
+        bounded by the chunk size whatever the size of the table.
+
+        Args:
+            query: The query to iterate over.
+            model: The mapped class the query selects.
+            sort_key (str): The column to sort on, one of model.SORT_KEYS.
+            chunk_size (int): The number of rows fetched per chunk.
+
+        Returns:
+            Iterator over the rows.
+
+        Raises:
+            Exception: If the sort key is not supported.
+        """
+        if sort_key not in model.SORT_KEYS:
+            raise Exception(f'Unknown sort key: {sort_key}')
+
+        order = [model.id] if sort_key == 'id' else [getattr(model, sort_key), model.id]
+        return query.order_by(None).order_by(*order).yield_per(chunk_size)
+
+    def _check_version(self, instance, data):
+        """
+        Compare-and-set on the version the caller read, given as data['version'].
+
+        The version is compared again by the UPDATE itself, which only
+        matches the version loaded here, see ConcurrentUpdateError.
+
+        Raises:
+            ConcurrentUpdateError: If the row changed since the caller read it.
+        """
+        version = data.get('version')
+        if version is not None and int(version) != instance.version:
+            raise ConcurrentUpdateError()
+
+    def _update_many(self, statement, ids):
+        """
+        Runs a set-based UPDATE on the rows of a list of ids.
+
+        The statement selects its rows with an expanding 'ids' parameter, it
+        is executed once per ID_BATCH_SIZE ids, inside one transaction. The
+        objects of the session are expired, as the rows are changed behind it.
+
+        Args:
+            statement: The Core UPDATE, filtered on id IN bindparam('ids', expanding=True).
+            ids (iterable): The ids of the rows, duplicates being ignored.
+
+        Returns:
+            dict: requested (the number of distinct ids) and updated (the
+                number of rows the statement changed).
+        """
+        ids = sorted(set(ids))
+        updated = 0
+        with self.transaction():
+            for start in range(0, len(ids), ID_BATCH_SIZE):
+                updated += self.session.execute(statement, {'ids': ids[start:start + ID_BATCH_SIZE]}).rowcount
+        self.session.expire_all()
+        return {'requested': len(ids), 'updated': updated}
 
 
 class ClientHandler(BaseHandler):
     """
     Handler class for managing clients.
     """
-    def get_all_clients(self): 
+    def _clients_query(self):
+        """
+        Builds the base query used by every client listing.
+
+        Returns:
+            Query over clients with their commercial contact eagerly loaded.
         """
-        Retrieves all clients from the database.
+        return self.session.query(Client).options(*CLIENT_LOADS)
+
+    def get_all_clients(self, after_id=None, limit=None, sort_key='id'):
+        """
+        Retrieves clients from the database, one page at a time.
         
+        Args:
+            after_id (int): The id of the last client of the previous page.
+            limit (int): The page size, all remaining clients when None.
+            sort_key (str): The column to sort on.
+
         Returns:
-            List of all clients.
+            List of clients.
         """
         self.token_is_valid()
         try:
-            return self.session.query(Client).all()
+            return self._paginate(self._clients_query(), Client, after_id, limit, sort_key)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def stream_clients(self, sort_key='id', chunk_size=1000):
+        """
+        Iterates over all clients without loading them all at once.
+        
+        Args:
+            sort_key (str): The column to sort on.
+            chunk_size (int): The number of clients fetched per chunk.
+
+        Yields:
+            The clients, once the token is checked when the iteration starts.
+        """
+        self.token_is_valid()
+        try:
+            yield from self._stream(self._clients_query(), Client, sort_key, chunk_size)
         except Exception as e:
             capture_exception(e)
             raise
@@ -78,15 +286,7 @@ class ClientHandler(BaseHandler):
         """
         self.check_permission('commercial')
         
-        commercial_id = self.collaborator.id
-
-        client = Client(
-            name=data.get('name'), 
-            email=data.get('email'), 
-            telephone=data.get('telephone'), 
-            company_name=data.get('company_name'), 
-            commercial_id=commercial_id
-        )
+        client = self._new_client(data)
 
         try:
             client.save(self.session)
@@ -109,12 +309,41 @@ class ClientHandler(BaseHandler):
         self.check_permission('commercial')
 
         client = self.session.query(Client).filter_by(id=client_id).first()
+        self._apply_client_update(client, data)
+
+        try:
+            client.save(self.session)  
+            return client
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def _new_client(self, data):
+        """
+        Builds a client owned by the current commercial.
+        """
+        return Client(
+            name=data.get('name'), 
+            email=data.get('email'), 
+            telephone=data.get('telephone'), 
+            company_name=data.get('company_name'), 
+            commercial_id=self.collaborator.id
+        )
 
+    def _apply_client_update(self, client, data):
+        """
+        Checks that the current commercial owns the client and applies the update.
+
+        Raises:
+            NotFound: If the client does not exist.
+            PermissionDenied: If it belongs to another commercial.
+        """
         if not client:
-            raise Exception('Client not found')
+            raise NotFound('Client not found')
 
         if client.commercial_id != self.collaborator.id:
-            raise Exception('This commercial is not the responsible of this client')
+            raise PermissionDenied('This commercial is not the responsible of this client')
+        self._check_version(client, data)
 
         client.name = data.get('name', client.name)
         client.email = data.get('email', client.email)
@@ -122,32 +351,79 @@ class ClientHandler(BaseHandler):
         client.company_name = data.get('company_name', client.company_name)
         client.last_update = datetime.utcnow()
 
-        try:
-            client.save(self.session)  
-            return client
-        except Exception as e:
-            capture_exception(e)
-            raise
-
 
 class ContractHandler(BaseHandler):
     """
     Handler class for managing contracts.
     """
-    def get_all_contracts(self):
+    def _contracts_query(self):
+        """
+        Builds the base query used by every contract listing.
+
+        Returns:
+            Query over contracts with client and commercial contact eagerly loaded.
         """
-        Retrieves all contracts from the database.
+        return self.session.query(Contract).options(*CONTRACT_LOADS)
+
+    def get_all_contracts(self, after_id=None, limit=None, sort_key='id'):
+        """
+        Retrieves contracts from the database, one page at a time.
         
+        Args:
+            after_id (int): The id of the last contract of the previous page.
+            limit (int): The page size, all remaining contracts when None.
+            sort_key (str): The column to sort on.
+
         Returns:
-            List of all contracts.
+            List of contracts.
         """
         self.token_is_valid()
         try:
-            return self.session.query(Contract).all()
+            return self._paginate(self._contracts_query(), Contract, after_id, limit, sort_key)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def stream_contracts(self, sort_key='id', chunk_size=1000):
+        """
+        Iterates over all contracts without loading them all at once.
+        
+        Args:
+            sort_key (str): The column to sort on.
+            chunk_size (int): The number of contracts fetched per chunk.
+
+        Yields:
+            The contracts, once the token is checked when the iteration starts.
+        """
+        self.token_is_valid()
+        try:
+            yield from self._stream(self._contracts_query(), Contract, sort_key, chunk_size)
         except Exception as e:
             capture_exception(e)
             raise
     
+    def filter_contracts(self, terms=(), sort_key='id', limit=None, after_id=None):
+        """
+        Retrieves the contracts matching every filter term, in one query.
+
+        Args:
+            terms (iterable): Filter terms on Contract.FILTER_KEYS, e.g.
+                'amount_due>0' or ('total_amount', '>=', 1000), see compile_filters.
+            sort_key (str): The column to sort on.
+            limit (int): The maximum number of contracts, all when None.
+            after_id (int): The id of the last contract of the previous page.
+
+        Returns:
+            List of contracts.
+        """
+        self.token_is_valid()
+        try:
+            query = self._contracts_query().filter(*compile_filters(Contract, terms))
+            return self._paginate(query, Contract, after_id, limit, sort_key)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
     def filter_contacts_not_paid(self):
         """
         Retrieves all contracts that are not paid.
@@ -157,7 +433,7 @@ class ContractHandler(BaseHandler):
         """
         self.check_permission("commercial")
         try:
-            return self.session.query(Contract).filter_by(status=False)
+            return self._contracts_query().filter(Contract.status.is_(False)).order_by(Contract.id).all()
         except Exception as e:
             capture_exception(e)
             raise
@@ -175,14 +451,7 @@ class ContractHandler(BaseHandler):
         self.check_permission('gestion')
         
         client = self.session.query(Client).get(data.get('client_id'))
-        
-        contract = Contract(
-            client_id=data.get('client_id'), 
-            commercial_id=client.commercial_id, 
-            total_amount=data.get('total_amount'), 
-            amount_due=data.get('amount_due'), 
-            status=data.get('status')
-        )
+        contract = self._new_contract(data, client)
         
         try:
             contract.save(self.session)
@@ -205,11 +474,113 @@ class ContractHandler(BaseHandler):
         contract = self.session.query(Contract).filter_by(id=contract_id).first()
 
         self.token_is_valid()
-        if self.collaborator.department != 'gestion' and contract.commercial_id != self.collaborator.id:
-            raise Exception('You do not have permission to modify this contract')
+        self._apply_contract_update(contract, data)
+
+        try:
+            contract.save(self.session)
+            return contract
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def mark_contracts_signed(self, contract_ids):
+        """
+        Marks a list of contracts as signed with one UPDATE, see update_contracts.
+        """
+        return self.update_contracts(contract_ids, status=True)
+
+    def mark_contracts_paid(self, contract_ids):
+        """
+        Sets the amount due of a list of contracts to 0 with one UPDATE, see update_contracts.
+        """
+        return self.update_contracts(contract_ids, amount_due=0)
+
+    def adjust_amount_due(self, contract_ids, delta):
+        """
+        Adds delta to the amount due of a list of contracts, kept between 0
+        and the total amount, with one UPDATE, see update_contracts.
+        """
+        return self.update_contracts(contract_ids, amount_due=self._adjusted_amount_due(delta))
+
+    def _adjusted_amount_due(self, delta):
+        """
+        Builds the SQL expression of the amount due plus delta, kept between 0 and the total amount.
+        """
+        # SQLite's two-argument max() and min() are scalar functions.
+        return func.max(0, func.min(Contract.total_amount, Contract.amount_due + delta))
 
+    def update_contracts(self, contract_ids, **values):
+        """
+        Updates a list of contracts with a single UPDATE ... WHERE id IN.
+
+        The permission is checked once: gestion may change every contract,
+        a commercial only their own ones, the others being left out by the
+        WHERE clause instead of being loaded and checked one by one. The
+        version of every updated contract is incremented, so a concurrent
+        read-modify-write of one of them fails with ConcurrentUpdateError.
+
+        Args:
+            contract_ids (iterable): The ids of the contracts.
+            **values: The new value, or SQL expression, of each column.
+
+        Returns:
+            dict: requested and updated counts, see _update_many. The ids
+                missing or not permitted are not updated.
+        """
+        self.token_is_valid()
+        try:
+            return self._update_many(self._contracts_update(values), contract_ids)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def _contracts_update(self, values):
+        """
+        Builds the UPDATE of update_contracts, restricted to the contracts of
+        the current commercial unless they are in gestion.
+        """
+        contracts = Contract.__table__
+        statement = (
+            update(contracts)
+            .where(contracts.c.id.in_(bindparam('ids', expanding=True)))
+            .values(version=contracts.c.version + 1, **values)
+        )
+        if self.collaborator.department != 'gestion':
+            statement = statement.where(contracts.c.commercial_id == self.collaborator.id)
+        return statement
+
+    def _new_contract(self, data, client):
+        """
+        Builds a contract for a client, handled by the client's commercial.
+
+        Raises:
+            NotFound: If the client does not exist.
+        """
+        if not client:
+            raise NotFound('Client not found')
+
+        return Contract(
+            client_id=data.get('client_id'), 
+            commercial_id=client.commercial_id, 
+            total_amount=data.get('total_amount'), 
+            amount_due=data.get('amount_due'), 
+            status=data.get('status')
+        )
+
+    def _apply_contract_update(self, contract, data):
+        """
+        Checks that the current collaborator may modify the contract and applies the update.
+
+        Raises:
+            NotFound: If the contract does not exist.
+            PermissionDenied: If the collaborator is neither in gestion nor its commercial.
+        """
         if not contract:
-            raise Exception('Contract not found')
+            raise NotFound('Contract not found')
+
+        if self.collaborator.department != 'gestion' and contract.commercial_id != self.collaborator.id:
+            raise PermissionDenied('You do not have permission to modify this contract')
+        self._check_version(contract, data)
       
         contract.client_id = data.get('client_id', contract.client_id)
         contract.commercial_id = data.get('commercial_id', contract.commercial_id)
@@ -217,32 +588,83 @@ class ContractHandler(BaseHandler):
         contract.amount_due = data.get('amount_due', contract.amount_due)
         contract.status = data.get('status', contract.status)
 
-        try:
-            contract.save(self.session)
-            return contract
-        except Exception as e:
-            capture_exception(e)
-            raise
-
 
 class EventHandler(BaseHandler):
     """
     Handler class for managing events.
     """
-    def get_all_events(self):
+    def _events_query(self):
         """
-        Retrieves all events from the database.
+        Builds the base query used by every event listing.
+
+        The client and the support contact are loaded in the same joined
+        query, so listings do not issue one extra query per event row.
+
+        Returns:
+            Query over events with client and support contact eagerly loaded.
+        """
+        return self.session.query(Event).options(*EVENT_LOADS).order_by(Event.id)
+
+    def get_all_events(self, after_id=None, limit=None, sort_key='id'):
+        """
+        Retrieves events from the database, one page at a time.
         
+        Args:
+            after_id (int): The id of the last event of the previous page.
+            limit (int): The page size, all remaining events when None.
+            sort_key (str): The column to sort on.
+
         Returns:
-            List of all events.
+            List of events.
+        """
+        self.token_is_valid()
+        try:
+            return self._paginate(self._events_query(), Event, after_id, limit, sort_key)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def stream_events(self, sort_key='id', chunk_size=1000):
+        """
+        Iterates over all events without loading them all at once.
+        
+        Args:
+            sort_key (str): The column to sort on.
+            chunk_size (int): The number of events fetched per chunk.
+
+        Yields:
+            The events, once the token is checked when the iteration starts.
         """
         self.token_is_valid()
         try:
-            return self.session.query(Event).all()
+            yield from self._stream(self._events_query(), Event, sort_key, chunk_size)
         except Exception as e:
             capture_exception(e)
             raise
     
+    def filter_events(self, terms=(), sort_key='id', limit=None, after_id=None):
+        """
+        Retrieves the events matching every filter term, in one query.
+
+        Args:
+            terms (iterable): Filter terms on Event.FILTER_KEYS, e.g.
+                'support_contact_id=null' or ('start_date', '>=', datetime(2025, 1, 1)),
+                see compile_filters.
+            sort_key (str): The column to sort on.
+            limit (int): The maximum number of events, all when None.
+            after_id (int): The id of the last event of the previous page.
+
+        Returns:
+            List of events.
+        """
+        self.token_is_valid()
+        try:
+            query = self._events_query().filter(*compile_filters(Event, terms))
+            return self._paginate(query, Event, after_id, limit, sort_key)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
     def filter_events_without_support(self):
         """
         Retrieves all events without a support contact.
@@ -252,7 +674,7 @@ class EventHandler(BaseHandler):
         """
         self.check_permission('gestion')
         try:
-            return self.session.query(Event).filter_by(support_contact_id=None)
+            return self._events_query().filter(Event.support_contact_id.is_(None)).all()
         except Exception as e:
             capture_exception(e)
             raise
@@ -266,7 +688,7 @@ class EventHandler(BaseHandler):
         """
         self.check_permission('support')
         try:
-            return self.session.query(Event).filter_by(support_contact_id=self.collaborator.id)
+            return self._events_query().filter(Event.support_contact_id == self.collaborator.id).all()
         except Exception as e:
             capture_exception(e)
             raise
@@ -284,18 +706,7 @@ class EventHandler(BaseHandler):
         self.check_permission('commercial')
  
         contract = self.session.query(Contract).get(data.get('contract_id'))
-
-        if contract.commercial_id != self.collaborator.id :
-            raise Exception('You do not have permission to create the event')
-        
-        event = Event(
-            contract_id=data.get('contract_id'),
-            client_id=contract.client_id, 
-            end_date=data.get('end_date'), 
-            location=data.get('location'), 
-            attendees=data.get('attendees'), 
-            notes=data.get('notes')
-        )
+        event = self._new_event(data, contract)
 
         try:
             event.save(self.session)
@@ -304,33 +715,83 @@ class EventHandler(BaseHandler):
             capture_exception(e)
             raise
 
-    def add_support_contact(self, event_id, support_contact_id):
+    def add_support_contact(self, event_id, support_contact_id, allow_overlap=False):
         """
         Adds a support contact to an existing event.
         
         Args:
             event_id (int): The ID of the event.
             support_contact_id (int): The ID of the support contact to add.
+            allow_overlap (bool): Assign even if the support contact has
+                overlapping events, instead of raising SchedulingConflict.
         
         Returns:
             The updated event instance.
+
+        Raises:
+            SchedulingConflict: If the support contact is booked on overlapping events.
         """
         self.check_permission('gestion')
 
         event = self.session.query(Event).filter_by(id=event_id).first()
-
-        if not event:
-            raise Exception('Event not found')
-
         support_contact = self.session.query(Collaborator).filter_by(id=support_contact_id).first()
-
-        if support_contact.department != 'support':
-                raise Exception('Support contact must be in support department')
+        self._check_support_contact(event, support_contact)
+        if not allow_overlap:
+            self._check_overlaps(support_contact_id,
+                                 self.session.scalars(self._overlap_statement(event, support_contact_id)).all())
         
         event.support_contact_id = support_contact_id
-        self.session.commit()
+        commit(self.session)
         return event
 
+    def add_support_contact_many(self, event_ids, support_contact_id, allow_overlap=False):
+        """
+        Assigns one support contact to a list of events with a single
+        UPDATE ... WHERE id IN, the permission and the collaborator being
+        checked once.
+
+        Unless allow_overlap is given, the events are checked against the
+        calendar of the support contact and against each other first.
+
+        Args:
+            event_ids (iterable): The ids of the events.
+            support_contact_id (int): The ID of the support contact.
+            allow_overlap (bool): Assign even if some events overlap.
+
+        Returns:
+            dict: requested and updated counts, see BaseHandler._update_many.
+                The ids of missing events are not updated.
+
+        Raises:
+            SchedulingConflict: If some events overlap, listing the events they overlap.
+        """
+        self.check_permission('gestion')
+        try:
+            support_contact = self.session.get(Collaborator, support_contact_id)
+            if not support_contact:
+                raise NotFound('Support contact not found')
+            if support_contact.department != 'support':
+                raise Exception('Support contact must be in support department')
+
+            event_ids = sorted(set(event_ids))
+            if not allow_overlap:
+                self._check_overlaps(support_contact_id, self._batch_overlaps(self.session, event_ids, support_contact_id))
+            return self._update_many(self._support_update(support_contact_id), event_ids)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def _support_update(self, support_contact_id):
+        """
+        Builds the UPDATE of add_support_contact_many.
+        """
+        events = Event.__table__
+        return (
+            update(events)
+            .where(events.c.id.in_(bindparam('ids', expanding=True)))
+            .values(support_contact_id=support_contact_id, version=events.c.version + 1)
+        )
+
     def update_event(self, event_id, data):
         """
         Updates an existing event in the database.
@@ -345,34 +806,296 @@ class EventHandler(BaseHandler):
         self.check_permission('support')
         
         event = self.session.query(Event).filter_by(id=event_id).first()
+        self._apply_event_update(event, data)
+
+        try:
+            event.save(self.session)
+            return event
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def _new_event(self, data, contract):
+        """
+        Builds an event for a contract of the current commercial.
+
+        Raises:
+            NotFound: If the contract does not exist.
+            PermissionDenied: If it belongs to another commercial.
+        """
+        if not contract:
+            raise NotFound('Contract not found')
+
+        if contract.commercial_id != self.collaborator.id :
+            raise PermissionDenied('You do not have permission to create the event')
         
+        return Event(
+            contract_id=data.get('contract_id'),
+            client_id=contract.client_id, 
+            end_date=data.get('end_date'), 
+            location=data.get('location'), 
+            attendees=data.get('attendees'), 
+            notes=data.get('notes')
+        )
+
+    def _check_support_contact(self, event, support_contact):
+        """
+        Checks that a support contact can be assigned to an event.
+
+        Raises:
+            NotFound: If the event or the collaborator does not exist.
+            Exception: If the collaborator is not in the support department.
+        """
+        if not event:
+            raise NotFound('Event not found')
+
+        if not support_contact:
+            raise NotFound('Support contact not found')
+
+        if support_contact.department != 'support':
+                raise Exception('Support contact must be in support department')
+
+    def scheduling_conflicts(self, limit=CONFLICT_LIMIT):
+        """
+        Finds the pairs of overlapping events of a same support contact.
+
+        The assigned events are read once in schedule index order and swept
+        with a heap of running events, see find_conflicts.
+
+        Args:
+            limit (int): The maximum number of listed pairs, all when None.
+
+        Returns:
+            dict: total (the number of conflicting pairs), by_support_contact
+                (that number by support contact id) and conflicts (dicts with
+                support_contact_id, event_id and other_event_id, the other
+                event being the one starting first, at most limit of them).
+        """
+        self.check_permission('gestion')
+        try:
+            return self._conflict_report(self.session, limit)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def _conflict_report(self, session, limit):
+        """
+        Streams the schedule through find_conflicts, see scheduling_conflicts.
+
+        The session is an argument so that the asyncio handler can run it
+        with AsyncSession.run_sync.
+        """
+        pairs, counts = find_conflicts(session.execute(schedule_statement().execution_options(yield_per=5000)), limit)
+        return {
+            'total': sum(counts.values()),
+            'by_support_contact': counts,
+            'conflicts': [{'support_contact_id': support_contact_id, 'event_id': event_id,
+                           'other_event_id': other_id} for support_contact_id, event_id, other_id in pairs]
+        }
+
+    def auto_assign_support(self, terms=(), dry_run=False):
+        """
+        Assigns the events without support contact to the support department,
+        balancing the number of events of each support contact and never
+        booking one on overlapping events, see plan_assignments.
+
+        The calendars and the unassigned events are read once, from the
+        schedule index, and the plan is written in one transaction by a single
+        prepared UPDATE executed for every assignment. An event assigned in
+        the meantime by someone else is left untouched.
+
+        Args:
+            terms (iterable): Filter terms restricting the events to assign,
+                see compile_filters, e.g. 'start_date>=2025-06-01'.
+            dry_run (bool): Only compute the plan, nothing is written.
+
+        Returns:
+            dict: assignments (dicts with event_id and support_contact_id),
+                unassigned (the ids of the events no support contact is free
+                for), loads (the number of events of every support contact
+                id after the assignment) and updated (the number of events
+                written, 0 on a dry run).
+        """
+        self.check_permission('gestion')
+        try:
+            calendars, assignments, unassigned = self._plan_support(self.session, compile_filters(Event, terms))
+
+            updated = 0
+            if assignments and not dry_run:
+                with self.transaction():
+                    updated = self.session.execute(*self._assignment_update(assignments)).rowcount
+                self.session.expire_all()
+            return self._assignment_report(calendars, assignments, unassigned, updated)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def _plan_support(self, session, conditions):
+        """
+        Reads the calendars and the unassigned events, see auto_assign_support,
+        and plans the assignments.
+
+        The session is an argument so that the asyncio handler can run it
+        with AsyncSession.run_sync.
+
+        Returns:
+            tuple: The calendars by support contact id, the (event_id,
+                support_contact_id) assignments and the unassigned event ids.
+
+        Raises:
+            Exception: If there is no support collaborator.
+        """
+        supports = session.scalars(
+            select(Collaborator.id).where(Collaborator.department == 'support').order_by(Collaborator.id)).all()
+        if not supports:
+            raise Exception('No support collaborator')
+
+        calendars = {support_contact_id: Calendar() for support_contact_id in supports}
+        for support_contact_id, event_id, start, end in session.execute(
+                schedule_statement().execution_options(yield_per=5000)):
+            if support_contact_id in calendars:
+                calendars[support_contact_id].book(start, end, event_id)
+
+        events = session.execute(unassigned_statement(conditions).execution_options(yield_per=5000))
+        assignments, unassigned = plan_assignments(events, calendars)
+        return calendars, assignments, unassigned
+
+    def _assignment_update(self, assignments):
+        """
+        Builds the prepared UPDATE writing a plan and its parameters, an event
+        assigned in the meantime being left untouched.
+
+        Returns:
+            tuple: The statement and the list of its parameters.
+        """
+        events = Event.__table__
+        statement = (
+            update(events)
+            .where(events.c.id == bindparam('event_id'), events.c.support_contact_id.is_(None))
+            .values(support_contact_id=bindparam('support_id'), version=events.c.version + 1)
+        )
+        return statement, [{'event_id': event_id, 'support_id': support_contact_id}
+                           for event_id, support_contact_id in assignments]
+
+    def _assignment_report(self, calendars, assignments, unassigned, updated):
+        """
+        Builds the result of auto_assign_support.
+        """
+        return {
+            'assignments': [{'event_id': event_id, 'support_contact_id': support_contact_id}
+                            for event_id, support_contact_id in assignments],
+            'unassigned': unassigned,
+            'loads': {support_contact_id: len(calendar) for support_contact_id, calendar in calendars.items()},
+            'updated': updated
+        }
+
+    def _overlap_statement(self, event, support_contact_id):
+        """
+        Builds the query of the events of the support contact overlapping the event.
+        """
+        return overlap_statement(support_contact_id, event.start_date, event.end_date or event.start_date, event.id)
+
+    def _batch_overlaps(self, session, event_ids, support_contact_id):
+        """
+        Books the events one after the other in the calendar of the support
+        contact, see Calendar.
+
+        The session is an argument so that the asyncio handler can run it
+        with AsyncSession.run_sync.
+
+        Returns:
+            list: The sorted ids of the events overlapped by another one.
+        """
+        calendar = Calendar()
+        batch = set(event_ids)
+        for _, event_id, start, end in session.execute(
+                schedule_statement().where(Event.support_contact_id == support_contact_id)):
+            if event_id not in batch:
+                calendar.book(start, end, event_id)
+
+        conflicts = set()
+        for start in range(0, len(event_ids), ID_BATCH_SIZE):
+            rows = session.execute(
+                select(Event.id, Event.start_date, Event.end_date)
+                .where(Event.id.in_(event_ids[start:start + ID_BATCH_SIZE]))
+                .order_by(Event.start_date, Event.id))
+            for event_id, event_start, event_end in rows:
+                event_end = event_end or event_start
+                overlapped = set(calendar.overlapping(event_start, event_end))
+                if overlapped:
+                    conflicts.update(overlapped)
+                    conflicts.add(event_id)
+                calendar.book(event_start, event_end, event_id)
+        return sorted(conflicts)
+
+    def _check_overlaps(self, support_contact_id, conflicts):
+        """
+        Refuses the assignment when the support contact has overlapping events.
+
+        Raises:
+            SchedulingConflict: If conflicts is not empty.
+        """
+        if conflicts:
+            raise SchedulingConflict(support_contact_id, list(conflicts))
+
+    def _apply_event_update(self, event, data):
+        """
+        Checks that the current support contact handles the event and applies the update.
+
+        Raises:
+            NotFound: If the event does not exist.
+            PermissionDenied: If it is handled by someone else.
+        """
         if not event:
-            raise Exception('Event not found')
+            raise NotFound('Event not found')
 
         if event.support_contact_id != self.collaborator.id:
-            raise Exception('This support contact is not the responsible of this event') 
+            raise PermissionDenied('This support contact is not the responsible of this event') 
+        self._check_version(event, data)
  
         event.end_date = data.get('end_date', event.end_date)
         event.location = data.get('location', event.location)
         event.attendees = data.get('attendees', event.attendees)
         event.notes = data.get('notes', event.notes)
 
+
+class CollaboratorHandler(BaseHandler):
+    """
+    Handler class for managing collaborators.
+    """    
+    def get_all_collaborators(self, after_id=None, limit=None, sort_key='id'):
+        """
+        Retrieves collaborators from the database, one page at a time.
+
+        Args:
+            after_id (int): The id of the last collaborator of the previous page.
+            limit (int): The page size, all remaining collaborators when None.
+            sort_key (str): The column to sort on.
+
+        Returns:
+            List of collaborators.
+        """
+        self.token_is_valid()
         try:
-            event.save(self.session)
-            return event
+            return self._paginate(self.session.query(Collaborator), Collaborator, after_id, limit, sort_key)
         except Exception as e:
             capture_exception(e)
             raise
 
+    def stream_collaborators(self, sort_key='id', chunk_size=1000):
+        """
+        Iterates over all collaborators without loading them all at once.
 
-class CollaboratorHandler(BaseHandler):
-    """
-    Handler class for managing collaborators.
-    """    
-    def get_all_collaborators(self):
-        self.token_is_valid
+        Args:
+            sort_key (str): The column to sort on.
+            chunk_size (int): The number of collaborators fetched per chunk.
+
+        Yields:
+            The collaborators, once the token is checked when the iteration starts.
+        """
+        self.token_is_valid()
         try:
-            return self.session.query(Collaborator).all()
+            yield from self._stream(self.session.query(Collaborator), Collaborator, sort_key, chunk_size)
         except Exception as e:
             capture_exception(e)
             raise
@@ -396,12 +1119,48 @@ class CollaboratorHandler(BaseHandler):
         )
         collaborator.set_password(data.get('password'))
         self.session.add(collaborator)
-        self.session.commit()
+        commit(self.session)
         return collaborator
     
+    def create_collaborators(self, data_list):
+        """
+        Creates several collaborators in one transaction.
+
+        The passwords are hashed in parallel on the password hasher pool.
+        
+        Args:
+            data_list (list): The collaborator data, one dict per collaborator.
+        
+        Returns:
+            List of the created collaborator instances.
+        """
+        self.check_permission('gestion')
+
+        hashes = password_hasher.hash_many([data.get('password') for data in data_list])
+        collaborators = [
+            Collaborator(
+                name=data.get('name'),
+                email=data.get('email'),
+                department=data.get('department'),
+                password=hashed
+            )
+            for data, hashed in zip(data_list, hashes)
+        ]
+
+        try:
+            with self.transaction():
+                for collaborator in collaborators:
+                    collaborator.save(self.session)
+            return collaborators
+        except Exception as e:
+            capture_exception(e)
+            raise
+    
     def update_collaborator(self, collaborator_id, data):
         """
         Updates an existing collaborator in the database.
+
+        The password is only hashed again when a new one is supplied.
         
         Args:
             collaborator_id (int): The ID of the collaborator to update.
@@ -413,22 +1172,33 @@ class CollaboratorHandler(BaseHandler):
         self.check_permission('gestion')
         
         collaborator = self.session.query(Collaborator).filter_by(id=collaborator_id).first()
-
-        if not collaborator:
-            raise Exception('Collaborator not found')
-        
-        collaborator.name = data.get('name', collaborator.name)
-        collaborator.email = data.get('email', collaborator.email)
-        collaborator.department = data.get('department', collaborator.department)
-        collaborator.set_password(data.get('password', collaborator.password))
+        self._apply_collaborator_update(collaborator, data)
+        password = data.get('password')
+        if password and not collaborator.check_password(password):
+            collaborator.set_password(password)
 
         try:
             collaborator.save(self.session)
+            principal_cache.invalidate(collaborator_id)
             return collaborator
         except Exception as e:
             capture_exception(e)
             raise
 
+    def _apply_collaborator_update(self, collaborator, data):
+        """
+        Applies the update of every field but the password, which is hashed by the caller.
+
+        Raises:
+            NotFound: If the collaborator does not exist.
+        """
+        if not collaborator:
+            raise NotFound('Collaborator not found')
+        
+        collaborator.name = data.get('name', collaborator.name)
+        collaborator.email = data.get('email', collaborator.email)
+        collaborator.department = data.get('department', collaborator.department)
+
     def delete_collaborator(self, collaborator_id):
         """
         Deletes a collaborator from the database.
@@ -444,9 +1214,10 @@ class CollaboratorHandler(BaseHandler):
         collaborator = self.session.query(Collaborator).filter_by(id=collaborator_id).first()
 
         if not collaborator:
-            raise Exception('Collaborator not found')
+            raise NotFound('Collaborator not found')
         
     
         self.session.delete(collaborator)
-        self.session.commit()
+        commit(self.session)
+        principal_cache.invalidate(collaborator_id)
         return {'message': 'Collaborator deleted successfully'}, 200
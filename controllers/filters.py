@@ -0,0 +1,101 @@
+from datetime import datetime
+import operator
+import re
+
+
+FILTER_OPERATORS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+NULL_VALUES = ('null', 'none')
+
+_TERM = re.compile(r'^\s*(\w+)\s*(<=|>=|!=|=|<|>)\s*(.*?)\s*$')
+
+
+def parse_term(expression):
+    """
+    Splits a filter expression such as 'amount_due>0' in its three parts.
+
+    Args:
+        expression (str): '<field> <operator> <value>', operators being those
+            of FILTER_OPERATORS, spaces around the operator being optional.
+
+    Returns:
+        tuple: (field, operator, value), the value left as a string.
+
+    Raises:
+        Exception: If the expression is malformed.
+    """
+    match = _TERM.match(expression)
+    if not match or not match.group(3):
+        raise Exception(f'Invalid filter: {expression!r}, expected <field><operator><value> such as amount_due>0')
+    return match.groups()
+
+
+def _coerce(column, value):
+    """
+    Converts the string value of a filter to the Python type of its column.
+    """
+    if not isinstance(value, str):
+        return value
+    if value.lower() in NULL_VALUES:
+        return None
+    python_type = column.type.python_type
+    try:
+        if python_type is bool:
+            if value.lower() in ('true', 'yes', '1'):
+                return True
+            if value.lower() in ('false', 'no', '0'):
+                return False
+            raise ValueError(value)
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        return python_type(value)
+    except ValueError:
+        raise Exception(f'Invalid value for {column.key}: {value!r}')
+
+
+def compile_filters(model, terms):
+    """
+    Compiles filter terms to SQL conditions on a model.
+
+    Terms are combined with AND in the WHERE clause of the listing query, so
+    rows are filtered by SQLite, through the indexes on the foreign keys, the
+    status and the creation and start dates, instead of after fetching.
+    Only the columns of model.FILTER_KEYS can be filtered on.
+
+    Args:
+        model: The mapped class, Contract or Event.
+        terms (iterable): Expressions such as 'amount_due>0' (see parse_term),
+            or (field, operator, value) tuples whose value may already be
+            typed, e.g. ('start_date', '>=', datetime(2025, 1, 1)). A None
+            value, or 'null', is compared with IS / IS NOT.
+
+    Returns:
+        list: The SQLAlchemy conditions.
+
+    Raises:
+        Exception: If a term is malformed or uses an unknown field, operator or value.
+    """
+    conditions = []
+    for term in terms:
+        field, op, value = parse_term(term) if isinstance(term, str) else term
+        if field not in model.FILTER_KEYS:
+            raise Exception(f"Unknown filter field: {field}, expected one of {', '.join(model.FILTER_KEYS)}")
+        if op not in FILTER_OPERATORS:
+            raise Exception(f'Unknown filter operator: {op}')
+
+        column = getattr(model, field)
+        value = _coerce(column.property.columns[0], value)
+        if value is None:
+            if op not in ('=', '!='):
+                raise Exception(f'Only = and != compare {field} with null')
+            conditions.append(column.is_(None) if op == '=' else column.is_not(None))
+        else:
+            conditions.append(FILTER_OPERATORS[op](column, value))
+    return conditions
@@ -0,0 +1,142 @@
+from models import Client, Collaborator, CommercialRevenue, ClientRevenue, rebuild_revenue
+from models.revenue import REVENUE_KEYS, REVENUE_COLUMNS, recompute_revenue
+from controllers.controllers import BaseHandler
+from controllers.audit import audit_log
+from models.audit import AUDITED_TABLES
+from sqlalchemy import select
+from sentry_sdk import capture_exception
+
+
+# Difference tolerated between a maintained total and the recomputed one,
+# floating point sums depend on the order of the additions.
+REVENUE_TOLERANCE = 0.01
+
+
+class ReportHandler(BaseHandler):
+    """
+    Handler class for the management reports, reserved to the gestion department.
+    """
+    def revenue_by_commercial(self):
+        """
+        Reads the contract totals of every commercial from the maintained
+        summary, without scanning the contracts.
+
+        Returns:
+            List of dicts with commercial_id, name and the totals of REVENUE_COLUMNS,
+            the largest signed total first.
+        """
+        self.check_permission('gestion')
+        statement = (
+            select(CommercialRevenue.commercial_id, Collaborator.name,
+                   *(getattr(CommercialRevenue, column) for column in REVENUE_COLUMNS))
+            .join(Collaborator, Collaborator.id == CommercialRevenue.commercial_id)
+            .order_by(CommercialRevenue.total_signed.desc(), CommercialRevenue.commercial_id)
+        )
+        try:
+            return [dict(row) for row in self.session.execute(statement).mappings()]
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def revenue_by_client(self, commercial_id=None, limit=None):
+        """
+        Reads the contract totals per client from the maintained summary.
+
+        Args:
+            commercial_id (int): Only the clients of this commercial, all when None.
+            limit (int): The maximum number of clients, all when None.
+
+        Returns:
+            List of dicts with client_id, name, commercial_id and the totals of
+            REVENUE_COLUMNS, the largest signed total first.
+        """
+        self.check_permission('gestion')
+        statement = (
+            select(ClientRevenue.client_id, Client.name, Client.commercial_id,
+                   *(getattr(ClientRevenue, column) for column in REVENUE_COLUMNS))
+            .join(Client, Client.id == ClientRevenue.client_id)
+            .order_by(ClientRevenue.total_signed.desc(), ClientRevenue.client_id)
+        )
+        if commercial_id is not None:
+            statement = statement.where(Client.commercial_id == commercial_id)
+        if limit:
+            statement = statement.limit(limit)
+        try:
+            return [dict(row) for row in self.session.execute(statement).mappings()]
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def check_revenue(self):
+        """
+        Compares the maintained summaries with totals recomputed from the contracts.
+
+        Returns:
+            List of dicts with table, key, column, stored and expected for each
+            total that differs by more than REVENUE_TOLERANCE, empty when in sync.
+        """
+        self.check_permission('gestion')
+        try:
+            return self._revenue_differences()
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def rebuild_revenue(self):
+        """
+        Recomputes the summaries from the contracts, set-based, in one transaction.
+
+        Returns:
+            List: The differences found before the rebuild, see check_revenue.
+        """
+        self.check_permission('gestion')
+        try:
+            with self.transaction():
+                differences = self._revenue_differences()
+                rebuild_revenue(self.session.connection())
+            return differences
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def audit_trail(self, table_name=None, row_id=None, limit=50):
+        """
+        Reads the latest changes recorded by the audit log.
+
+        Args:
+            table_name (str): Only the changes of this table, one of AUDITED_TABLES.
+            row_id (int): Only the changes of this row of table_name.
+            limit (int): The maximum number of changes.
+
+        Returns:
+            List of dicts with the AuditEntry columns, the latest first.
+
+        Raises:
+            Exception: If the table is not audited or the audit log is not started.
+        """
+        self.check_permission('gestion')
+        if table_name is not None and table_name not in AUDITED_TABLES:
+            raise Exception(f"Unknown audited table: {table_name}, expected one of {', '.join(AUDITED_TABLES)}")
+        if audit_log.engine is None:
+            raise Exception('The audit log is not started')
+        try:
+            return audit_log.entries(table_name, row_id, limit)
+        except Exception as e:
+            capture_exception(e)
+            raise
+
+    def _revenue_differences(self):
+        connection = self.session.connection()
+        differences = []
+        for table, key in REVENUE_KEYS.items():
+            stored = {row[0]: row[1:] for row in connection.exec_driver_sql(
+                f"SELECT {key}, {', '.join(REVENUE_COLUMNS)} FROM {table}")}
+            expected = recompute_revenue(connection, table)
+            for value in sorted(stored.keys() | expected.keys()):
+                have = stored.get(value, (0,) * len(REVENUE_COLUMNS))
+                want = expected.get(value, (0,) * len(REVENUE_COLUMNS))
+                for column, stored_total, expected_total in zip(REVENUE_COLUMNS, have, want):
+                    if abs(stored_total - expected_total) > REVENUE_TOLERANCE:
+                        differences.append({'table': table, 'key': value, 'column': column,
+                                            'stored': stored_total, 'expected': expected_total})
+        return differences
@@ -0,0 +1,199 @@
+from models import Event
+from sqlalchemy import select
+import bisect
+import heapq
+
+
+CONFLICT_LIMIT = 1000
+
+
+class SchedulingConflict(Exception):
+    """
+    Raised when a support contact would be booked on overlapping events.
+
+    Attributes:
+        conflicts (list): The ids of the events overlapping the assigned one.
+    """
+    def __init__(self, support_contact_id, conflicts):
+        super().__init__(f"Support contact {support_contact_id} is already booked on overlapping events: "
+                         f"{', '.join(str(event_id) for event_id in conflicts)}")
+        self.support_contact_id = support_contact_id
+        self.conflicts = conflicts
+
+
+def overlaps(start, end, other_start, other_end):
+    """
+    Tells whether two [start, end) periods overlap, an event ending when
+    another one starts does not overlap it.
+    """
+    return start < other_end and other_start < end
+
+
+def overlap_statement(support_contact_id, start, end, exclude_id=None):
+    """
+    Builds the query of the events of a support contact overlapping a period.
+
+    The conditions match the (support_contact_id, start_date, end_date)
+    index, so only the entries of that support contact starting before the
+    end of the period are read, from the index alone.
+
+    Args:
+        support_contact_id (int): The support contact.
+        start (datetime): The start of the period.
+        end (datetime): The end of the period.
+        exclude_id (int): An event to leave out, usually the one being assigned.
+
+    Returns:
+        Select: The statement selecting the overlapping event ids, by start date.
+    """
+    statement = (
+        select(Event.id)
+        .where(Event.support_contact_id == support_contact_id, Event.start_date < end, Event.end_date > start)
+        .order_by(Event.start_date, Event.id)
+    )
+    if exclude_id is not None:
+        statement = statement.where(Event.id != exclude_id)
+    return statement
+
+
+def schedule_statement():
+    """
+    Builds the query of every assigned event, in (support contact, start date)
+    order, the order of the schedule index, so no sort is needed.
+    """
+    return (
+        select(Event.support_contact_id, Event.id, Event.start_date, Event.end_date)
+        .where(Event.support_contact_id.is_not(None), Event.end_date.is_not(None))
+        .order_by(Event.support_contact_id, Event.start_date, Event.id)
+    )
+
+
+def find_conflicts(rows, limit=None):
+    """
+    Finds the pairs of overlapping events of a same support contact.
+
+    A sweep over the events sorted by start date: a min-heap keeps the end
+    dates of the events still running, those ended before the current start
+    are popped and the remaining ones all overlap it. Counting the pairs is
+    O(n log n) for n events, listing them adds one step per listed pair, so
+    the listing is capped by limit.
+
+    Args:
+        rows (iterable): (support_contact_id, event_id, start, end) tuples,
+            sorted by support contact then start date, see schedule_statement.
+        limit (int): The maximum number of listed pairs, all when None.
+
+    Returns:
+        tuple: The list of (support_contact_id, event_id, other_event_id)
+            pairs, the other event being the one that started first, and the
+            dict of the number of pairs by support contact.
+    """
+    pairs, counts = [], {}
+    current, running = None, []
+    for support_contact_id, event_id, start, end in rows:
+        if support_contact_id != current:
+            current, running = support_contact_id, []
+        while running and running[0][0] <= start:
+            heapq.heappop(running)
+        if running:
+            counts[support_contact_id] = counts.get(support_contact_id, 0) + len(running)
+            if limit is None or len(pairs) < limit:
+                others = sorted(other_id for _, other_id in running)
+                pairs.extend((support_contact_id, event_id, other_id) for other_id in others)
+        heapq.heappush(running, (end, event_id))
+    return (pairs if limit is None else pairs[:limit]), counts
+
+
+class Calendar:
+    """
+    The booked periods of a support contact, sorted by start date.
+
+    A period can only overlap [start, end) if it starts before end and less
+    than the longest booked period before start, so a free slot is checked
+    with a bisect and a scan of the few periods in that window.
+    """
+    def __init__(self):
+        self.periods = []
+        self.longest = None
+
+    def __len__(self):
+        return len(self.periods)
+
+    def book(self, start, end, event_id):
+        """
+        Adds the [start, end) period of an event.
+        """
+        bisect.insort(self.periods, (start, end, event_id))
+        if self.longest is None or end - start > self.longest:
+            self.longest = end - start
+
+    def overlapping(self, start, end):
+        """
+        Yields the ids of the booked events overlapping [start, end), latest first.
+        """
+        index = bisect.bisect_left(self.periods, (end,))
+        while index > 0:
+            index -= 1
+            period_start, period_end, event_id = self.periods[index]
+            if period_start <= start - self.longest:
+                break
+            if overlaps(start, end, period_start, period_end):
+                yield event_id
+
+    def is_free(self, start, end):
+        """
+        Tells whether [start, end) overlaps none of the booked periods.
+        """
+        return next(self.overlapping(start, end), None) is None
+
+
+def plan_assignments(events, calendars):
+    """
+    Assigns events to support contacts, balancing their number of events.
+
+    A greedy on a min-heap of (load, support_contact_id): every event, by
+    start date, goes to the least loaded support contact free during it,
+    those popped because busy being pushed back afterwards. Planning n events
+    for s support contacts is O(n log s) when most of them are free, each
+    calendar check being a bisect, see Calendar.
+
+    Args:
+        events (iterable): (event_id, start, end) tuples of the events to
+            assign, by start date. An event without end only lasts its start.
+        calendars (dict): The Calendar of every support contact id, the
+            planned events being booked in it.
+
+    Returns:
+        tuple: The list of (event_id, support_contact_id) assignments and the
+            list of the ids of the events no support contact is free for.
+    """
+    loads = [(len(calendar), support_contact_id) for support_contact_id, calendar in calendars.items()]
+    heapq.heapify(loads)
+    assignments, unassigned = [], []
+    for event_id, start, end in events:
+        end = end or start
+        busy = []
+        while loads and not calendars[loads[0][1]].is_free(start, end):
+            busy.append(heapq.heappop(loads))
+        if loads:
+            load, support_contact_id = loads[0]
+            calendars[support_contact_id].book(start, end, event_id)
+            heapq.heapreplace(loads, (load + 1, support_contact_id))
+            assignments.append((event_id, support_contact_id))
+        else:
+            unassigned.append(event_id)
+        for entry in busy:
+            heapq.heappush(loads, entry)
+    return assignments, unassigned
+
+
+def unassigned_statement(conditions=()):
+    """
+    Builds the query of the events without support contact, by start date,
+    read from the schedule index.
+    """
+    return (
+        select(Event.id, Event.start_date, Event.end_date)
+        .where(Event.support_contact_id.is_(None), *conditions)
+        .order_by(Event.start_date, Event.id)
+    )
@@ -0,0 +1,65 @@
+from models import SEARCH_KINDS, match_expression
+from models.search import SEARCH_TABLE, SEARCH_SOURCES
+from controllers.controllers import BaseHandler
+from sqlalchemy import bindparam, text
+from sentry_sdk import capture_exception
+
+
+SEARCH_LIMIT = 20
+
+SNIPPET_TOKENS = 8
+
+_SEARCH_SQL = (
+    f"SELECT kind, rowid / {len(SEARCH_SOURCES)} AS id, name, "
+    f"snippet({SEARCH_TABLE}, 2, '[', ']', '...', {SNIPPET_TOKENS}) AS snippet, rank "
+    f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query"
+)
+
+
+class SearchHandler(BaseHandler):
+    """
+    Handler class for the full-text search over clients, events and collaborators.
+    """
+    def search(self, query, kinds=None, limit=SEARCH_LIMIT):
+        """
+        Finds the clients, events and collaborators matching every word of a
+        query, each word being a prefix, best matches first.
+
+        Clients are matched on their name, email and company, events on their
+        location and notes, collaborators on their name. The index is kept
+        in sync by triggers, see models.search.
+
+        Args:
+            query (str): The searched words, e.g. 'dup par'.
+            kinds (list): Kinds among SEARCH_KINDS to restrict the search to, all when None.
+            limit (int): The maximum number of results.
+
+        Returns:
+            List of dicts with kind, id, name, snippet (the matching details,
+            matches between brackets) and rank (lower is better).
+
+        Raises:
+            Exception: If a kind is unknown.
+        """
+        self.token_is_valid()
+        for kind in kinds or ():
+            if kind not in SEARCH_KINDS:
+                raise Exception(f'Unknown search kind: {kind}')
+
+        expression = match_expression(query)
+        if expression is None:
+            return []
+
+        sql = _SEARCH_SQL
+        parameters = {'query': expression, 'limit': limit}
+        if kinds:
+            sql += " AND kind IN :kinds"
+            parameters['kinds'] = list(kinds)
+        statement = text(sql + " ORDER BY rank LIMIT :limit")
+        if kinds:
+            statement = statement.bindparams(bindparam('kinds', expanding=True))
+        try:
+            return [dict(row) for row in self.session.execute(statement, parameters).mappings()]
+        except Exception as e:
+            capture_exception(e)
+            raise
@@ -0,0 +1,230 @@
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from sqlalchemy import func, insert, select
+from models import Client, Contract, Event, Collaborator
+from models.revenue import deferred_revenue
+from models.search import deferred_search_index
+from models.passwords import password_hasher
+import math
+import random
+
+
+DEPARTMENTS = ('commercial', 'gestion', 'support')
+
+DISTRIBUTIONS = ('fixed', 'uniform', 'poisson')
+
+SEED_BATCH_SIZE = 50_000
+
+SEED_START = datetime(2024, 1, 1)
+
+SEED_DAYS = 730
+
+CITIES = ('Paris', 'Lyon', 'Marseille', 'Bordeaux', 'Lille', 'Nantes', 'Toulouse', 'Nice', 'Strasbourg', 'Rennes')
+
+VENUES = ('Hall', 'Hotel', 'Garden', 'Theatre', 'Castle', 'Loft', 'Beach club', 'Museum')
+
+COMPANY_SUFFIXES = ('SA', 'SAS', 'SARL', 'Group', 'Events', 'Partners')
+
+
+def draw_count(rng, mean, distribution):
+    """
+    Draws how many children a row gets, e.g. contracts per client.
+
+    Args:
+        rng (Random): The random generator.
+        mean (float): The average count.
+        distribution (str): 'fixed' rounds the mean, 'uniform' draws between 0
+            and twice the mean, 'poisson' follows a Poisson law of that mean.
+
+    Returns:
+        int: The count.
+    """
+    if distribution == 'fixed':
+        return round(mean)
+    if distribution == 'uniform':
+        return int(rng.random() * (round(2 * mean) + 1))
+    # Knuth's algorithm, the means used here are small.
+    limit = math.exp(-mean)
+    count, product = 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def skewed_picker(rng, population, skew):
+    """
+    Builds a function drawing members of a population, the first ones being
+    more likely when skew > 0 (Zipf-like weights 1 / rank ** skew).
+
+    Returns:
+        callable: Draws k members, picker(k) -> list.
+    """
+    if not skew:
+        size = len(population)
+        return lambda k: [population[int(rng.random() * size)] for _ in range(k)]
+    cum_weights = list(accumulate(1 / rank ** skew for rank in range(1, len(population) + 1)))
+    return lambda k: rng.choices(population, cum_weights=cum_weights, k=k)
+
+
+def _next_id(connection, model):
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _timestamp(moment):
+    """
+    Formats a datetime the way the SQLite DateTime type stores it.
+    """
+    return moment.isoformat(' ', 'microseconds')
+
+
+def _write(connection, table, columns, rows, batch_size):
+    """
+    Inserts generated rows with executemany INSERTs of batch_size rows.
+
+    The INSERT is compiled once from the table and the rows are plain tuples
+    already in storage format, so no per-row parameter processing happens
+    between the generator and the driver.
+
+    Args:
+        connection: The database connection.
+        table (Table): The table to fill.
+        columns (tuple): The column names, in table order, of the row tuples.
+        rows (iterable): The row tuples.
+        batch_size (int): The number of rows per INSERT.
+
+    Returns:
+        int: The number of inserted rows.
+    """
+    compiled = insert(table).compile(dialect=connection.dialect, column_keys=list(columns))
+    if tuple(compiled.positiontup) != tuple(columns):
+        raise Exception(f'Seed columns of {table.name} must follow the table order: {compiled.positiontup}')
+    statement = str(compiled)
+
+    count = 0
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return count
+        connection.exec_driver_sql(statement, batch)
+        count += len(batch)
+
+
+def seed(connection, collaborators=30, clients=1000, contracts_per_client=1.5, events_per_contract=1.0,
+         distribution='poisson', skew=0.0, signed_ratio=0.7, paid_ratio=0.4, unassigned_ratio=0.25,
+         password='password', random_seed=0, batch_size=SEED_BATCH_SIZE):
+    """
+    Generates referentially consistent collaborators, clients, contracts and events.
+
+    Rows are appended after the existing ones with Core executemany INSERTs,
+    the caller owns the transaction. The new rows are added to the search
+    index and the revenue summaries at the end, see deferred_search_index
+    and deferred_revenue. Every collaborator gets the same
+    password, hashed once. Contracts belong to the commercial of their client,
+    events to signed contracts and to the client of their contract, support
+    contacts are support collaborators.
+
+    Args:
+        connection: The database connection, inside a transaction.
+        collaborators (int): The number of collaborators, spread over the departments.
+        clients (int): The number of clients.
+        contracts_per_client (float): The average number of contracts per client.
+        events_per_contract (float): The average number of events per signed contract.
+        distribution (str): How the per-row counts are drawn, see draw_count.
+        skew (float): How much the first commercials and support contacts are
+            favoured, 0 spreads rows evenly, 1 is a Zipf law.
+        signed_ratio (float): The share of signed contracts.
+        paid_ratio (float): The share of fully paid contracts among the signed ones.
+        unassigned_ratio (float): The share of events without support contact.
+        password (str): The password of every collaborator.
+        random_seed (int): The seed making the data reproducible.
+        batch_size (int): The number of rows per INSERT.
+
+    Returns:
+        dict: The number of inserted rows per table.
+
+    Raises:
+        Exception: If the distribution is unknown or a department would be empty.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise Exception(f'Unknown distribution: {distribution}')
+    if collaborators < len(DEPARTMENTS):
+        raise Exception(f'At least {len(DEPARTMENTS)} collaborators are needed, one per department.')
+
+    with deferred_search_index(connection), deferred_revenue(connection):
+        rng = random.Random(random_seed)
+        hashed = password_hasher.hash(password)
+        counts = {}
+
+        first_id = _next_id(connection, Collaborator)
+        departments = {department: [] for department in DEPARTMENTS}
+        for collaborator_id in range(first_id, first_id + collaborators):
+            departments[DEPARTMENTS[collaborator_id % len(DEPARTMENTS)]].append(collaborator_id)
+        department_of = {collaborator_id: department
+                         for department, ids in departments.items() for collaborator_id in ids}
+        counts['collaborators'] = _write(connection, Collaborator.__table__, ('id', 'name', 'email', 'department', 'password'), (
+            (collaborator_id, f'Collaborator {collaborator_id}', f'collaborator{collaborator_id}@epicevents.com',
+             department_of[collaborator_id], hashed)
+            for collaborator_id in range(first_id, first_id + collaborators)
+        ), batch_size)
+
+        pick_commercials = skewed_picker(rng, departments['commercial'], skew)
+        pick_supports = skewed_picker(rng, departments['support'], skew)
+        draw = rng.random
+        # Dates fall on whole hours, formatting each one once is much cheaper than
+        # formatting a datetime per row.
+        hours = SEED_DAYS * 24
+        stamps = [_timestamp(SEED_START + timedelta(hours=hour)) for hour in range(hours + 4 * 24)]
+
+        first_client_id = _next_id(connection, Client)
+        client_commercials = pick_commercials(clients)
+
+        def client_rows():
+            for offset, commercial_id in enumerate(client_commercials):
+                client_id = first_client_id + offset
+                yield (client_id, f'Client {client_id}', f'client{client_id}@example.com',
+                       f'+33{int(draw() * 10 ** 9):09d}',
+                       f'Company {client_id % 5000} {COMPANY_SUFFIXES[client_id % len(COMPANY_SUFFIXES)]}',
+                       stamps[offset % hours], commercial_id)
+        counts['clients'] = _write(connection, Client.__table__, ('id', 'name', 'email', 'telephone', 'company_name',
+                                                                  'creation_date', 'commercial_id'),
+                                   client_rows(), batch_size)
+
+        first_contract_id = _next_id(connection, Contract)
+        signed_contracts = []
+
+        def contract_rows():
+            contract_id = first_contract_id
+            for offset, commercial_id in enumerate(client_commercials):
+                client_id = first_client_id + offset
+                creation_date = stamps[offset % hours]
+                for _ in range(draw_count(rng, contracts_per_client, distribution)):
+                    cents = 50_000 + int(draw() * 4_950_000)
+                    signed = draw() < signed_ratio
+                    paid = signed and draw() < paid_ratio
+                    if signed:
+                        signed_contracts.append((contract_id, client_id))
+                    yield (contract_id, client_id, commercial_id, cents / 100,
+                           0.0 if paid else cents * (10 + int(draw() * 90)) // 100 / 100, creation_date, signed)
+                    contract_id += 1
+        counts['contracts'] = _write(connection, Contract.__table__, ('id', 'client_id', 'commercial_id', 'total_amount',
+                                                                      'amount_due', 'creation_date', 'status'),
+                                     contract_rows(), batch_size)
+
+        first_event_id = _next_id(connection, Event)
+
+        def event_rows():
+            event_id = first_event_id
+            for contract_id, client_id in signed_contracts:
+                for _ in range(draw_count(rng, events_per_contract, distribution)):
+                    start = int(draw() * SEED_DAYS) * 24 + 8 + int(draw() * 12)
+                    yield (event_id, contract_id, client_id, stamps[start], stamps[start + 2 + int(draw() * 70)],
+                           None if draw() < unassigned_ratio else pick_supports(1)[0],
+                           f'{VENUES[event_id % len(VENUES)]} {CITIES[int(draw() * len(CITIES))]}',
+                           10 + int(draw() * 490), f'Event {event_id} of contract {contract_id}')
+                    event_id += 1
+        counts['events'] = _write(connection, Event.__table__, ('id', 'contract_id', 'client_id', 'start_date', 'end_date',
+                                                                'support_contact_id', 'location', 'attendees', 'notes'),
+                                  event_rows(), batch_size)
+    return counts
@@ -0,0 +1,116 @@
+from contextlib import asynccontextmanager, contextmanager
+from functools import wraps
+from models import ConcurrentUpdateError
+
+
+CONFLICT_RETRIES = 3
+
+
+@contextmanager
+def transaction_scope(session):
+    """
+    Groups every write made inside the block into a single commit.
+
+    While a scope is open, model saves and handler writes only flush. The
+    outermost scope commits when the block ends and rolls everything back if
+    it raises. A nested scope is a SAVEPOINT: if its block raises, only its
+    own writes are undone and the exception propagates, so the caller can
+    catch it and go on with the rest of the unit of work.
+
+    Args:
+        session (Session): The database session.
+
+    Yields:
+        Session: The same session.
+    """
+    depth = session.info.get('transaction_depth', 0)
+    session.info['transaction_depth'] = depth + 1
+    try:
+        if depth:
+            with session.begin_nested():
+                yield session
+        else:
+            try:
+                yield session
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+    finally:
+        session.info['transaction_depth'] = depth
+
+
+def transactional(method):
+    """
+    Decorator running a handler method inside a transaction scope on the
+    handler session, so all its writes are committed together.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with transaction_scope(self.session):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def retry_on_conflict(function, *args, attempts=CONFLICT_RETRIES, **kwargs):
+    """
+    Calls a handler write, again when it fails with ConcurrentUpdateError.
+
+    The failed write was rolled back and the handler reads the row again on
+    every call, so a retry applies the change on top of the concurrent one
+    instead of overwriting it. Only meant for writes computed from the row
+    itself: values a user typed after reading an older version must be
+    confirmed again instead, see views.output.update_with_version. A write
+    given an explicit version keeps failing until the caller reads the row
+    again.
+
+    Args:
+        function: The handler method, e.g. handler.update_client.
+        *args: Its arguments.
+        attempts (int): The maximum number of calls.
+        **kwargs: Its keyword arguments.
+
+    Returns:
+        The result of the first call that succeeds.
+
+    Raises:
+        ConcurrentUpdateError: If every attempt conflicted.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return function(*args, **kwargs)
+        except ConcurrentUpdateError:
+            if attempt == attempts:
+                raise
+
+
+@asynccontextmanager
+async def async_transaction_scope(session):
+    """
+    Asynchronous counterpart of transaction_scope for an AsyncSession.
+
+    The depth is kept in the info of the underlying synchronous session, so
+    model saves made through the async handlers see the same scopes.
+
+    Args:
+        session (AsyncSession): The asynchronous database session.
+
+    Yields:
+        AsyncSession: The same session.
+    """
+    info = session.sync_session.info
+    depth = info.get('transaction_depth', 0)
+    info['transaction_depth'] = depth + 1
+    try:
+        if depth:
+            async with session.begin_nested():
+                yield session
+        else:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+    finally:
+        info['transaction_depth'] = depth
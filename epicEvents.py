@@ -1,130 +1,70 @@
 import click
-from views import (login as login_view, register as register_view, 
-                   show_clients, add_client, update_client,
-                   show_contracts, add_contract,update_contract, filter_contracts,
-                   show_events, add_event, add_support_contact, update_event, filter_events_ws, filter_my_events,
-                   show_collaborators, add_collaborator, update_collaborator, delete_collaborator)
-from config.database import init_db
-import sentry_sdk
+import importlib
+from config.profiles import ENGINE_PROFILES, DEFAULT_PROFILE
 
-sentry_sdk.init(
-    dsn="https://6d33421778aa9658ef2b700b7467561c@o4507471152349184.ingest.de.sentry.io/4507471164473424",
-    # Set traces_sample_rate to 1.0 to capture 100%
-    # of transactions for performance monitoring.
-    traces_sample_rate=1.0,
-    # Set profiles_sample_rate to 1.0 to profile 100%
-    # of sampled transactions.
-    # We recommend adjusting this value in production.
-    profiles_sample_rate=1.0,
-)
 
-init_db()
+# Command name -> (module:attribute, short help). A command module, and the
+# views, database engine and telemetry it pulls in, is only imported when
+# the command runs, so --help and mistyped commands return right away. The
+# short help mirrors the short_help of the command, tests/test_startup.py
+# checks they match.
+COMMANDS = {
+    'auto-assign': ('commands.assign:auto_assign_command', "Command to assign the events without support contact."),
+    'register': ('commands.auth:register_command', "Command to register a new user."),
+    'login': ('commands.auth:login_command', "Command to initiate user login."),
+    'report': ('commands.report:report_command', "Command to show the management reports."),
+    'run': ('commands.repl:run', "Main command to run the Epic Events application."),
+    'batch': ('commands.batch:batch_command', "Command to update many events or contracts at once."),
+    'filter': ('commands.filter:filter_command', "Command to list the contracts or events matching filters."),
+    'import': ('commands.bulk:import_command', "Command to bulk import clients, contracts or events."),
+    'export': ('commands.bulk:export_command', "Command to export clients, contracts and events."),
+    'serve': ('commands.serve:serve_command', "Command to serve the handlers as a JSON API."),
+    'search': ('commands.search:search_command', "Command to find clients, events and collaborators."),
+    'seed': ('commands.seed:seed_command', "Command to fill the database with generated data."),
+    'stats': ('commands.stats:stats_command', "Command to show the call metrics of the handlers and views."),
+}
 
 
-@click.group()
-def cli():
+class LazyGroup(click.Group):
     """
-    Command-line interface for managing Epic Events application.
-
-    Includes commands for user registration, login, and managing clients,
-    contracts, events, and collaborators.
+    Click group importing its commands on first use, see COMMANDS.
     """
-    pass
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
 
-@click.command(name='login')
-def login_command():
-    """
-    Command to initiate user login.
-    """
-    login_view()
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
 
-@click.command(name='register')
-def register_command():
-    """
-    Command to register a new user.
-    """
-    register_view()
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_name, attribute = self.lazy_commands[cmd_name][0].split(':')
+            self.add_command(getattr(importlib.import_module(module_name), attribute), cmd_name)
+        return super().get_command(ctx, cmd_name)
 
-@click.command()
-def run():
-    """
-    Main command to run the Epic Events application.
-    """
-    try:
-        with open('token.txt', 'r') as f:
-            token = f.read()
+    def format_commands(self, ctx, formatter):
+        """
+        Lists the commands with their registered help, without importing them.
+        """
+        rows = [(name, self.lazy_commands[name][1]) for name in sorted(self.lazy_commands)]
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
 
-        while True:
-            commands = [
-                "add_client",
-                "update_client",
-                "view_clients",
-                "add_contract",
-                "update_contract",
-                "view_contracts",
-                "add_event",
-                "add_support_contact",
-                "filter_contracts",
-                "update_event",
-                "view_events",
-                "filter_events_ws",
-                "filter_my_events",
-                "add_collaborator",
-                "update_collaborator",
-                "delete_collaborator",
-                "view_collaborators",
-                "exit"
-            ]
 
-            command = click.prompt(
-                f"Enter a command ({', '.join(commands)})", 
-                type=str
-            )
-           
-            if command == 'exit':
-                break
-            elif command == 'view_clients':
-                show_clients(token)
-            elif command == 'add_client':
-                add_client(token)
-            elif command == 'update_client':
-                update_client(token)
-            elif command == 'view_contracts':
-                show_contracts(token)
-            elif command == 'add_contract':
-                add_contract(token)
-            elif command == 'update_contract':
-                update_contract(token)
-            elif command == 'filter_contracts':
-                filter_contracts(token)
-            elif command == 'view_events':
-                show_events(token)
-            elif command == 'add_event':
-                add_event(token)
-            elif command == 'add_support_contact':
-                add_support_contact(token)
-            elif command == 'update_event':
-                update_event(token)
-            elif command == 'filter_events_ws':
-                filter_events_ws(token)
-            elif command == 'filter_my_events':
-                filter_my_events(token)
-            elif command == 'view_collaborators':
-                show_collaborators(token)
-            elif command == 'add_collaborator':
-                add_collaborator(token)
-            elif command == 'update_collaborator':
-                update_collaborator(token)
-            elif command == 'delete_collaborator':
-                delete_collaborator(token)
-            else:
-                click.echo("Unknown command.")
-    except FileNotFoundError:
-        click.echo("Please login first.")
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS)
+@click.option('--db-profile', type=click.Choice(list(ENGINE_PROFILES)), default=DEFAULT_PROFILE, show_default=True,
+              help="SQLite tuning profile, also read from EPICEVENTS_DB_PROFILE.")
+@click.option('--sql-profile', is_flag=True,
+              help="Print the query count, timings, repeated statements and plans after each command.")
+def cli(db_profile, sql_profile):
+    """
+    Command-line interface for managing Epic Events application.
+
+    Includes commands for user registration, login, and managing clients,
+    contracts, events, and collaborators.
+    """
 
-cli.add_command(register_command, name='register')
-cli.add_command(login_command, name='login')
-cli.add_command(run)
 
 if __name__ == '__main__':
-    cli()
\ No newline at end of file
+    cli()
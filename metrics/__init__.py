@@ -0,0 +1,3 @@
+from .registry import MetricsRegistry, Histogram, metrics, METRICS_FILE, locked_metrics_file
+
+__all__ = [MetricsRegistry, Histogram, metrics, METRICS_FILE, locked_metrics_file]
@@ -0,0 +1,396 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+import inspect
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows locks the files with msvcrt instead.
+    fcntl = None
+    import msvcrt
+
+
+# Latency bucket upper bounds in seconds, doubling from 0.1 ms to 26 s.
+LATENCY_BUCKETS = tuple(0.0001 * 2 ** i for i in range(19))
+
+PERCENTILES = (50, 95, 99)
+
+METRICS_FILE = os.environ.get('EPICEVENTS_METRICS_FILE', 'metrics.json')
+
+
+@contextmanager
+def locked_metrics_file(path):
+    """
+    Holds an exclusive lock on a metrics file, waiting for the other processes.
+
+    The lock is taken on a separate path.lock file, the metrics file itself
+    being replaced by every flush.
+
+    Args:
+        path (str): The JSON metrics file.
+    """
+    with open(f'{path}.lock', 'a+b') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class Histogram:
+    """
+    Fixed bucket histogram of latencies.
+
+    Recording is a bisect and an increment, so it can stay on in production;
+    percentiles are estimated by interpolating inside the matching bucket.
+    Histograms with the same buckets add up, which lets runs be merged.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Initializes an empty histogram.
+
+        Args:
+            buckets (tuple): The sorted bucket upper bounds, in seconds.
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """
+        Records one value.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        Estimates a percentile of the recorded values.
+
+        Args:
+            percent (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The estimated value, 0 when nothing was recorded.
+        """
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def merge(self, other):
+        """
+        Adds the values of another histogram with the same buckets.
+        """
+        if tuple(other.buckets) != self.buckets:
+            raise ValueError("Only histograms with the same buckets can be merged.")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts), 'count': self.count,
+                'sum': self.sum, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data['buckets'])
+        histogram.counts = list(data['counts'])
+        histogram.count = data['count']
+        histogram.sum = data['sum']
+        histogram.max = data['max']
+        return histogram
+
+
+def _rows(result):
+    """
+    Counts the rows of a returned listing, None for other results.
+    """
+    return len(result) if isinstance(result, (list, tuple)) else None
+
+
+class MetricsRegistry:
+    """
+    In-process registry of call counters, error counters, returned rows and
+    latency histograms, keyed by kind ('handler', 'view', ...) and operation.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}
+
+    def _entry(self, kind, operation):
+        key = (kind, operation)
+        entry = self._operations.get(key)
+        if entry is None:
+            entry = self._operations[key] = {'calls': 0, 'errors': 0, 'rows': 0, 'latency': Histogram()}
+        return entry
+
+    def record(self, kind, operation, seconds, rows=None, error=False):
+        """
+        Records one call of an operation.
+
+        Args:
+            kind (str): The layer of the operation, e.g. 'handler' or 'view'.
+            operation (str): The operation name, e.g. 'ClientHandler.create_client'.
+            seconds (float): The duration of the call.
+            rows (int): The number of returned rows, if the call returned a listing.
+            error (bool): Whether the call raised.
+        """
+        with self._lock:
+            entry = self._entry(kind, operation)
+            entry['calls'] += 1
+            if error:
+                entry['errors'] += 1
+            if rows:
+                entry['rows'] += rows
+            entry['latency'].observe(seconds)
+
+    def timed(self, operation, kind='view'):
+        """
+        Decorator recording the calls of a function, coroutine function or
+        generator function.
+
+        A generator is timed over its whole iteration, only the time spent
+        producing its items being counted, not the consumer's work between
+        them. Its rows are the yielded items. A generator that is never
+        iterated records nothing.
+
+        Args:
+            operation (str): The operation name.
+            kind (str): The layer of the operation.
+        """
+        def decorator(function):
+            if inspect.iscoroutinefunction(function):
+                @wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        result = await function(*args, **kwargs)
+                    except BaseException:
+                        self.record(kind, operation, time.perf_counter() - start, error=True)
+                        raise
+                    self.record(kind, operation, time.perf_counter() - start, _rows(result))
+                    return result
+                return async_wrapper
+
+            if inspect.isgeneratorfunction(function):
+                @wraps(function)
+                def generator_wrapper(*args, **kwargs):
+                    generator = function(*args, **kwargs)
+                    seconds, rows, error = 0.0, 0, False
+                    try:
+                        while True:
+                            start = time.perf_counter()
+                            try:
+                                item = next(generator)
+                            except StopIteration:
+                                return
+                            except BaseException:
+                                error = True
+                                raise
+                            finally:
+                                seconds += time.perf_counter() - start
+                            rows += 1
+                            yield item
+                    finally:
+                        generator.close()
+                        self.record(kind, operation, seconds, rows, error)
+                return generator_wrapper
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = function(*args, **kwargs)
+                except BaseException:
+                    self.record(kind, operation, time.perf_counter() - start, error=True)
+                    raise
+                self.record(kind, operation, time.perf_counter() - start, _rows(result))
+                return result
+            return wrapper
+        return decorator
+
+    def instrument(self, cls, kind='handler', exclude=()):
+        """
+        Times every public method defined by a class.
+
+        Args:
+            cls (type): The class to instrument.
+            kind (str): The layer of the operations.
+            exclude (iterable): Method names left untouched.
+        """
+        for name, value in list(vars(cls).items()):
+            if name.startswith('_') or name in exclude or not inspect.isfunction(value):
+                continue
+            setattr(cls, name, self.timed(f'{cls.__name__}.{name}', kind)(value))
+        return cls
+
+    def snapshot(self, reset=False):
+        """
+        Copies the current values.
+
+        Args:
+            reset (bool): Also forget them, in the same critical section.
+
+        Returns:
+            dict: {'kind:operation': {'calls', 'errors', 'rows', 'latency'}}
+                  with the latency as a Histogram.
+        """
+        with self._lock:
+            if reset:
+                operations, self._operations = self._operations, {}
+                return {f'{kind}:{operation}': entry for (kind, operation), entry in operations.items()}
+            return {f'{kind}:{operation}': {**entry, 'latency': Histogram.from_dict(entry['latency'].to_dict())}
+                    for (kind, operation), entry in self._operations.items()}
+
+    def merge(self, snapshot):
+        """
+        Adds the values of a snapshot, see snapshot and load.
+        """
+        with self._lock:
+            for key, values in snapshot.items():
+                entry = self._entry(*key.split(':', 1))
+                entry['calls'] += values['calls']
+                entry['errors'] += values['errors']
+                entry['rows'] += values['rows']
+                entry['latency'].merge(values['latency'])
+
+    def reset(self):
+        """
+        Forgets every recorded value.
+        """
+        with self._lock:
+            self._operations.clear()
+
+    def summary(self):
+        """
+        Summarizes each operation, slowest p95 first.
+
+        Returns:
+            list: Dicts with kind, operation, calls, errors, rows, p50, p95,
+                  p99 and max, latencies in seconds.
+        """
+        rows = []
+        for key, entry in self.snapshot().items():
+            kind, operation = key.split(':', 1)
+            latency = entry['latency']
+            row = {'kind': kind, 'operation': operation, 'calls': entry['calls'], 'errors': entry['errors'],
+                   'rows': entry['rows']}
+            row.update({f'p{percent}': latency.percentile(percent) for percent in PERCENTILES})
+            row['max'] = latency.max
+            rows.append(row)
+        return sorted(rows, key=lambda row: row['p95'], reverse=True)
+
+    def to_json(self):
+        """
+        Serializes the registry, percentiles included, see load.
+        """
+        data = {}
+        for key, entry in self.snapshot().items():
+            latency = entry['latency']
+            data[key] = {'calls': entry['calls'], 'errors': entry['errors'], 'rows': entry['rows'],
+                         'latency': latency.to_dict(),
+                         **{f'p{percent}': latency.percentile(percent) for percent in PERCENTILES}}
+        return json.dumps(data, indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """
+        Formats the registry in the Prometheus text exposition format.
+        """
+        families = {}
+        for key, entry in sorted(self.snapshot().items()):
+            kind, operation = key.split(':', 1)
+            label = f'operation="{operation}"'
+            prefix = f'epicevents_{kind}'
+            families.setdefault((f'{prefix}_calls_total', 'counter'), []).append(f'{prefix}_calls_total{{{label}}} {entry["calls"]}')
+            families.setdefault((f'{prefix}_errors_total', 'counter'), []).append(f'{prefix}_errors_total{{{label}}} {entry["errors"]}')
+            families.setdefault((f'{prefix}_rows_total', 'counter'), []).append(f'{prefix}_rows_total{{{label}}} {entry["rows"]}')
+            latency = entry['latency']
+            lines = families.setdefault((f'{prefix}_latency_seconds', 'histogram'), [])
+            cumulative = 0
+            for bound, count in zip(latency.buckets, latency.counts):
+                cumulative += count
+                lines.append(f'{prefix}_latency_seconds_bucket{{{label},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{prefix}_latency_seconds_bucket{{{label},le="+Inf"}} {latency.count}')
+            lines.append(f'{prefix}_latency_seconds_sum{{{label}}} {latency.sum}')
+            lines.append(f'{prefix}_latency_seconds_count{{{label}}} {latency.count}')
+
+        output = []
+        for (name, metric_type), lines in families.items():
+            output.append(f'# TYPE {name} {metric_type}')
+            output.extend(lines)
+        return '\n'.join(output) + '\n'
+
+    def flush(self, path=METRICS_FILE):
+        """
+        Moves the recorded values to a metrics file.
+
+        The values are taken out of the registry under its lock, so a call
+        recorded by another thread during the flush is kept for the next one,
+        and they are put back if writing the file fails. The file is replaced
+        atomically, so a reader never sees half of it, and the read, merge and
+        replace run under an exclusive file lock, so commands exiting at the
+        same time do not lose each other's values.
+
+        Args:
+            path (str): The JSON metrics file.
+        """
+        if not path:
+            return
+        flushed = self.snapshot(reset=True)
+        try:
+            with locked_metrics_file(path):
+                stored = MetricsRegistry.load(path)
+                stored.merge(flushed)
+                temporary = f'{path}.{os.getpid()}.tmp'
+                with open(temporary, 'w', encoding='utf-8') as f:
+                    f.write(stored.to_json())
+                os.replace(temporary, path)
+        except BaseException:
+            self.merge(flushed)
+            raise
+
+    @classmethod
+    def load(cls, path=METRICS_FILE):
+        """
+        Reads a metrics file written by flush.
+
+        Returns:
+            MetricsRegistry: The stored values, empty if the file does not exist.
+        """
+        registry = cls()
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            registry.merge({key: {**values, 'latency': Histogram.from_dict(values['latency'])}
+                            for key, values in data.items()})
+        return registry
+
+
+metrics = MetricsRegistry()
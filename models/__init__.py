@@ -1,3 +1,11 @@
-from .models import Client, Contract, Event, Collaborator, ValidationError, Base
+from .models import (Client, Contract, Event, Collaborator, ValidationError, NotFound, PermissionDenied, TokenExpired,
+                     ConcurrentUpdateError, Base, commit)
+from .search import SEARCH_KINDS, create_search_index, rebuild_search_index, match_expression
+from .revenue import CommercialRevenue, ClientRevenue, REVENUE_TABLES, create_revenue_triggers, rebuild_revenue
+from .audit import AuditBase, AuditEntry
 
-__all__ = [Client, Contract, Event, Collaborator, ValidationError, Base]
+__all__ = [Client, Contract, Event, Collaborator, ValidationError, NotFound, PermissionDenied, TokenExpired,
+           ConcurrentUpdateError, Base, commit,
+           SEARCH_KINDS, create_search_index, rebuild_search_index, match_expression,
+           CommercialRevenue, ClientRevenue, REVENUE_TABLES, create_revenue_triggers, rebuild_revenue,
+           AuditBase, AuditEntry]
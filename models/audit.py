@@ -0,0 +1,53 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, event
+from sqlalchemy.orm import declarative_base
+
+
+# The audit log has its own metadata, it lives in a separate database file
+# so that its writes never wait for the lock of the main database.
+AuditBase = declarative_base()
+
+AUDITED_TABLES = ('clients', 'contracts', 'events', 'collaborators')
+
+
+class AuditEntry(AuditBase):
+    """
+    One recorded change of a client, contract, event or collaborator.
+
+    Attributes:
+        recorded_at (datetime): When the change was flushed, in UTC.
+        collaborator_id (int): The collaborator whose session made it, None when unknown.
+        table_name (str): The changed table.
+        row_id (int): The changed row.
+        action (str): insert, update or delete.
+        changes (str): JSON object of the [before, after] values of every
+            changed column.
+    """
+    __tablename__ = 'audit_log'
+    id = Column(Integer, primary_key=True)
+    recorded_at = Column(DateTime, nullable=False)
+    collaborator_id = Column(Integer)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer)
+    action = Column(String, nullable=False)
+    changes = Column(Text, nullable=False)
+
+    __table_args__ = (Index('ix_audit_log_row', table_name, row_id),)
+
+
+def create_audit_triggers(connection):
+    """
+    Makes the audit log append-only: updating or deleting an entry aborts.
+
+    Args:
+        connection: The audit database connection.
+    """
+    for operation in ('UPDATE', 'DELETE'):
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS audit_log_no_{operation.lower()} BEFORE {operation} ON audit_log "
+            f"BEGIN SELECT RAISE(ABORT, 'The audit log is append-only'); END")
+
+
+@event.listens_for(AuditBase.metadata, 'after_create')
+def _create_audit_triggers(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        create_audit_triggers(connection)
@@ -1,8 +1,11 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Index, func
 from datetime import datetime, timedelta
 from sqlalchemy.orm import relationship
-import bcrypt
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.exc import OperationalError
+from models.passwords import password_hasher
+from metrics import metrics
 import jwt
 import os
 import re
@@ -12,6 +15,87 @@ class ValidationError(Exception):
     pass
 
 
+class NotFound(Exception):
+    """
+    Raised when a client, contract, event or collaborator does not exist.
+    """
+
+
+class PermissionDenied(Exception):
+    """
+    Raised when the collaborator may not run an operation or change a record.
+    """
+
+
+class TokenExpired(Exception):
+    """
+    Raised when a handler is used with an expired or invalid token.
+    """
+
+
+class ConcurrentUpdateError(Exception):
+    """
+    Raised when a client, contract or event was changed by another session
+    since it was read. The write is rolled back, so reading the row again and
+    retrying is safe, see controllers.transaction.retry_on_conflict.
+    """
+    retryable = True
+
+    def __init__(self, message='This record was changed by someone else since it was read, reload it and try again.'):
+        super().__init__(message)
+
+
+# Extended SQLite result code of a write attempted from a WAL snapshot older
+# than the last commit of another connection.
+SQLITE_BUSY_SNAPSHOT = 517
+
+
+def is_write_conflict(error):
+    """
+    Tells whether a flush failed because another session changed the rows.
+
+    Either the version compared by the UPDATE did not match any more, or, in
+    WAL mode, another connection committed after this transaction started
+    reading, which SQLite refuses before the version is even compared.
+
+    Args:
+        error (Exception): The error raised by the flush.
+
+    Returns:
+        bool: True when reading again and retrying can succeed.
+    """
+    if isinstance(error, StaleDataError):
+        return True
+    return (isinstance(error, OperationalError)
+            and getattr(error.orig, 'sqlite_errorcode', None) == SQLITE_BUSY_SNAPSHOT)
+
+
+def commit(session):
+    """
+    Commits the session, or only flushes it when the current writes are
+    grouped in a transaction scope (see controllers.transaction), in which
+    case the scope commits once at its end.
+
+    The UPDATE of a versioned row only matches the version that was read, a
+    row changed in the meantime raises ConcurrentUpdateError, see
+    is_write_conflict.
+
+    Args:
+        session (Session): The database session.
+    """
+    try:
+        if session.info.get('transaction_depth'):
+            session.flush()
+        else:
+            session.commit()
+    except (StaleDataError, OperationalError) as e:
+        if not is_write_conflict(e):
+            raise
+        if not session.info.get('transaction_depth'):
+            session.rollback()
+        raise ConcurrentUpdateError() from e
+
+
 Base = declarative_base()
 
 
@@ -24,8 +108,10 @@ class Client(Base):
         name (str): The name of the client.
         email (str): The email address of the client.
         telephone (str): The telephone number of the client.
+        version (int): Incremented by every update, compared on write.
     """
     __tablename__ = 'clients'
+    SORT_KEYS = ('id', 'name', 'creation_date')
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     email = Column(String, nullable=False)
@@ -33,11 +119,16 @@ class Client(Base):
     company_name = Column(String, nullable=False)
     creation_date = Column(DateTime, default=datetime.utcnow)
     last_update = Column(DateTime)
-    commercial_id = Column(Integer, ForeignKey('collaborators.id'), nullable=False)
+    commercial_id = Column(Integer, ForeignKey('collaborators.id'), nullable=False, index=True)
+    version = Column(Integer, nullable=False, server_default='1')
 
+    commercial = relationship('Collaborator', foreign_keys=[commercial_id])
     contracts = relationship('Contract', back_populates='client')
     events = relationship('Event', back_populates='client')
 
+    # Every ORM UPDATE checks and increments the version, see ConcurrentUpdateError.
+    __mapper_args__ = {'version_id_col': version}
+
     def validate(self):
         """
         Validates the client's information.
@@ -74,7 +165,7 @@ class Client(Base):
         """
         self.validate()
         session.add(self)
-        session.commit()
+        commit(session)
 
     def __repr__(self):
         return f'Client {self.name}'
@@ -86,17 +177,23 @@ class Contract(Base):
 
     """
     __tablename__ = 'contracts'
+    SORT_KEYS = ('id', 'creation_date', 'total_amount', 'amount_due')
+    FILTER_KEYS = ('total_amount', 'amount_due', 'status', 'client_id', 'commercial_id', 'creation_date')
     id = Column(Integer, primary_key=True)
-    client_id = Column(Integer, ForeignKey('clients.id'), nullable=False)
-    commercial_id = Column(Integer, ForeignKey('collaborators.id'), nullable=False)
+    client_id = Column(Integer, ForeignKey('clients.id'), nullable=False, index=True)
+    commercial_id = Column(Integer, ForeignKey('collaborators.id'), nullable=False, index=True)
     total_amount = Column(Float, nullable=False)
     amount_due = Column(Float, nullable=False)
-    creation_date = Column(DateTime, default=datetime.utcnow)
-    status = Column(Boolean, nullable=False)
+    creation_date = Column(DateTime, default=datetime.utcnow, index=True)
+    status = Column(Boolean, nullable=False, index=True)
+    version = Column(Integer, nullable=False, server_default='1')
 
     client = relationship('Client', back_populates='contracts')
+    commercial = relationship('Collaborator', foreign_keys=[commercial_id])
     events = relationship('Event', back_populates='contract')
 
+    __mapper_args__ = {'version_id_col': version}
+
     def validate(self):
         """
         Validates the contract's information.
@@ -133,7 +230,7 @@ class Contract(Base):
         """
         self.validate()
         session.add(self)
-        session.commit()
+        commit(session)
     
 
 class Event(Base):
@@ -142,18 +239,28 @@ class Event(Base):
 
     """
     __tablename__ = 'events'
+    SORT_KEYS = ('id', 'start_date', 'end_date')
+    FILTER_KEYS = ('contract_id', 'client_id', 'support_contact_id', 'start_date', 'end_date', 'attendees')
     id = Column(Integer, primary_key=True)
-    contract_id = Column(Integer, ForeignKey('contracts.id'), nullable=False)
-    client_id = Column(Integer, ForeignKey('clients.id'), nullable=False)
-    start_date = Column(DateTime, default=datetime.utcnow)
+    contract_id = Column(Integer, ForeignKey('contracts.id'), nullable=False, index=True)
+    client_id = Column(Integer, ForeignKey('clients.id'), nullable=False, index=True)
+    start_date = Column(DateTime, default=datetime.utcnow, index=True)
     end_date = Column(DateTime)
-    support_contact_id = Column(Integer, ForeignKey('collaborators.id'), nullable=True)
+    support_contact_id = Column(Integer, ForeignKey('collaborators.id'), nullable=True, index=True)
     location = Column(String, nullable=False)
     attendees = Column(Integer, nullable=False)
     notes = Column(String)
+    version = Column(Integer, nullable=False, server_default='1')
 
     client = relationship('Client', back_populates='events')
     contract = relationship('Contract', back_populates='events')
+    support_contact = relationship('Collaborator', foreign_keys=[support_contact_id])
+
+    __table_args__ = (
+        # Covers the overlap checks of a support contact's schedule.
+        Index('ix_events_support_schedule', support_contact_id, start_date, end_date),
+    )
+    __mapper_args__ = {'version_id_col': version}
 
     def validate(self):
         """
@@ -173,8 +280,6 @@ class Event(Base):
         if not isinstance(self.end_date, datetime):
             errors.append("End date must be a valid datetime object.")
         
-        print(self.start_date)
-        print(self.end_date)
         #if self.start_date >= self.end_date:
         #    errors.append("Start date must be before end date.")
         
@@ -196,7 +301,7 @@ class Event(Base):
         """
         self.validate()
         session.add(self)
-        session.commit()
+        commit(session)
     
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'my_secret_key')
@@ -207,11 +312,16 @@ class Collaborator(Base):
 
     """
     __tablename__= 'collaborators'
+    SORT_KEYS = ('id', 'name')
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     email = Column(String, nullable=False)
     department = Column(String, nullable=False)
     password = Column(String, nullable=False)
+
+    __table_args__ = (
+        Index('ix_collaborators_email_lower', func.lower(email), unique=True),
+    )
     
     def set_password(self, password):
         """
@@ -220,8 +330,7 @@ class Collaborator(Base):
         Args:
             password (str): The password to be hashed and set.
         """
-        salt = bcrypt.gensalt()
-        self.password = bcrypt.hashpw(password.encode('utf-8'), salt)
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password):
         """
@@ -233,7 +342,7 @@ class Collaborator(Base):
         Returns:
             bool: True if the password matches, False otherwise.
         """
-        return bcrypt.checkpw(password.encode('utf-8'), self.password)    
+        return password_hasher.verify(password, self.password)
 
     def create_token(self):
         """
@@ -286,12 +395,16 @@ class Collaborator(Base):
         self.department = department
         self.set_password(password)
         session.add(self)
-        session.commit()
+        commit(session)
         return self
 
+    @metrics.timed('Collaborator.authenticate', kind='model')
     def authenticate(self, session, email, password):
         """
         Authenticates a collaborator.
+
+        A password hashed with another cost than the configured one is
+        hashed again with the current cost on a successful login.
         
         Args:
             session (Session): The database session.
@@ -301,8 +414,11 @@ class Collaborator(Base):
         Returns:
             str/None: The generated JWT token if authentication is successful, None otherwise.
         """
-        collaborator = session.query(Collaborator).filter_by(email=email).first()
+        collaborator = session.query(Collaborator).filter(func.lower(Collaborator.email) == email.lower()).first()
         if collaborator and collaborator.check_password(password):
+            if password_hasher.needs_rehash(collaborator.password):
+                collaborator.set_password(password)
+                commit(session)
             return collaborator.create_token()
         else:
             return None
@@ -340,7 +456,7 @@ class Collaborator(Base):
         """
         self.validate()
         session.add(self)
-        session.commit()
+        commit(session)
 
     def __repr__(self):
         return f'Collaborator {self.name}'
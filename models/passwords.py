@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+import os
+import time
+
+
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+
+HASH_WORKERS = int(os.environ.get('BCRYPT_WORKERS', os.cpu_count() or 1))
+
+
+def _as_bytes(value):
+    """
+    Encodes str values, stored hashes may come back from the database as text.
+    """
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies collaborator passwords with bcrypt.
+
+    bcrypt releases the GIL while hashing, so hashes submitted to the thread
+    pool run in parallel on every core.
+    """
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=HASH_WORKERS):
+        """
+        Initializes the hasher.
+
+        Args:
+            rounds (int): The bcrypt cost factor, between 4 and 31.
+            workers (int): The number of hashing threads.
+        """
+        if not 4 <= rounds <= 31:
+            raise ValueError("bcrypt rounds must be between 4 and 31.")
+        self.rounds = rounds
+        self.workers = workers
+        self._executor = None
+
+    @property
+    def executor(self):
+        """
+        The hashing thread pool, created on first use.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+        return self._executor
+
+    def hash(self, password):
+        """
+        Hashes a password with the configured cost.
+
+        Args:
+            password (str): The password to hash.
+
+        Returns:
+            bytes: The bcrypt hash.
+        """
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds))
+
+    def hash_async(self, password):
+        """
+        Hashes a password on the thread pool.
+
+        Returns:
+            Future: The future bcrypt hash.
+        """
+        return self.executor.submit(self.hash, password)
+
+    def hash_many(self, passwords):
+        """
+        Hashes several passwords in parallel.
+
+        Args:
+            passwords (list): The passwords to hash.
+
+        Returns:
+            list: The hashes, in the order of the passwords.
+        """
+        return list(self.executor.map(self.hash, passwords))
+
+    def verify(self, password, hashed):
+        """
+        Checks a password against a stored hash.
+
+        Returns:
+            bool: True if the password matches.
+        """
+        return bcrypt.checkpw(password.encode('utf-8'), _as_bytes(hashed))
+
+    def cost(self, hashed):
+        """
+        Reads the cost factor of a stored hash, e.g. 12 for b'$2b$12$...'.
+        """
+        return int(_as_bytes(hashed).split(b'$')[2])
+
+    def needs_rehash(self, hashed):
+        """
+        Tells whether a stored hash was made with another cost than the
+        configured one.
+        """
+        return self.cost(hashed) != self.rounds
+
+
+password_hasher = PasswordHasher()
+
+
+def benchmark(rounds_list=range(4, 15), duration=1.0, workers=HASH_WORKERS):
+    """
+    Measures the hashing throughput for several cost factors.
+
+    Args:
+        rounds_list (iterable): The cost factors to measure.
+        duration (float): The minimum measuring time per cost and mode, in seconds.
+        workers (int): The number of threads of the parallel mode.
+
+    Returns:
+        list: (rounds, sequential hashes/sec, parallel hashes/sec) triples.
+    """
+    results = []
+    for rounds in rounds_list:
+        hasher = PasswordHasher(rounds, workers)
+        rates = []
+        for hash_batch in (lambda: [hasher.hash('password')], lambda: hasher.hash_many(['password'] * workers)):
+            count = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < duration:
+                count += len(hash_batch())
+            rates.append(count / (time.perf_counter() - start))
+        results.append((rounds, rates[0], rates[1]))
+    return results
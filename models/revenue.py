@@ -0,0 +1,163 @@
+from contextlib import contextmanager
+from sqlalchemy import Column, Integer, Float, ForeignKey, event
+from .models import Base
+
+
+class CommercialRevenue(Base):
+    """
+    Contract totals of a commercial, maintained by triggers on contracts.
+
+    Attributes:
+        commercial_id (int): The commercial the totals belong to.
+        contracts (int): The number of contracts.
+        signed_contracts (int): The number of signed contracts.
+        total_signed (float): The total amount of the signed contracts.
+        total_due (float): The amount still due on the signed contracts.
+    """
+    __tablename__ = 'revenue_by_commercial'
+    commercial_id = Column(Integer, ForeignKey('collaborators.id'), primary_key=True)
+    contracts = Column(Integer, nullable=False, default=0)
+    signed_contracts = Column(Integer, nullable=False, default=0)
+    total_signed = Column(Float, nullable=False, default=0.0)
+    total_due = Column(Float, nullable=False, default=0.0)
+
+
+class ClientRevenue(Base):
+    """
+    Contract totals of a client, maintained by triggers on contracts, see CommercialRevenue.
+    """
+    __tablename__ = 'revenue_by_client'
+    client_id = Column(Integer, ForeignKey('clients.id'), primary_key=True)
+    contracts = Column(Integer, nullable=False, default=0)
+    signed_contracts = Column(Integer, nullable=False, default=0)
+    total_signed = Column(Float, nullable=False, default=0.0)
+    total_due = Column(Float, nullable=False, default=0.0)
+
+
+REVENUE_TABLES = (CommercialRevenue.__table__, ClientRevenue.__table__)
+
+# Summary table -> the contracts column it groups by.
+REVENUE_KEYS = {'revenue_by_commercial': 'commercial_id', 'revenue_by_client': 'client_id'}
+
+REVENUE_COLUMNS = ('contracts', 'signed_contracts', 'total_signed', 'total_due')
+
+# Contribution of one contract row to each column, the row being 'new', 'old'
+# or the contracts table itself.
+_CONTRIBUTIONS = (
+    "1",
+    "({row}.status != 0)",
+    "CASE WHEN {row}.status THEN {row}.total_amount ELSE 0 END",
+    "CASE WHEN {row}.status THEN {row}.amount_due ELSE 0 END",
+)
+
+_TRIGGERED_COLUMNS = ('client_id', 'commercial_id', 'total_amount', 'amount_due', 'status')
+
+
+def _upsert(table, row, sign):
+    """
+    Adds (sign 1) or removes (sign -1) the contribution of a contract row.
+    """
+    key = REVENUE_KEYS[table]
+    values = ', '.join(f"{sign} * {contribution.format(row=row)}" for contribution in _CONTRIBUTIONS)
+    updates = ', '.join(f"{column} = {column} + excluded.{column}" for column in REVENUE_COLUMNS)
+    return (f"INSERT INTO {table}({key}, {', '.join(REVENUE_COLUMNS)}) VALUES ({row}.{key}, {values}) "
+            f"ON CONFLICT({key}) DO UPDATE SET {updates};")
+
+
+def _aggregate(table, where=''):
+    """
+    Adds the contributions of the contracts matching where, grouped in one statement.
+    """
+    key = REVENUE_KEYS[table]
+    sums = ', '.join(f"sum({contribution.format(row='contracts')})" for contribution in _CONTRIBUTIONS)
+    updates = ', '.join(f"{column} = {column} + excluded.{column}" for column in REVENUE_COLUMNS)
+    # WHERE true keeps ON CONFLICT from being parsed as a join constraint.
+    return (f"INSERT INTO {table}({key}, {', '.join(REVENUE_COLUMNS)}) "
+            f"SELECT {key}, {sums} FROM contracts WHERE {where or 'true'} GROUP BY {key} "
+            f"ON CONFLICT({key}) DO UPDATE SET {updates}")
+
+
+def _revenue_triggers():
+    """
+    The statements creating the triggers keeping the summary tables in sync.
+    """
+    insert = ' '.join(_upsert(table, 'new', 1) for table in REVENUE_KEYS)
+    delete = ' '.join(_upsert(table, 'old', -1) for table in REVENUE_KEYS)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS contracts_revenue_insert AFTER INSERT ON contracts BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS contracts_revenue_update AFTER UPDATE OF {', '.join(_TRIGGERED_COLUMNS)} "
+        f"ON contracts BEGIN {delete} {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS contracts_revenue_delete AFTER DELETE ON contracts BEGIN {delete} END",
+    ]
+
+
+def create_revenue_triggers(connection):
+    """
+    Creates the triggers updating the revenue summaries on every contract
+    insert, update and delete, ORM or Core. Existing triggers are kept.
+
+    Args:
+        connection: The database connection.
+    """
+    for statement in _revenue_triggers():
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_revenue(connection):
+    """
+    Recomputes the revenue summaries from the contracts, one grouped
+    INSERT ... SELECT per summary table.
+
+    Args:
+        connection: The database connection.
+    """
+    for table in REVENUE_KEYS:
+        connection.exec_driver_sql(f"DELETE FROM {table}")
+        connection.exec_driver_sql(_aggregate(table))
+
+
+def recompute_revenue(connection, table):
+    """
+    Computes the totals of a summary table from the contracts, without storing them.
+
+    Args:
+        connection: The database connection.
+        table (str): The summary table, a key of REVENUE_KEYS.
+
+    Returns:
+        dict: The tuple of REVENUE_COLUMNS totals by commercial or client id.
+    """
+    key = REVENUE_KEYS[table]
+    sums = ', '.join(f"coalesce(sum({contribution.format(row='contracts')}), 0)" for contribution in _CONTRIBUTIONS)
+    rows = connection.exec_driver_sql(f"SELECT {key}, {sums} FROM contracts GROUP BY {key}")
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+@contextmanager
+def deferred_revenue(connection):
+    """
+    Suspends the insert trigger of the summaries during a bulk load. The
+    contracts inserted in the block are added at its end with one grouped
+    statement per summary table.
+
+    Args:
+        connection: The database connection, inside a transaction.
+    """
+    exists = connection.exec_driver_sql(
+        "SELECT count(*) FROM sqlite_master WHERE name = 'contracts_revenue_insert'").scalar()
+    if not exists:
+        yield
+        return
+
+    start = connection.exec_driver_sql("SELECT coalesce(max(id), 0) FROM contracts").scalar()
+    connection.exec_driver_sql("DROP TRIGGER contracts_revenue_insert")
+    yield
+    for table in REVENUE_KEYS:
+        connection.exec_driver_sql(_aggregate(table, f"id > {start}"))
+    create_revenue_triggers(connection)
+
+
+@event.listens_for(Base.metadata, 'after_create')
+def _create_revenue_triggers(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        create_revenue_triggers(connection)
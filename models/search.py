@@ -0,0 +1,142 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from .models import Base
+import re
+
+
+SEARCH_TABLE = 'search_index'
+
+# Kind -> (table, rowid code, name expression, details expression). The index
+# rowid is id * len(SEARCH_SOURCES) + code, so the triggers find the entry of
+# a row through the rowid instead of scanning the index.
+SEARCH_SOURCES = {
+    'client': ('clients', 0, "{row}.name", "{row}.email || ' ' || {row}.company_name"),
+    'event': ('events', 1, "coalesce({row}.location, '')", "coalesce({row}.notes, '')"),
+    'collaborator': ('collaborators', 2, "{row}.name", "''"),
+}
+
+SEARCH_KINDS = tuple(SEARCH_SOURCES)
+
+# Columns weights of bm25: a match in the name ranks above one in the details.
+SEARCH_RANK = 'bm25(0.0, 10.0, 1.0)'
+
+_TOKEN = re.compile(r'\w+')
+
+
+def _search_ddl():
+    """
+    The statements creating the index, its ranking and its triggers.
+    """
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "kind UNINDEXED, name, details, prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', '{SEARCH_RANK}')",
+    ]
+    sources = len(SEARCH_SOURCES)
+    for kind, (table, code, name, details) in SEARCH_SOURCES.items():
+        new = {'name': name.format(row='new'), 'details': details.format(row='new')}
+        columns = sorted({column for expression in (name, details)
+                          for column in re.findall(r'\{row\}\.(\w+)', expression)})
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {SEARCH_TABLE}(rowid, kind, name, details) "
+            f"VALUES (new.id * {sources} + {code}, '{kind}', {new['name']}, {new['details']}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN "
+            f"UPDATE {SEARCH_TABLE} SET name = {new['name']}, details = {new['details']} "
+            f"WHERE rowid = new.id * {sources} + {code}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * {sources} + {code}; END",
+        ]
+    return statements
+
+
+def create_search_index(connection):
+    """
+    Creates the full-text index and the triggers keeping it in sync with the
+    clients, events and collaborators. Existing objects are left as they are.
+
+    Args:
+        connection: The database connection.
+    """
+    for statement in _search_ddl():
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_search_index(connection):
+    """
+    Refills the full-text index from the indexed tables, one INSERT ... SELECT
+    per table.
+
+    Args:
+        connection: The database connection.
+    """
+    connection.exec_driver_sql(f"DELETE FROM {SEARCH_TABLE}")
+    for kind in SEARCH_SOURCES:
+        connection.exec_driver_sql(_index_select(kind))
+    connection.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def _index_select(kind, where=''):
+    table, code, name, details = SEARCH_SOURCES[kind]
+    return (f"INSERT INTO {SEARCH_TABLE}(rowid, kind, name, details) "
+            f"SELECT id * {len(SEARCH_SOURCES)} + {code}, '{kind}', {name.format(row=table)}, "
+            f"{details.format(row=table)} FROM {table}{where}")
+
+
+@contextmanager
+def deferred_search_index(connection):
+    """
+    Suspends the insert triggers of the index during a bulk load. The rows
+    inserted in the block are indexed when it ends, with one INSERT ... SELECT
+    per table, which is several times faster than a trigger per row.
+
+    SQLite DDL is transactional, the triggers come back with a rollback.
+
+    Args:
+        connection: The database connection, inside a transaction.
+    """
+    exists = connection.exec_driver_sql(
+        "SELECT count(*) FROM sqlite_master WHERE name = ?", (SEARCH_TABLE,)).scalar()
+    if not exists:
+        yield
+        return
+
+    starts = {}
+    for kind, (table, *_) in SEARCH_SOURCES.items():
+        starts[kind] = connection.exec_driver_sql(f"SELECT coalesce(max(id), 0) FROM {table}").scalar()
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table}_search_insert")
+    yield
+    for kind, start in starts.items():
+        connection.exec_driver_sql(_index_select(kind, f" WHERE id > {start}"))
+    create_search_index(connection)
+
+
+def match_expression(text):
+    """
+    Converts free text to an FTS5 query matching every word as a prefix.
+
+    Words are quoted, so characters that are FTS5 operators in the text,
+    such as '-', '"' or 'OR', are searched literally.
+
+    Args:
+        text (str): The searched text, e.g. 'dup par'.
+
+    Returns:
+        str: The MATCH expression, e.g. '"dup"* "par"*', None without any word.
+    """
+    words = _TOKEN.findall(text or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+@event.listens_for(Base.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        create_search_index(connection)
+
+
+@event.listens_for(Base.metadata, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
@@ -1,13 +1,20 @@
+import os
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from models import Base
-from controllers import ClientHandler, ContractHandler, EventHandler, CollaboratorHandler
+from config.database import enable_savepoints
+from controllers.cache import principal_cache
+from controllers import ClientHandler, ContractHandler, EventHandler, CollaboratorHandler, ImportHandler, ExportHandler, SearchHandler, ReportHandler
 from click.testing import CliRunner
 
 @pytest.fixture(scope='module')
 def engine():
-    return create_engine('sqlite:///:memory:', echo=True)
+    engine = create_engine('sqlite:///:memory:', echo=True)
+    enable_savepoints(engine)
+    return engine
 
 @pytest.fixture(scope='module')
 def tables(engine):
@@ -22,6 +29,12 @@ def session(engine, tables):
     yield session
     session.close()
 
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
 @pytest.fixture
 def runner():
     return CliRunner()
@@ -72,4 +85,51 @@ def collaborator_handler(session, monkeypatch):
     monkeypatch.setattr(handler, "check_permission", lambda department: True)
     monkeypatch.setattr(handler, "collaborator", type('obj', (object,), {'id': 1, 'department': 'gestion'}))
     
-    return handler
\ No newline at end of file
+    return handler
+
+@pytest.fixture
+def import_handler(session, monkeypatch):
+    token = "dummy_token"
+    
+    handler = ImportHandler(session=session, token=token)
+    
+    monkeypatch.setattr(handler, "token_is_valid", lambda: True)
+    monkeypatch.setattr(handler, "check_permission", lambda department: True)
+    monkeypatch.setattr(handler, "collaborator", type('obj', (object,), {'id': 1, 'department': 'gestion'}))
+    
+    return handler
+
+@pytest.fixture
+def export_handler(session, monkeypatch):
+    token = "dummy_token"
+    
+    handler = ExportHandler(session=session, token=token)
+    
+    monkeypatch.setattr(handler, "token_is_valid", lambda: True)
+    monkeypatch.setattr(handler, "check_permission", lambda department: True)
+    monkeypatch.setattr(handler, "collaborator", type('obj', (object,), {'id': 1, 'department': 'gestion'}))
+    
+    return handler
+
+@pytest.fixture
+def search_handler(session, monkeypatch):
+    token = "dummy_token"
+    
+    handler = SearchHandler(session=session, token=token)
+    
+    monkeypatch.setattr(handler, "token_is_valid", lambda: True)
+    monkeypatch.setattr(handler, "collaborator", type('obj', (object,), {'id': 1, 'department': 'gestion'}))
+    
+    return handler
+
+@pytest.fixture
+def report_handler(session, monkeypatch):
+    token = "dummy_token"
+    
+    handler = ReportHandler(session=session, token=token)
+    
+    monkeypatch.setattr(handler, "token_is_valid", lambda: True)
+    monkeypatch.setattr(handler, "check_permission", lambda department: True)
+    monkeypatch.setattr(handler, "collaborator", type('obj', (object,), {'id': 1, 'department': 'gestion'}))
+    
+    return handler
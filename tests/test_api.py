@@ -0,0 +1,127 @@
+import http.client
+import json
+import socket
+import time
+import threading
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Collaborator
+from config.database import enable_savepoints
+from api import ApiServer
+import api.server
+
+
+@pytest.fixture
+def api_server(tmp_path, monkeypatch, request):
+    engine = create_engine(f'sqlite:///{tmp_path / "api.db"}')
+    enable_savepoints(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        Collaborator().register(session, 'Commercial', 'commercial@epic.com', 'commercial', 'password')
+        Collaborator().register(session, 'Support', 'support@epic.com', 'support', 'password')
+    monkeypatch.setattr(api.server, 'SessionLocal', Session)
+
+    server = ApiServer(('127.0.0.1', 0), workers=getattr(request, 'param', 4))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    engine.dispose()
+
+
+def call(connection, method, path, body=None, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def login(connection, email):
+    status, payload = call(connection, 'POST', '/login', {'email': email, 'password': 'password'})
+    assert status == 200
+    return payload['token']
+
+
+def test_api_client_crud_over_one_connection(api_server):
+    connection = http.client.HTTPConnection('127.0.0.1', api_server)
+    token = login(connection, 'commercial@epic.com')
+
+    status, created = call(connection, 'POST', '/clients', {'name': 'Api', 'email': 'api@gmail.com',
+                                                            'telephone': '+1234567890', 'company_name': 'Api Co'}, token)
+    assert status == 200
+    assert created['commercial_id'] == 1
+
+    status, updated = call(connection, 'PUT', f"/clients/{created['id']}", {'name': 'Api updated'}, token)
+    assert (status, updated['name']) == (200, 'Api updated')
+
+    status, clients = call(connection, 'GET', '/clients?limit=10&sort=name', token=token)
+    assert status == 200
+    assert [client['name'] for client in clients] == ['Api updated']
+
+    status, results = call(connection, 'GET', '/search?q=api+upd&kind=client', token=token)
+    assert (status, [result['id'] for result in results]) == (200, [created['id']])
+    connection.close()
+
+
+def test_api_errors(api_server):
+    connection = http.client.HTTPConnection('127.0.0.1', api_server)
+    assert call(connection, 'GET', '/clients')[0] == 401
+    assert call(connection, 'GET', '/clients', token='not-a-token')[0] == 401
+    assert call(connection, 'POST', '/login', {'email': 'commercial@epic.com', 'password': 'wrong'})[0] == 401
+
+    token = login(connection, 'support@epic.com')
+    assert call(connection, 'GET', '/nowhere', token=token)[0] == 404
+    assert call(connection, 'DELETE', '/clients', token=token)[0] == 405
+    assert call(connection, 'POST', '/clients', {'name': 'Denied'}, token)[0] == 403
+    assert call(connection, 'PUT', '/events/42', {'attendees': 3}, token)[0] == 404
+
+    token = login(connection, 'commercial@epic.com')
+    status, payload = call(connection, 'POST', '/clients', {'name': 'Invalid', 'email': 'invalid',
+                                                            'telephone': '+1234567890', 'company_name': 'Co'}, token)
+    assert status == 422
+    assert payload['details']
+    connection.close()
+
+
+@pytest.mark.parametrize('api_server', [1], indirect=True)
+def test_idle_keep_alive_connection_does_not_hold_a_worker(api_server):
+    idle = http.client.HTTPConnection('127.0.0.1', api_server)
+    token = login(idle, 'commercial@epic.com')
+
+    started = time.monotonic()
+    other = http.client.HTTPConnection('127.0.0.1', api_server, timeout=api.server.KEEP_ALIVE_TIMEOUT)
+    assert call(other, 'GET', '/clients', token=token)[0] == 200
+    assert time.monotonic() - started < api.server.KEEP_ALIVE_TIMEOUT / 2
+    other.close()
+
+    assert call(idle, 'GET', '/clients', token=token)[0] == 200
+    idle.close()
+
+
+def test_pipelined_requests(api_server):
+    request = b'GET /clients HTTP/1.1\r\nHost: localhost\r\n\r\n'
+    with socket.create_connection(('127.0.0.1', api_server), timeout=api.server.KEEP_ALIVE_TIMEOUT) as connection:
+        connection.sendall(request * 2)
+        responses = b''
+        while responses.count(b'HTTP/1.1 401') < 2:
+            data = connection.recv(4096)
+            assert data
+            responses += data
+
+
+def test_error_status_follows_the_exception_class():
+    from models import NotFound, PermissionDenied, TokenExpired, ConcurrentUpdateError, ValidationError
+    from controllers import SchedulingConflict
+
+    assert api.server.error_status(TokenExpired('expired')) == 401
+    assert api.server.error_status(PermissionDenied('denied')) == 403
+    assert api.server.error_status(NotFound('Client not found')) == 404
+    assert api.server.error_status(SchedulingConflict(1, [])) == 409
+    assert api.server.error_status(ConcurrentUpdateError()) == 409
+    assert api.server.error_status(ValidationError({'email': 'invalid'})) == 422
+    assert api.server.error_status(Exception('Unknown filter field: permission, not found')) == 400
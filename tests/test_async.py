@@ -0,0 +1,207 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Client, Collaborator, ValidationError
+from config.database import get_async_sessionmaker
+from controllers import (AsyncClientHandler, AsyncContractHandler, AsyncEventHandler, AsyncCollaboratorHandler,
+                         async_transaction_scope)
+
+
+@pytest.fixture
+def async_db(tmp_path):
+    path = tmp_path / 'async.db'
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        tokens = {}
+        for name, department in [('Commercial', 'commercial'), ('Gestion', 'gestion'), ('Support', 'support')]:
+            collaborator = Collaborator().register(session, name, f'{department}@epic.com', department, 'password')
+            tokens[department] = collaborator.create_token()
+    engine.dispose()
+    return get_async_sessionmaker(f'sqlite+aiosqlite:///{path}'), tokens
+
+
+def run(factory, scenario):
+    async def main():
+        try:
+            async with factory() as session:
+                return await scenario(session)
+        finally:
+            await factory.kw['bind'].dispose()
+    return asyncio.run(main())
+
+
+def client_data(name, email):
+    return {'name': name, 'email': email, 'telephone': '+1234567890', 'company_name': 'Company'}
+
+
+def test_async_client_lifecycle(async_db):
+    factory, tokens = async_db
+
+    async def scenario(session):
+        handler = await AsyncClientHandler.create(session, tokens['commercial'])
+        client = await handler.create_client(client_data('Async', 'async@gmail.com'))
+        await handler.update_client(client.id, {'name': 'Async updated'})
+        clients = await handler.get_all_clients(limit=10)
+        streamed = [client.name async for client in handler.stream_clients(sort_key='name')]
+        return client, clients, streamed
+
+    client, clients, streamed = run(factory, scenario)
+    assert client.commercial_id == 1
+    assert [c.name for c in clients] == ['Async updated']
+    assert clients[0].commercial.name == 'Commercial'
+    assert streamed == ['Async updated']
+
+
+def test_async_handlers_share_the_permission_checks(async_db):
+    factory, tokens = async_db
+
+    async def scenario(session):
+        handler = await AsyncClientHandler.create(session, tokens['support'])
+        with pytest.raises(Exception, match='Permission denied'):
+            await handler.create_client(client_data('Denied', 'denied@gmail.com'))
+        with pytest.raises(ValidationError):
+            commercial = await AsyncClientHandler.create(session, tokens['commercial'])
+            await commercial.create_client(client_data('Invalid', 'not-an-email'))
+        await session.rollback()
+
+        invalid = await AsyncClientHandler.create(session, 'not-a-token')
+        with pytest.raises(Exception, match='Token is expired'):
+            await invalid.get_all_clients()
+
+    run(factory, scenario)
+
+
+def test_async_contract_and_event_flow(async_db):
+    factory, tokens = async_db
+
+    async def scenario(session):
+        clients = await AsyncClientHandler.create(session, tokens['commercial'])
+        client = await clients.create_client(client_data('Flow', 'flow@gmail.com'))
+        contracts = await AsyncContractHandler.create(session, tokens['gestion'])
+        contract = await contracts.create_contract({'client_id': client.id, 'total_amount': 100.0,
+                                                    'amount_due': 50.0, 'status': False})
+        events = await AsyncEventHandler.create(session, tokens['commercial'])
+        event = await events.create_event({'contract_id': contract.id, 'location': 'Paris', 'attendees': 10,
+                                            'end_date': datetime.utcnow() + timedelta(days=1)})
+        gestion_events = await AsyncEventHandler.create(session, tokens['gestion'])
+        await gestion_events.add_support_contact(event.id, 3)
+        support_events = await AsyncEventHandler.create(session, tokens['support'])
+        await support_events.update_event(event.id, {'attendees': 20})
+        return await support_events.filter_my_events()
+
+    events = run(factory, scenario)
+    assert [(event.location, event.attendees, event.support_contact.name) for event in events] == [('Paris', 20, 'Support')]
+
+
+def test_async_collaborators_in_one_transaction(async_db):
+    factory, tokens = async_db
+
+    async def scenario(session):
+        handler = await AsyncCollaboratorHandler.create(session, tokens['gestion'])
+        with pytest.raises(ValidationError):
+            async with async_transaction_scope(session):
+                await handler.create_collaborators([
+                    {'name': 'New', 'email': 'new@epic.com', 'department': 'support', 'password': 'secret'},
+                    {'name': 'Bad', 'email': 'bad', 'department': 'support', 'password': 'secret'}
+                ])
+        created = await handler.create_collaborator(
+            {'name': 'Kept', 'email': 'kept@epic.com', 'department': 'support', 'password': 'secret'})
+        await handler.update_collaborator(created.id, {'password': 'changed'})
+        return await handler.get_all_collaborators(), created
+
+    collaborators, created = run(factory, scenario)
+    assert [c.name for c in collaborators] == ['Commercial', 'Gestion', 'Support', 'Kept']
+    assert created.check_password('changed')
+
+
+async def make_events(session, tokens, count):
+    clients = await AsyncClientHandler.create(session, tokens['commercial'])
+    client = await clients.create_client(client_data('Events', 'events@gmail.com'))
+    contracts = await AsyncContractHandler.create(session, tokens['gestion'])
+    contract = await contracts.create_contract({'client_id': client.id, 'total_amount': 100.0,
+                                                'amount_due': 50.0, 'status': True})
+    events = await AsyncEventHandler.create(session, tokens['commercial'])
+    return [(await events.create_event({'contract_id': contract.id, 'location': 'Paris', 'attendees': 10,
+                                        'end_date': datetime.utcnow() + timedelta(days=1)})).id
+            for _ in range(count)]
+
+
+def test_async_scheduling_conflicts(async_db):
+    factory, tokens = async_db
+
+    async def scenario(session):
+        event_ids = await make_events(session, tokens, 2)
+        handler = await AsyncEventHandler.create(session, tokens['gestion'])
+        await handler.add_support_contact(event_ids[0], 3)
+        await handler.add_support_contact(event_ids[1], 3, allow_overlap=True)
+        return event_ids, await handler.scheduling_conflicts()
+
+    event_ids, report = run(factory, scenario)
+    assert report['total'] == 1
+    assert report['by_support_contact'] == {3: 1}
+    assert report['conflicts'] == [{'support_contact_id': 3, 'event_id': event_ids[1], 'other_event_id': event_ids[0]}]
+
+
+def test_async_auto_assign_support(async_db):
+    factory, tokens = async_db
+
+    async def scenario(session):
+        event_ids = await make_events(session, tokens, 2)
+        handler = await AsyncEventHandler.create(session, tokens['gestion'])
+        planned = await handler.auto_assign_support(dry_run=True)
+        assigned = await handler.auto_assign_support()
+        events = await AsyncEventHandler.create(session, tokens['support'])
+        return event_ids, planned, assigned, [event.id for event in await events.filter_my_events()]
+
+    event_ids, planned, assigned, mine = run(factory, scenario)
+    # One support contact and two overlapping events: the second cannot be booked.
+    assert (planned['updated'], planned['unassigned']) == (0, [event_ids[1]])
+    assert assigned['assignments'] == [{'event_id': event_ids[0], 'support_contact_id': 3}]
+    assert (assigned['updated'], assigned['loads']) == (1, {3: 1})
+    assert mine == [event_ids[0]]
+
+
+def test_async_batch_updates(async_db):
+    factory, tokens = async_db
+
+    async def scenario(session):
+        clients = await AsyncClientHandler.create(session, tokens['commercial'])
+        client = await clients.create_client(client_data('Batch', 'batch@gmail.com'))
+        contracts = await AsyncContractHandler.create(session, tokens['gestion'])
+        contract_ids = [(await contracts.create_contract({'client_id': client.id, 'total_amount': 100.0,
+                                                          'amount_due': 50.0, 'status': False})).id
+                        for _ in range(3)]
+        results = [
+            await contracts.mark_contracts_signed(contract_ids + [999]),
+            await contracts.adjust_amount_due(contract_ids[:2], 80),
+            await contracts.mark_contracts_paid(contract_ids[2:]),
+        ]
+        rows = await contracts.filter_contracts(sort_key='id')
+        return results, [(contract.status, contract.amount_due, contract.version) for contract in rows]
+
+    results, rows = run(factory, scenario)
+    assert results == [{'requested': 4, 'updated': 3}, {'requested': 2, 'updated': 2}, {'requested': 1, 'updated': 1}]
+    assert rows == [(True, 100.0, 3), (True, 100.0, 3), (True, 0.0, 3)]
+
+
+def test_async_add_support_contact_many(async_db):
+    from controllers import SchedulingConflict
+    factory, tokens = async_db
+
+    async def scenario(session):
+        event_ids = await make_events(session, tokens, 2)
+        handler = await AsyncEventHandler.create(session, tokens['gestion'])
+        with pytest.raises(SchedulingConflict) as conflict:
+            await handler.add_support_contact_many(event_ids, 3)
+        await session.rollback()
+        result = await handler.add_support_contact_many(event_ids, 3, allow_overlap=True)
+        events = await AsyncEventHandler.create(session, tokens['support'])
+        return event_ids, conflict.value.conflicts, result, [event.id for event in await events.filter_my_events()]
+
+    event_ids, conflicts, result, mine = run(factory, scenario)
+    assert conflicts == event_ids
+    assert result == {'requested': 2, 'updated': 2}
+    assert mine == event_ids
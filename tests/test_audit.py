@@ -0,0 +1,131 @@
+import json
+import time
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+from datetime import datetime
+from models import Client, Contract, Event, Collaborator
+from controllers import transaction_scope
+from controllers.audit import audit_log, HIDDEN_VALUE
+from controllers.bulk import read_records
+
+
+@pytest.fixture
+def audit(session):
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    audit_log.start(engine)
+    yield audit_log
+    audit_log.stop()
+    for model in (Event, Contract, Client, Collaborator):
+        session.query(model).delete()
+    session.commit()
+
+
+def changes(entry):
+    return json.loads(entry['changes'])
+
+
+def test_handler_writes_are_diffed(audit, client_handler, session):
+    session.info['collaborator_id'] = client_handler.collaborator.id
+    client = client_handler.create_client({'name': 'Audited', 'email': 'audited@gmail.com',
+                                           'telephone': '+1234567890', 'company_name': 'Audit Co'})
+    session.expire_all()
+    client_handler.update_client(client.id, {'name': 'Renamed'})
+
+    update, insert = audit.entries('clients', client.id)
+    assert (insert['action'], insert['collaborator_id']) == ('insert', 1)
+    assert changes(insert)['email'] == [None, 'audited@gmail.com']
+    assert update['action'] == 'update'
+    assert changes(update)['name'] == ['Audited', 'Renamed']
+    assert 'email' not in changes(update)
+
+
+def test_rolled_back_writes_are_not_recorded(audit, session):
+    client = Client(name='Kept', email='kept@gmail.com', telephone='+1234567890', company_name='K', commercial_id=1)
+    with transaction_scope(session):
+        session.add(client)
+        try:
+            with transaction_scope(session):
+                client.name = 'Savepoint'
+                session.flush()
+                raise ValueError
+        except ValueError:
+            pass
+    client.name = 'Rolled back'
+    session.flush()
+    session.rollback()
+
+    assert [entry['action'] for entry in audit.entries('clients')] == ['insert']
+
+
+def test_set_based_updates_and_hidden_columns(audit, contract_handler, session):
+    collaborator = Collaborator(name='Secret', email='secret@epic.com', department='support', password='hash')
+    client = Client(name='Bulk', email='bulk@gmail.com', telephone='+1234567890', company_name='B', commercial_id=1)
+    session.add_all([collaborator, client])
+    session.commit()
+    contracts = [Contract(client_id=client.id, commercial_id=1, total_amount=100, amount_due=100, status=False)
+                 for _ in range(2)]
+    session.add_all(contracts)
+    session.commit()
+    contract_handler.mark_contracts_signed([contract.id for contract in contracts])
+
+    updates = [entry for entry in audit.entries('contracts') if entry['action'] == 'update']
+    assert [entry['row_id'] for entry in updates] == [contracts[1].id, contracts[0].id]
+    assert changes(updates[0]) == {'status': [False, True], 'version': [1, 2]}
+    assert changes(audit.entries('collaborators')[0])['password'] == [None, HIDDEN_VALUE]
+
+
+def test_bulk_imports_and_assignments_are_recorded_per_row(audit, import_handler, event_handler, session, tmp_path):
+    support = Collaborator(name='Assigned', email='assigned@epic.com', department='support', password='x')
+    client = Client(name='Events', email='events@gmail.com', telephone='+1234567890', company_name='E', commercial_id=1)
+    session.add_all([support, client])
+    session.commit()
+    path = tmp_path / 'clients.csv'
+    path.write_text("name,email,telephone,company_name,commercial_id\n"
+                    "Imported 1,imported1@gmail.com,+1234567890,Company 1,1\n"
+                    "Imported 2,imported2@gmail.com,+1234567890,Company 2,1\n")
+
+    assert import_handler.import_records('clients', read_records(str(path)), batch_size=2)['inserted'] == 2
+
+    imported = {entry['row_id']: changes(entry) for entry in audit.entries('clients', limit=2)}
+    names = dict(session.query(Client.id, Client.name).filter(Client.name.like('Imported %')).all())
+    assert {row_id: change['name'][1] for row_id, change in imported.items()} == names
+
+    contract = Contract(client_id=client.id, commercial_id=1, total_amount=10, amount_due=0, status=True)
+    session.add(contract)
+    session.commit()
+    event = Event(contract_id=contract.id, client_id=client.id, start_date=datetime(2025, 3, 1),
+                  end_date=datetime(2025, 3, 2), location='Lyon', attendees=5)
+    session.add(event)
+    session.commit()
+    assert event_handler.auto_assign_support()['updated'] == 1
+
+    assignment = audit.entries('events', event.id)[0]
+    assert assignment['action'] == 'update'
+    assert changes(assignment)['support_contact_id'] == [None, support.id]
+
+
+def test_entries_are_written_in_background_to_an_append_only_table(audit, session):
+    session.add_all([Client(name=f'Background {i}', email=f'background{i}@gmail.com', telephone='+1234567890',
+                            company_name='B', commercial_id=1) for i in range(3)])
+    session.commit()
+
+    deadline = time.time() + 5
+    while audit._buffer and time.time() < deadline:
+        time.sleep(0.05)
+    with audit.engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT count(*) FROM audit_log").scalar() == 3
+    with pytest.raises(IntegrityError, match='append-only'):
+        with audit.engine.begin() as connection:
+            connection.exec_driver_sql("DELETE FROM audit_log")
+
+
+def test_audit_trail_report(audit, report_handler, session):
+    session.add(Client(name='Report', email='report@gmail.com', telephone='+1234567890', company_name='R',
+                       commercial_id=1))
+    session.commit()
+
+    assert [entry['table_name'] for entry in report_handler.audit_trail()] == ['clients']
+    with pytest.raises(Exception, match='Unknown audited table'):
+        report_handler.audit_trail('revenue_by_client')
@@ -0,0 +1,29 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from models import Client, Contract, Event
+from benchmarks.dataset import build_dataset, open_engine
+from benchmarks.bench_handlers import CASES, run_suite, compare
+
+
+def test_build_dataset(tmp_path):
+    path = tmp_path / 'dataset.db'
+    build_dataset(str(path), 50)
+    engine = open_engine(path)
+    with Session(engine) as session:
+        assert session.scalar(select(func.count(Client.id))) == 50
+        signed = session.scalar(select(func.count(Contract.id)).where(Contract.status.is_(True)))
+        assert 0 < signed < 50
+        assert session.scalar(select(func.count(Event.id))) == signed
+        assert 0 < session.scalar(select(func.count(Event.id)).where(Event.support_contact_id.is_(None))) < signed
+    engine.dispose()
+
+
+def test_suite_runs_every_case(tmp_path):
+    results = run_suite(['40'], repeat=1, memory=False, data_dir=str(tmp_path), echo=lambda line: None)
+    assert set(results['40']) == {name for name, _ in CASES}
+    assert results['40']['ClientHandler.get_all_clients page']['rows'] == 20
+    assert results['40']['EventHandler.filter_events_without_support']['rows'] > 0
+
+    baseline = {'results': {'40': {name: dict(result, p50=result['p50'] / 10) for name, result in results['40'].items()}}}
+    assert len(compare(results, baseline, 0.2)) == len(CASES)
+    assert compare(results, {'results': results}, 0.2) == []
@@ -0,0 +1,90 @@
+import csv
+import json
+from datetime import datetime
+from models import Client, Contract, Event, Collaborator
+from controllers.bulk import read_records
+
+
+def test_import_clients_csv(import_handler, session, tmp_path):
+    commercial = Collaborator(name='Commercial', email='commercial@gmail.com', department='commercial', password='password123')
+    commercial.set_password('password123')
+    session.add(commercial)
+    session.commit()
+
+    path = tmp_path / 'clients.csv'
+    path.write_text(
+        "name,email,telephone,company_name,commercial_id\n"
+        f"Import 1,import1@gmail.com,+1234567890,Company 1,{commercial.id}\n"
+        f"Import 2,not-an-email,+1234567890,Company 2,{commercial.id}\n"
+        "Import 3,import3@gmail.com,+1234567890,Company 3,9999\n"
+        f"Import 4,import4@gmail.com,+1234567890,Company 4,{commercial.id}\n"
+    )
+
+    report = import_handler.import_records('clients', read_records(str(path)), batch_size=2)
+
+    assert report['inserted'] == 2
+    assert [line for line, _ in report['errors']] == [3, 4]
+    assert session.query(Client).filter(Client.name.like('Import %')).count() == 2
+
+
+def test_import_contracts_and_events_jsonl(import_handler, session, tmp_path):
+    client = Client(name='Client 1', email='client1@gmail.com', telephone='+1234567890', company_name='Company 1', commercial_id=7)
+    session.add(client)
+    session.commit()
+
+    contracts = tmp_path / 'contracts.jsonl'
+    contracts.write_text('\n'.join([
+        json.dumps({'client_id': client.id, 'total_amount': 1000, 'amount_due': 0, 'status': True}),
+        '{not json',
+        json.dumps({'client_id': client.id, 'total_amount': 'a lot', 'amount_due': 0, 'status': True}),
+    ]))
+
+    report = import_handler.import_records('contracts', read_records(str(contracts)))
+    assert report['inserted'] == 1
+    assert [line for line, _ in report['errors']] == [2, 3]
+
+    contract = session.query(Contract).filter_by(client_id=client.id).one()
+    assert contract.commercial_id == 7
+
+    events = tmp_path / 'events.jsonl'
+    events.write_text(json.dumps({
+        'contract_id': contract.id, 'end_date': '2030-05-12T18:00:00', 'location': 'Paris', 'attendees': 50
+    }))
+
+    report = import_handler.import_records('events', read_records(str(events)))
+    assert report == {'inserted': 1, 'errors': []}
+
+    event = session.query(Event).filter_by(contract_id=contract.id).one()
+    assert event.client_id == client.id
+    assert event.start_date is not None
+
+
+def test_export_entities(export_handler, session, tmp_path):
+
+    support = Collaborator(name='Support Export', email='support.export@gmail.com', department='support', password='password123')
+    support.set_password('password123')
+    session.add(support)
+    session.commit()
+    client = Client(name='Client Export', email='export@gmail.com', telephone='+1234567890', company_name='Company', commercial_id=support.id)
+    session.add(client)
+    session.commit()
+    contract = Contract(client_id=client.id, commercial_id=support.id, total_amount=1000, amount_due=0, status=True)
+    session.add(contract)
+    session.commit()
+    session.add(Event(contract_id=contract.id, client_id=client.id, end_date=datetime(2030, 1, 1), location='Paris', attendees=5, support_contact_id=support.id))
+    session.commit()
+
+    counts = export_handler.export_entities(['clients', 'events'], str(tmp_path), fmt='jsonl', with_names=True, chunk_size=1)
+
+    assert counts['clients'] == session.query(Client).count()
+    events = [json.loads(line) for line in (tmp_path / 'events.jsonl').read_text().splitlines()]
+    exported = [event for event in events if event['contract_id'] == contract.id][0]
+    assert exported['client_name'] == 'Client Export'
+    assert exported['support_contact_name'] == 'Support Export'
+    assert exported['end_date'] == '2030-01-01T00:00:00'
+
+    export_handler.export_entities(['contracts'], str(tmp_path), fmt='csv')
+    with open(tmp_path / 'contracts.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == session.query(Contract).count()
+    assert 'commercial_name' not in rows[0]
@@ -0,0 +1,71 @@
+import time
+from sqlalchemy import event
+from models import Collaborator
+from controllers import ClientHandler, CollaboratorHandler
+from controllers.cache import PrincipalCache, principal_cache
+
+
+def make_collaborator(session, name, email, department):
+    collaborator = Collaborator(name=name, email=email, department=department)
+    collaborator.set_password('password123')
+    collaborator.save(session)
+    return collaborator
+
+
+def test_handlers_reuse_cached_principal(session):
+    collaborator = make_collaborator(session, 'Cached', 'cached@gmail.com', 'commercial')
+    token = collaborator.create_token()
+    ClientHandler(session, token)
+
+    statements = []
+    listener = lambda conn, cursor, statement, params, context, executemany: statements.append(statement)
+    event.listen(session.get_bind(), 'before_cursor_execute', listener)
+    try:
+        handler = ClientHandler(session, token)
+    finally:
+        event.remove(session.get_bind(), 'before_cursor_execute', listener)
+
+    assert statements == []
+    assert handler.collaborator.id == collaborator.id
+    handler.check_permission('commercial')
+
+
+def test_update_collaborator_invalidates_cache(session):
+    manager = make_collaborator(session, 'Manager', 'manager@gmail.com', 'gestion')
+    support = make_collaborator(session, 'Support', 'support@gmail.com', 'support')
+    support_token = support.create_token()
+    assert CollaboratorHandler(session, support_token).collaborator.department == 'support'
+
+    CollaboratorHandler(session, manager.create_token()).update_collaborator(support.id, {'department': 'commercial', 'password': 'password123'})
+
+    assert CollaboratorHandler(session, support_token).collaborator.department == 'commercial'
+
+
+def test_cached_principal_sees_changes_from_other_processes(session):
+    support = make_collaborator(session, 'Moved', 'moved@gmail.com', 'support')
+    token = support.create_token()
+    assert ClientHandler(session, token).collaborator.department == 'support'
+
+    session.connection().exec_driver_sql("UPDATE collaborators SET department = 'commercial' WHERE id = ?", (support.id,))
+    session.commit()
+    assert ClientHandler(session, token).collaborator.department == 'commercial'
+
+    session.connection().exec_driver_sql("DELETE FROM collaborators WHERE id = ?", (support.id,))
+    session.commit()
+    session.expunge_all()
+    assert ClientHandler(session, token).collaborator is None
+    assert not principal_cache._entries
+
+def test_cache_is_bounded_and_expires():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    for token in ('t1', 't2', 't3'):
+        cache.put(token, {'id': 1, 'exp': time.time() + 3600})
+    assert list(cache._entries) == ['t2', 't3']
+
+    cache.put('expired', {'id': 1, 'exp': time.time() - 1})
+    assert 'expired' in cache._entries
+    assert cache.get('expired', None) is None
+    assert 'expired' not in cache._entries
+
+    cache.invalidate(1)
+    assert not cache._entries
@@ -15,6 +15,30 @@ def test_get_all_clients(client_handler, session):
     assert len(clients) == 2
 
 
+
+def test_get_all_clients_keyset_pages(client_handler, session):
+    session.add_all([
+        Client(name=name, email=f'{name.lower()}@gmail.com', telephone='+1234567890', company_name='Company', commercial_id=1)
+        for name in ('Zoe', 'Adam', 'Adam', 'Marc', 'Bea')
+    ])
+    session.commit()
+
+    seen = []
+    after_id = None
+    while True:
+        page = client_handler.get_all_clients(after_id=after_id, limit=2, sort_key='name')
+        seen.extend(page)
+        if len(page) < 2:
+            break
+        after_id = page[-1].id
+
+    all_clients = client_handler.get_all_clients()
+    assert sorted(c.id for c in seen) == sorted(c.id for c in all_clients)
+    assert [c.name for c in seen] == sorted(c.name for c in all_clients)
+
+    with pytest.raises(Exception, match='Unknown sort key'):
+        client_handler.get_all_clients(sort_key='telephone')
+
 def test_create_client(client_handler):
     data = {
         'name': 'Client',
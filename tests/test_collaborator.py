@@ -1,5 +1,9 @@
 import pytest
-from models import Collaborator, ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from models import Base, Collaborator, ValidationError
+from config.migrations import migrate, create_missing_indexes, SCHEMA_VERSION
+from models.passwords import PasswordHasher, password_hasher
 from unittest.mock import patch
 from views import add_collaborator, update_collaborator, show_collaborators, delete_collaborator
 
@@ -74,6 +78,117 @@ def test_collaborator_validation(session):
     with pytest.raises(ValidationError):
         collaborator.save(session)
 
+def test_authenticate_ignores_email_case(session):
+    collaborator = Collaborator(name='Collab 10', email='Collab10@Gmail.com', department='support', password='password123')
+    collaborator.set_password('password123')
+    collaborator.save(session)
+
+    assert Collaborator().authenticate(session, 'collab10@gmail.com', 'password123') is not None
+    assert Collaborator().authenticate(session, 'collab10@gmail.com', 'wrong') is None
+
+def test_collaborator_email_is_unique_ignoring_case(session):
+    collaborator = Collaborator(name='Collab 11', email='collab11@gmail.com', department='support', password='password123')
+    collaborator.save(session)
+
+    duplicate = Collaborator(name='Collab 12', email='COLLAB11@gmail.com', department='support', password='password123')
+    with pytest.raises(IntegrityError):
+        duplicate.save(session)
+    session.rollback()
+
+def test_migrate_creates_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE collaborators (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                                   "email VARCHAR NOT NULL, department VARCHAR NOT NULL, password VARCHAR NOT NULL)")
+    Base.metadata.create_all(engine)
+
+    assert migrate(engine) == SCHEMA_VERSION
+    with engine.connect() as connection:
+        indexes = connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars().all()
+    assert 'ix_collaborators_email_lower' in indexes
+    assert 'ix_events_support_contact_id' in indexes
+
+def test_create_missing_indexes_skips_existing_expression_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        create_missing_indexes(connection)
+    assert migrate(engine) == SCHEMA_VERSION
+
+def test_migrate_merges_duplicate_emails(tmp_path, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE collaborators (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                                   "email VARCHAR NOT NULL, department VARCHAR NOT NULL, password VARCHAR NOT NULL)")
+        connection.exec_driver_sql("INSERT INTO collaborators VALUES (1, 'Test', 'test@example.com', 'commercial', 'x'), "
+                                   "(2, 'Test', 'Test@Example.com', 'commercial', 'x'), "
+                                   "(3, 'Other', 'other@example.com', 'support', 'x')")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO clients (id, name, email, telephone, company_name, commercial_id) "
+                                   "VALUES (1, 'Client', 'client@example.com', '0600000000', 'Company', 2)")
+
+    with caplog.at_level('WARNING', logger='config.migrations'):
+        assert migrate(engine) == SCHEMA_VERSION
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT id FROM collaborators ORDER BY id").scalars().all() == [1, 3]
+        assert connection.exec_driver_sql("SELECT commercial_id FROM clients").scalar() == 1
+    assert 'Merged collaborator 2 into collaborator 1' in caplog.text
+
+def test_migrate_stops_on_duplicate_emails_across_departments(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE collaborators (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                                   "email VARCHAR NOT NULL, department VARCHAR NOT NULL, password VARCHAR NOT NULL)")
+        connection.exec_driver_sql("INSERT INTO collaborators VALUES (1, 'Test', 'test@example.com', 'commercial', 'x'), "
+                                   "(2, 'Test', 'Test@Example.com', 'support', 'x'), "
+                                   "(3, 'Other', 'other@example.com', 'support', 'x'), "
+                                   "(4, 'Other', 'OTHER@example.com', 'support', 'x')")
+    Base.metadata.create_all(engine)
+
+    with pytest.raises(Exception, match=r"test@example\.com \(1 commercial, 2 support\)") as error:
+        migrate(engine)
+    assert 'other@example.com' not in str(error.value)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT count(*) FROM collaborators").scalar() == 4
+        assert connection.exec_driver_sql("PRAGMA user_version").scalar() == 0
+
+def test_update_collaborator_keeps_password_when_not_supplied(collaborator_handler, session):
+    collaborator = Collaborator(name='Collab 13', email='collab13@gmail.com', department='support')
+    collaborator.set_password('password123')
+    session.add(collaborator)
+    session.commit()
+    stored = collaborator.password
+
+    collaborator_handler.update_collaborator(collaborator.id, {'name': 'Collab 14', 'password': ''})
+    assert collaborator.password == stored
+
+    collaborator_handler.update_collaborator(collaborator.id, {'password': 'password123'})
+    assert collaborator.password == stored
+
+    collaborator_handler.update_collaborator(collaborator.id, {'password': 'new-password'})
+    assert collaborator.check_password('new-password')
+
+def test_create_collaborators(collaborator_handler, session):
+    data = [
+        {'name': f'Staff {i}', 'email': f'staff{i}@gmail.com', 'department': 'support', 'password': f'password{i}'}
+        for i in range(4)
+    ]
+
+    collaborators = collaborator_handler.create_collaborators(data)
+    assert [c.id is not None for c in collaborators] == [True] * 4
+    assert collaborators[2].check_password('password2')
+
+def test_authenticate_rehashes_outdated_cost(session):
+    collaborator = Collaborator(name='Collab 15', email='collab15@gmail.com', department='support')
+    collaborator.password = PasswordHasher(rounds=5).hash('password123')
+    collaborator.save(session)
+
+    assert Collaborator().authenticate(session, 'collab15@gmail.com', 'password123') is not None
+    assert password_hasher.cost(collaborator.password) == password_hasher.rounds
+    assert collaborator.check_password('password123')
+
 '''
 def test_add_collaborator_view(session, runner, collaborator_handler):
     collaborator = Collaborator(
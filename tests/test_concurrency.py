@@ -0,0 +1,153 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Client, Contract, ConcurrentUpdateError
+from config.database import enable_savepoints
+from config.migrations import migrate, SCHEMA_VERSION
+from controllers import ClientHandler, retry_on_conflict
+
+
+@pytest.fixture
+def client(session):
+    client = Client(name='Versioned', email='versioned@gmail.com', telephone='+1234567890', company_name='V',
+                    commercial_id=1)
+    client.save(session)
+    yield client
+    session.query(Contract).delete()
+    session.query(Client).delete()
+    session.commit()
+
+
+def concurrent_rename(session, client_id, name):
+    # Another writer commits between our read and our write.
+    session.connection().exec_driver_sql(
+        "UPDATE clients SET name = ?, version = version + 1 WHERE id = ?", (name, client_id))
+
+
+def test_updates_increment_the_version(client, session):
+    assert client.version == 1
+    client.name = 'Renamed'
+    client.save(session)
+    assert client.version == 2
+
+
+def test_stale_write_is_rolled_back_and_retryable(client, session):
+    assert client.version == 1
+    client.email = 'mine@gmail.com'
+    concurrent_rename(session, client.id, 'Theirs')
+
+    with pytest.raises(ConcurrentUpdateError) as error:
+        client.save(session)
+    assert error.value.retryable
+
+    session.refresh(client)
+    assert (client.email, client.version) == ('versioned@gmail.com', 1)
+
+
+def test_update_compares_the_version_read_by_the_caller(client_handler, client, session):
+    client_handler.update_client(client.id, {'name': 'First', 'version': 1})
+    with pytest.raises(ConcurrentUpdateError):
+        client_handler.update_client(client.id, {'name': 'Second', 'version': 1})
+    assert client_handler.update_client(client.id, {'name': 'Second', 'version': 2}).version == 3
+
+
+def test_retry_on_conflict_reads_the_row_again(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'shared.db'}")
+    with engine.connect() as connection:
+        # Readers and the writer only share the database in WAL mode, as in production.
+        connection.exec_driver_sql("PRAGMA journal_mode = WAL")
+    enable_savepoints(engine)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    client = Client(name='Shared', email='shared@gmail.com', telephone='+1234567890', company_name='S', commercial_id=1)
+    client.save(session)
+    handler = ClientHandler(session, 'dummy_token')
+    monkeypatch.setattr(handler, 'check_permission', lambda department: True)
+    monkeypatch.setattr(handler, 'collaborator', type('obj', (object,), {'id': 1, 'department': 'commercial'}))
+
+    versions = []
+    apply_update = handler._apply_client_update
+
+    def apply_after_concurrent_write(instance, data):
+        versions.append(instance.version)
+        if len(versions) == 1:
+            with engine.begin() as other:
+                other.exec_driver_sql("UPDATE clients SET name = 'Theirs', version = version + 1")
+        apply_update(instance, data)
+
+    monkeypatch.setattr(handler, '_apply_client_update', apply_after_concurrent_write)
+    updated = retry_on_conflict(handler.update_client, client.id, {'company_name': 'Mine'})
+    assert versions == [1, 2]
+    assert (updated.name, updated.company_name, updated.version) == ('Theirs', 'Mine', 3)
+
+    with pytest.raises(ConcurrentUpdateError):
+        retry_on_conflict(handler.update_client, client.id, {'name': 'Stale', 'version': 1}, attempts=2)
+    session.close()
+
+
+def test_batch_updates_increment_the_version(contract_handler, client, session):
+    contract = Contract(client_id=client.id, commercial_id=1, total_amount=100, amount_due=100, status=False)
+    contract.save(session)
+    contract_handler.mark_contracts_paid([contract.id])
+    assert (contract.amount_due, contract.version) == (0, 2)
+
+
+def test_migrate_adds_version_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE collaborators (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                                   "email VARCHAR NOT NULL, department VARCHAR NOT NULL, password VARCHAR NOT NULL)")
+        connection.exec_driver_sql("CREATE TABLE clients (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                                   "email VARCHAR NOT NULL, telephone VARCHAR NOT NULL, company_name VARCHAR NOT NULL, "
+                                   "creation_date DATETIME, last_update DATETIME, commercial_id INTEGER NOT NULL)")
+        connection.exec_driver_sql("INSERT INTO clients (name, email, telephone, company_name, commercial_id) "
+                                   "VALUES ('Legacy', 'legacy@gmail.com', '+1234567890', 'L', 1)")
+    Base.metadata.create_all(engine)
+
+    assert migrate(engine) == SCHEMA_VERSION
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT version FROM clients").scalar() == 1
+
+
+@pytest.mark.parametrize('answer, expected', [('y', 'Mine again'), ('n', 'Theirs')])
+def test_update_view_shows_the_concurrent_change(tmp_path, monkeypatch, runner, answer, expected):
+    import views.cli_views
+    from models import Collaborator
+    from views import update_client
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'shared.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    commercial = Collaborator().register(session, 'Commercial', 'commercial@epic.com', 'commercial', 'password')
+    client = Client(name='Shared', email='shared@gmail.com', telephone='+1234567890', company_name='S',
+                    commercial_id=commercial.id)
+    client.save(session)
+    monkeypatch.setattr(views.cli_views, 'session', session)
+
+    update = ClientHandler.update_client
+    calls = []
+
+    def update_after_concurrent_write(handler, client_id, data):
+        calls.append(data['version'])
+        if len(calls) == 1:
+            with engine.begin() as other:
+                other.exec_driver_sql("UPDATE clients SET name = 'Theirs', version = version + 1")
+        return update(handler, client_id, data)
+
+    monkeypatch.setattr(ClientHandler, 'update_client', update_after_concurrent_write)
+    fields = 'shared@gmail.com\n+1234567890\nS\n'
+    result = runner.invoke(update_client, args=[commercial.create_token()],
+                           input=f"{client.id}\nMine\n{fields}{answer}\nMine again\n{fields}")
+
+    assert 'Current client' in result.output and 'version 1' in result.output
+    assert 'changed by someone else since version 1' in result.output
+    assert 'Theirs' in result.output and 'version 2' in result.output
+    session.expire_all()
+    assert session.get(Client, client.id).name == expected
+    if answer == 'y':
+        assert calls == [1, 2]
+        assert 'Client updated successfully.' in result.output
+    else:
+        assert calls == [1]
+        assert 'Update cancelled.' in result.output
+    session.close()
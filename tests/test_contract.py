@@ -3,6 +3,8 @@ from datetime import datetime
 from models import Client, Contract, ValidationError, Collaborator
 from unittest.mock import patch
 from views.con_views import add_contract, update_contract
+from views.output import render_rows
+from rich.console import Console
 
 def test_get_all_contracts(contract_handler, session):
     client = Client(name='Client 1', email='client1@gmail.com', telephone='+1234567890', company_name='Company 1', commercial_id=1)
@@ -104,11 +106,38 @@ def test_add_contract_view(session, runner, contract_handler):
 
     input_data = f"{data['client_id']}\n{data['total_amount']}\n{data['amount_due']}\n{data['status']}\n"
 
-    with patch('views.con_views.SessionLocal', return_value=session):
+    with patch('views.con_views.session', session):
         result = runner.invoke(add_contract, args=[token], input=input_data)
         print("voir le résultat de contrat"+result.output)
         assert 'Contract added successfully.' in result.output
 
+def test_stream_contracts(contract_handler, session):
+    client = Client(name='Client 2', email='client2@gmail.com', telephone='+1234567891', company_name='Company 2', commercial_id=1)
+    session.add(client)
+    session.commit()
+    session.add_all([
+        Contract(client_id=client.id, commercial_id=1, total_amount=amount, amount_due=0, status=True)
+        for amount in (300, 100, 200)
+    ])
+    session.commit()
+
+    contracts = contract_handler.stream_contracts(sort_key='total_amount', chunk_size=2)
+    amounts = [contract.total_amount for contract in contracts if contract.client_id == client.id]
+    assert amounts == [100, 200, 300]
+
+def test_render_rows_streams_large_results(capsys):
+    console = Console()
+    rows = ((str(i), f'name {i}') for i in range(5))
+
+    render_rows(console, "Rows", ('ID', 'Name'), rows, threshold=3)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ['ID', 'Name']
+    assert lines[-1].split() == ['4', 'name', '4']
+
+    render_rows(console, "Rows", ('ID', 'Name'), [('1', 'a\tb')], output='tsv')
+    assert capsys.readouterr().out.splitlines() == ['ID\tName', '1\ta b']
+
+
 '''
 def test_update_contract_view(session, runner, contract_handler):
 
@@ -153,4 +182,26 @@ def test_update_contract_view(session, runner, contract_handler):
         result = runner.invoke(update_contract, args=[token], input=input_data)
 
     assert 'Contract updated successfully.' in result.output
-'''
\ No newline at end of file
+'''
+
+def test_batch_contract_updates(contract_handler, session, monkeypatch):
+    client = Client(name='Batch', email='batch@gmail.com', telephone='+1234567899', company_name='Batch Co', commercial_id=1)
+    session.add(client)
+    session.commit()
+    contracts = [Contract(client_id=client.id, commercial_id=commercial_id, total_amount=1000, amount_due=400, status=False)
+                 for commercial_id in (1, 1, 2)]
+    session.add_all(contracts)
+    session.commit()
+    ids = [contract.id for contract in contracts]
+
+    assert contract_handler.mark_contracts_signed(ids + [ids[0], 999999]) == {'requested': 4, 'updated': 3}
+    assert contract_handler.adjust_amount_due(ids[:2], 800) == {'requested': 2, 'updated': 2}
+    assert [c.amount_due for c in contracts] == [1000, 1000, 400]
+    assert contract_handler.adjust_amount_due(ids[1:2], -5000)['updated'] == 1
+    assert contracts[1].amount_due == 0
+
+    # A commercial only updates their own contracts.
+    monkeypatch.setattr(contract_handler, "collaborator", type('obj', (object,), {'id': 2, 'department': 'commercial'}))
+    assert contract_handler.mark_contracts_paid(ids) == {'requested': 3, 'updated': 1}
+    assert [c.amount_due for c in contracts] == [1000, 0, 0]
+    assert all(c.status for c in contracts)
@@ -0,0 +1,40 @@
+import sqlite3
+import pytest
+from config.database import apply_profile, use_profile, engine_settings, ENGINE_PROFILES
+
+
+@pytest.mark.parametrize('profile', list(ENGINE_PROFILES))
+def test_apply_profile(tmp_path, profile):
+    connection = sqlite3.connect(tmp_path / 'profile.db')
+    apply_profile(connection, profile)
+
+    settings = ENGINE_PROFILES[profile]
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == settings['journal_mode'].lower()
+    assert connection.execute("PRAGMA busy_timeout").fetchone()[0] == settings['busy_timeout']
+    assert connection.execute("PRAGMA cache_size").fetchone()[0] == settings['cache_size']
+    connection.close()
+
+
+def test_use_profile():
+    previous = engine_settings['profile']
+    try:
+        use_profile('bulk-load')
+        assert engine_settings['profile'] == 'bulk-load'
+        with pytest.raises(Exception, match='Unknown engine profile'):
+            use_profile('turbo')
+        assert engine_settings['profile'] == 'bulk-load'
+    finally:
+        use_profile(previous)
+
+
+def test_init_db_skips_a_current_schema(tmp_path, monkeypatch):
+    import config.database
+    from sqlalchemy import create_engine, inspect
+    from config.migrations import SCHEMA_VERSION
+
+    monkeypatch.setattr(config.database, 'engine', create_engine(f'sqlite:///{tmp_path / "init.db"}'))
+    assert config.database.init_db() is True
+    assert 'clients' in inspect(config.database.engine).get_table_names()
+    with config.database.engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION
+    assert config.database.init_db() is False
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from models import Client, Contract, Event, ValidationError, Collaborator
 from views import add_event
 from unittest.mock import patch
+from sqlalchemy import event as sa_event
 
 def test_get_all_events(event_handler, session):
     client = Client(name='Client 1', email='client1@gmail.com', telephone='+1234567890', company_name='Company 1', commercial_id=1)
@@ -22,6 +23,72 @@ def test_get_all_events(event_handler, session):
     assert len(events) == 2
 
 
+def test_get_all_events_keyset_pages_over_null_sort_keys(event_handler, session):
+    client = Client(name='Client 3', email='client3@gmail.com', telephone='+1234567890', company_name='Company 3', commercial_id=1)
+    session.add(client)
+    session.commit()
+    contract = Contract(client_id=client.id, commercial_id=1, total_amount=1000, amount_due=0, status=True)
+    session.add(contract)
+    session.commit()
+    session.add_all([
+        Event(contract_id=contract.id, client_id=client.id, end_date=end_date, location='Keyset', attendees=10)
+        for end_date in (None, datetime(2025, 5, 2), None, datetime(2025, 5, 1), None)
+    ])
+    session.commit()
+
+    seen = []
+    after_id = None
+    while True:
+        page = event_handler.get_all_events(after_id=after_id, limit=2, sort_key='end_date')
+        seen.extend(page)
+        if len(page) < 2:
+            break
+        after_id = page[-1].id
+
+    all_events = event_handler.get_all_events()
+    assert sorted(e.id for e in seen) == sorted(e.id for e in all_events)
+    undated = sorted(e.id for e in all_events if e.end_date is None)
+    assert [e.id for e in seen[:len(undated)]] == undated
+    assert [e.end_date for e in seen[len(undated):]] == sorted(e.end_date for e in all_events if e.end_date)
+
+
+def test_event_listings_load_relations_in_one_query(event_handler, session):
+    support = Collaborator(name='Support 1', email='support1@gmail.com', department='support', password='password123')
+    support.set_password('password123')
+    session.add(support)
+    session.commit()
+
+    client = Client(name='Client 2', email='client2@gmail.com', telephone='+1234567891', company_name='Company 2', commercial_id=1)
+    session.add(client)
+    session.commit()
+
+    contract = Contract(client_id=client.id, commercial_id=1, total_amount=1000, amount_due=500, status=True)
+    session.add(contract)
+    session.commit()
+
+    event1 = Event(contract_id=contract.id, client_id=client.id, end_date=datetime.utcnow() + timedelta(days=1), location='Location 1', attendees=100, support_contact_id=support.id)
+    event2 = Event(contract_id=contract.id, client_id=client.id, end_date=datetime.utcnow() + timedelta(days=2), location='Location 2', attendees=200)
+    session.add_all([event1, event2])
+    session.commit()
+    session.expire_all()
+
+    statements = []
+    listener = lambda conn, cursor, statement, params, context, executemany: statements.append(statement)
+    sa_event.listen(session.get_bind(), 'before_cursor_execute', listener)
+    try:
+        events = event_handler.get_all_events()
+        rows = [(e.client.name, e.support_contact.name if e.support_contact else None) for e in events]
+    finally:
+        sa_event.remove(session.get_bind(), 'before_cursor_execute', listener)
+
+    assert len([statement for statement in statements if statement.startswith('SELECT')]) == 1
+    assert ('Client 2', 'Support 1') in rows
+
+    event_handler.collaborator = type('obj', (object,), {'id': support.id, 'department': 'support'})
+    assert [e.id for e in event_handler.filter_my_events()] == [event1.id]
+    assert event2.id in [e.id for e in event_handler.filter_events_without_support()]
+
+
 def test_create_event(event_handler, session):
     client = Client(name='Client 4', email='client4@gmail.com', telephone='+1234567893', company_name='Company 4', commercial_id=1)
     session.add(client)
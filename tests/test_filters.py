@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from models import Base, Client, Contract, Event, Collaborator
+from controllers import AsyncContractHandler
+from controllers.filters import compile_filters, parse_term
+
+
+@pytest.fixture
+def rows(session):
+    commercial = Collaborator(name='Filter Commercial', email='filter.commercial@epic.com', department='commercial',
+                              password='x')
+    support = Collaborator(name='Filter Support', email='filter.support@epic.com', department='support', password='x')
+    session.add_all([commercial, support])
+    session.flush()
+    client = Client(name='Filter Client', email='filter@client.com', telephone='+33100000000', company_name='Filter',
+                    commercial_id=commercial.id)
+    session.add(client)
+    session.flush()
+    contracts = [
+        Contract(client_id=client.id, commercial_id=commercial.id, total_amount=amount, amount_due=due, status=status,
+                 creation_date=datetime(2025, month, 1))
+        for amount, due, status, month in ((1000, 0, True, 1), (5000, 2500, True, 2), (9000, 9000, False, 3))
+    ]
+    session.add_all(contracts)
+    session.flush()
+    events = [
+        Event(contract_id=contracts[0].id, client_id=client.id, start_date=datetime(2025, 6, day),
+              end_date=datetime(2025, 6, day + 1), support_contact_id=support_id, location='Paris', attendees=10)
+        for day, support_id in ((1, support.id), (10, None), (20, support.id))
+    ]
+    session.add_all(events)
+    session.commit()
+    yield {'contracts': [contract.id for contract in contracts], 'events': [event.id for event in events],
+           'support': support.id, 'client': client.id}
+    for model in (Event, Contract, Client, Collaborator):
+        session.query(model).delete()
+    session.commit()
+
+
+def test_parse_term():
+    assert parse_term('amount_due>0') == ('amount_due', '>', '0')
+    assert parse_term(' total_amount >= 1000.5 ') == ('total_amount', '>=', '1000.5')
+    with pytest.raises(Exception, match='Invalid filter'):
+        parse_term('amount_due')
+
+
+def test_compile_filters_rejects_unknown_fields_and_values():
+    with pytest.raises(Exception, match='Unknown filter field'):
+        compile_filters(Contract, ['password=x'])
+    with pytest.raises(Exception, match='Invalid value for total_amount'):
+        compile_filters(Contract, ['total_amount>lots'])
+    with pytest.raises(Exception, match='Only = and !='):
+        compile_filters(Event, ['support_contact_id>null'])
+
+
+def test_filter_contracts(contract_handler, rows):
+    ids = rows['contracts']
+    assert [c.id for c in contract_handler.filter_contracts(['amount_due>0'])] == ids[1:]
+    assert [c.id for c in contract_handler.filter_contracts(['amount_due>0', 'status=true'])] == [ids[1]]
+    assert [c.id for c in contract_handler.filter_contracts([('total_amount', '>=', 2000), 'total_amount<=9000'],
+                                                            sort_key='amount_due')] == [ids[1], ids[2]]
+    assert [c.id for c in contract_handler.filter_contracts(
+        [('creation_date', '>=', datetime(2025, 2, 1))], limit=1)] == [ids[1]]
+    assert [c.id for c in contract_handler.filter_contracts(['creation_date<2025-02-01',
+                                                             f"client_id={rows['client']}"])] == [ids[0]]
+
+
+def test_filter_events(event_handler, rows):
+    ids = rows['events']
+    assert [e.id for e in event_handler.filter_events(['support_contact_id=null'])] == [ids[1]]
+    assert [e.id for e in event_handler.filter_events([f"support_contact_id={rows['support']}",
+                                                       'start_date>=2025-06-05'])] == [ids[2]]
+    assert [e.id for e in event_handler.filter_events(['end_date<2025-06-15'], sort_key='start_date')] == ids[:2]
+    with pytest.raises(Exception, match='Unknown sort key'):
+        event_handler.filter_events([], sort_key='location')
+
+
+def test_filters_use_indexes(engine, tables):
+    statement = select(Event.id).where(*compile_filters(Event, ['start_date>=2025-06-05']))
+    sql = str(statement.compile(engine, compile_kwargs={'literal_binds': True}))
+    with engine.connect() as connection:
+        plan = ' '.join(row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+    assert 'ix_events_start_date' in plan
+
+
+def test_async_filter_contracts(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'filters.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            session.add(Collaborator(id=1, name='C', email='c@epic.com', department='commercial', password='x'))
+            session.add(Client(id=1, name='C', email='c@client.com', telephone='+33100000000', company_name='C',
+                               commercial_id=1))
+            session.add_all([Contract(client_id=1, commercial_id=1, total_amount=100, amount_due=due, status=True)
+                             for due in (0, 50)])
+            await session.commit()
+            handler = AsyncContractHandler(session, {'id': 1}, None)
+            contracts = await handler.filter_contracts(['amount_due>0'])
+        await engine.dispose()
+        return [contract.amount_due for contract in contracts]
+
+    assert asyncio.run(scenario()) == [50]
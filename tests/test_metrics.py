@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import pytest
+from click.testing import CliRunner
+from metrics import MetricsRegistry, Histogram, metrics
+from commands.stats import stats_command
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for value in [0.001] * 90 + [0.1] * 10:
+        histogram.observe(value)
+    assert histogram.count == 100
+    # Estimates are exact to the bucket, 0.001 falls in the (0.0008, 0.0016] one.
+    assert 0.0008 < histogram.percentile(50) <= 0.0016
+    assert 0.05 < histogram.percentile(99) <= 0.1
+    assert histogram.max == 0.1
+
+
+def test_timed_records_calls_rows_and_errors():
+    registry = MetricsRegistry()
+
+    @registry.timed('listing')
+    def listing(n):
+        if n < 0:
+            raise ValueError(n)
+        return list(range(n))
+
+    @registry.timed('fetch', kind='handler')
+    async def fetch():
+        return [1, 2]
+
+    @registry.timed('stream')
+    def stream(n):
+        yield from range(n)
+
+    listing(3)
+    listing(4)
+    with pytest.raises(ValueError):
+        listing(-1)
+    asyncio.run(fetch())
+    assert list(stream(5)) == [0, 1, 2, 3, 4]
+    for _ in stream(5):
+        break
+    stream(5)
+
+    summary = {row['operation']: row for row in registry.summary()}
+    assert (summary['listing']['calls'], summary['listing']['errors'], summary['listing']['rows']) == (3, 1, 7)
+    assert (summary['fetch']['kind'], summary['fetch']['rows']) == ('handler', 2)
+    assert (summary['stream']['calls'], summary['stream']['rows']) == (2, 6)
+
+
+def test_handlers_are_instrumented(client_handler):
+    metrics.reset()
+    client_handler.get_all_clients(limit=2)
+    operations = {row['operation']: row for row in metrics.summary()}
+    assert operations['ClientHandler.get_all_clients']['calls'] == 1
+    assert 'ClientHandler.token_is_valid' not in operations
+
+    clients = list(client_handler.stream_clients(chunk_size=1))
+    streamed = {row['operation']: row for row in metrics.summary()}['ClientHandler.stream_clients']
+    assert (streamed['calls'], streamed['rows']) == (1, len(clients))
+
+
+def test_flush_merges_runs_and_stats_renders(tmp_path):
+    path = str(tmp_path / 'metrics.json')
+    for _ in range(2):
+        registry = MetricsRegistry()
+        registry.record('handler', 'ClientHandler.create_client', 0.002, rows=1)
+        registry.flush(path)
+
+    assert MetricsRegistry.load(path).summary()[0]['calls'] == 2
+
+    runner = CliRunner()
+    result = runner.invoke(stats_command, ['--file', path, '--format', 'prometheus'])
+    assert 'epicevents_handler_calls_total{operation="ClientHandler.create_client"} 2' in result.output
+    assert 'epicevents_handler_latency_seconds_count{operation="ClientHandler.create_client"} 2' in result.output
+
+    result = runner.invoke(stats_command, ['--file', path, '--reset'])
+    assert result.exit_code == 0
+    assert 'handler' in result.output
+    assert MetricsRegistry.load(path).summary() == []
+
+
+def test_flush_keeps_calls_recorded_meanwhile(tmp_path, monkeypatch):
+    path = str(tmp_path / 'metrics.json')
+    registry = MetricsRegistry()
+    registry.record('handler', 'ClientHandler.create_client', 0.002)
+    load = MetricsRegistry.load
+
+    def load_while_recording(path):
+        registry.record('handler', 'ClientHandler.update_client', 0.002)
+        return load(path)
+
+    monkeypatch.setattr(MetricsRegistry, 'load', load_while_recording)
+    registry.flush(path)
+    monkeypatch.setattr(MetricsRegistry, 'load', load)
+
+    assert [row['operation'] for row in MetricsRegistry.load(path).summary()] == ['ClientHandler.create_client']
+    assert [row['operation'] for row in registry.summary()] == ['ClientHandler.update_client']
+
+
+def test_concurrent_flushes_keep_every_run(tmp_path):
+    path = str(tmp_path / 'metrics.json')
+
+    def run():
+        for _ in range(20):
+            registry = MetricsRegistry()
+            registry.record('handler', 'ClientHandler.create_client', 0.002)
+            registry.flush(path)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert MetricsRegistry.load(path).summary()[0]['calls'] == 80
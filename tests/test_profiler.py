@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import select
+from models import Client, Collaborator
+from config.profiler import SqlProfiler
+from views import show_sql_profile
+
+
+@pytest.fixture
+def profiler(engine):
+    profiler = SqlProfiler(engine).start()
+    yield profiler
+    profiler.stop()
+
+
+def test_profiler_counts_and_flags_repeated_statements(session, profiler):
+    if not session.query(Collaborator).filter_by(email='profiled@epic.com').first():
+        Collaborator().register(session, 'Profiled', 'profiled@epic.com', 'commercial', 'password')
+    profiler.reset()
+
+    for collaborator_id in (1, 2, 3):
+        session.execute(select(Client).where(Client.commercial_id == collaborator_id)).all()
+    session.execute(select(Client).where(Client.commercial_id == 1)).all()
+    session.execute(select(Collaborator)).all()
+
+    report = profiler.report()
+    assert report['queries'] == 5
+    assert report['total'] > 0
+    [duplicate] = report['duplicates']
+    assert 'FROM clients' in duplicate['sql']
+    assert (duplicate['count'], duplicate['distinct']) == (4, 3)
+
+    assert len(report['slowest']) == 3
+    assert all(slow['plan'] for slow in report['slowest'])
+    assert any('ix_clients_commercial_id' in step for slow in report['slowest'] for step in slow['plan'])
+
+
+def test_profiler_ignores_transaction_statements_and_resets(session, profiler):
+    session.commit()
+    assert profiler.report()['queries'] == 0
+    session.execute(select(Collaborator)).all()
+    assert profiler.report()['queries'] == 1
+    profiler.reset()
+    assert profiler.report()['queries'] == 0
+
+
+def test_show_sql_profile(session, profiler, capsys):
+    for _ in range(2):
+        session.execute(select(Collaborator).where(Collaborator.id == 1)).all()
+    show_sql_profile(profiler.report(), 'view_collaborators')
+    output = capsys.readouterr().out
+    assert 'view_collaborators' in output
+    assert '2 queries' in output
+    assert 'redundant query' in output
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import insert
+from models import Client, Contract, Event, Collaborator, CommercialRevenue, ClientRevenue
+
+
+@pytest.fixture
+def clients(session):
+    commercials = [Collaborator(name=f'Revenue {i}', email=f'revenue{i}@epic.com', department='commercial',
+                                password='x') for i in range(2)]
+    session.add_all(commercials)
+    session.flush()
+    clients = [Client(name=f'Revenue client {i}', email=f'revenue{i}@client.com', telephone='+33100000000',
+                      company_name='Revenue', commercial_id=commercial.id) for i, commercial in enumerate(commercials)]
+    session.add_all(clients)
+    session.commit()
+    yield clients
+    for model in (Event, Contract, Client, Collaborator):
+        session.query(model).delete()
+    session.commit()
+
+
+def totals(session, model, key):
+    session.expire_all()
+    row = session.get(model, key)
+    return (row.contracts, row.signed_contracts, row.total_signed, row.total_due) if row else None
+
+
+def test_revenue_follows_contract_writes(session, clients, report_handler):
+    first, second = clients
+    signed = Contract(client_id=first.id, commercial_id=first.commercial_id, total_amount=1000, amount_due=400,
+                      status=True)
+    draft = Contract(client_id=first.id, commercial_id=first.commercial_id, total_amount=500, amount_due=500,
+                     status=False)
+    session.add_all([signed, draft])
+    session.commit()
+    assert totals(session, CommercialRevenue, first.commercial_id) == (2, 1, 1000, 400)
+
+    draft.status = True
+    signed.amount_due = 0
+    session.commit()
+    assert totals(session, ClientRevenue, first.id) == (2, 2, 1500, 500)
+
+    # Moving a contract to another client and commercial moves its totals.
+    draft.client_id, draft.commercial_id = second.id, second.commercial_id
+    session.commit()
+    assert totals(session, ClientRevenue, first.id) == (1, 1, 1000, 0)
+    assert totals(session, CommercialRevenue, second.commercial_id) == (1, 1, 500, 500)
+
+    session.delete(signed)
+    session.commit()
+    assert totals(session, CommercialRevenue, first.commercial_id) == (0, 0, 0, 0)
+
+    # Core inserts are covered by the triggers as well.
+    session.execute(insert(Contract), [{'client_id': second.id, 'commercial_id': second.commercial_id,
+                                        'total_amount': 200.0, 'amount_due': 50.0, 'status': True}])
+    session.commit()
+    assert totals(session, ClientRevenue, second.id) == (2, 2, 700, 550)
+
+    rows = report_handler.revenue_by_commercial()
+    assert [(row['commercial_id'], row['total_signed']) for row in rows] == [(second.commercial_id, 700),
+                                                                              (first.commercial_id, 0)]
+    assert [row['client_id'] for row in report_handler.revenue_by_client(commercial_id=second.commercial_id)] == [
+        second.id]
+    assert report_handler.check_revenue() == []
+
+
+def test_rebuild_revenue_repairs_drift(session, clients, report_handler):
+    client = clients[0]
+    session.add(Contract(client_id=client.id, commercial_id=client.commercial_id, total_amount=300, amount_due=100,
+                         status=True))
+    session.commit()
+    session.get(ClientRevenue, client.id).total_due = 999
+    session.commit()
+
+    differences = report_handler.check_revenue()
+    assert [(d['table'], d['column'], d['stored'], d['expected']) for d in differences] == [
+        ('revenue_by_client', 'total_due', 999, 100)]
+    assert report_handler.rebuild_revenue() == differences
+    assert report_handler.check_revenue() == []
+    assert totals(session, ClientRevenue, client.id) == (1, 1, 300, 100)
+
+
+def test_revenue_reports_need_gestion(session):
+    from controllers import ReportHandler
+    handler = ReportHandler(session, 'not a token')
+    with pytest.raises(Exception, match='Token is expired'):
+        handler.revenue_by_commercial()
@@ -0,0 +1,127 @@
+import pytest
+from datetime import datetime
+from models import Client, Contract, Event, Collaborator
+from controllers import SchedulingConflict
+from controllers.scheduling import Calendar, find_conflicts, overlap_statement, plan_assignments
+
+
+def at(day, hour=0):
+    return datetime(2025, 3, day, hour)
+
+
+def test_find_conflicts_sweeps_each_support_contact():
+    rows = [
+        (1, 10, at(1), at(3)),
+        (1, 11, at(2), at(4)),
+        (1, 12, at(2, 12), at(2, 13)),
+        (1, 13, at(4), at(5)),
+        (2, 20, at(1), at(10)),
+        (3, 30, at(2), at(3)),
+    ]
+    assert find_conflicts(rows) == ([(1, 11, 10), (1, 12, 10), (1, 12, 11)], {1: 3})
+    assert find_conflicts(rows, limit=2) == ([(1, 11, 10), (1, 12, 10)], {1: 3})
+
+
+@pytest.fixture
+def schedule(session):
+    gestion = Collaborator(name='Scheduler', email='scheduler@epic.com', department='gestion', password='x')
+    supports = [Collaborator(name=f'Support {i}', email=f'schedule.support{i}@epic.com', department='support',
+                             password='x') for i in range(2)]
+    session.add_all([gestion, *supports])
+    session.flush()
+    client = Client(name='Schedule', email='schedule@client.com', telephone='+33100000000', company_name='S',
+                    commercial_id=gestion.id)
+    session.add(client)
+    session.flush()
+    contract = Contract(client_id=client.id, commercial_id=gestion.id, total_amount=10, amount_due=0, status=True)
+    session.add(contract)
+    session.flush()
+    periods = [(at(1), at(3), supports[0].id), (at(2), at(4), None), (at(3), at(5), None), (at(1), at(2), supports[1].id)]
+    events = [Event(contract_id=contract.id, client_id=client.id, start_date=start, end_date=end,
+                    support_contact_id=support_id, location='Lyon', attendees=5) for start, end, support_id in periods]
+    session.add_all(events)
+    session.commit()
+    yield {'supports': [support.id for support in supports], 'events': [event.id for event in events]}
+    for model in (Event, Contract, Client, Collaborator):
+        session.query(model).delete()
+    session.commit()
+
+
+def test_add_support_contact_rejects_overlaps(event_handler, schedule):
+    support = schedule['supports'][0]
+    booked, overlapping, adjacent, _ = schedule['events']
+
+    with pytest.raises(SchedulingConflict) as error:
+        event_handler.add_support_contact(overlapping, support)
+    assert error.value.conflicts == [booked]
+
+    # An event starting when the other one ends does not overlap it.
+    assert event_handler.add_support_contact(adjacent, support).support_contact_id == support
+    assert event_handler.add_support_contact(overlapping, support, allow_overlap=True).support_contact_id == support
+
+    assert event_handler.scheduling_conflicts() == {'total': 2, 'by_support_contact': {support: 2}, 'conflicts': [
+        {'support_contact_id': support, 'event_id': overlapping, 'other_event_id': booked},
+        {'support_contact_id': support, 'event_id': adjacent, 'other_event_id': overlapping},
+    ]}
+
+
+def test_overlap_check_reads_the_schedule_index(engine, tables):
+    statement = overlap_statement(1, at(1), at(2), exclude_id=3)
+    sql = str(statement.compile(engine, compile_kwargs={'literal_binds': True}))
+    with engine.connect() as connection:
+        plan = ' '.join(row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+    assert 'COVERING INDEX ix_events_support_schedule' in plan
+
+
+def test_plan_assignments_balances_free_support_contacts():
+    busy = Calendar()
+    busy.book(at(1), at(10), 1)
+    calendars = {1: busy, 2: Calendar(), 3: Calendar()}
+    events = [(10, at(2), at(3)), (11, at(2), at(4)), (13, at(2, 12), at(3, 12)), (12, at(3), at(5)), (14, at(11), None)]
+
+    assignments, unassigned = plan_assignments(events, calendars)
+
+    assert assignments == [(10, 2), (11, 3), (12, 2), (14, 1)]
+    assert unassigned == [13]
+    assert [len(calendars[support]) for support in (1, 2, 3)] == [2, 2, 1]
+
+
+def test_auto_assign_support(event_handler, session, schedule):
+    first, second = schedule['supports']
+    booked, overlapping, adjacent, other = schedule['events']
+
+    preview = event_handler.auto_assign_support(dry_run=True)
+    assert preview['assignments'] == [
+        {'event_id': overlapping, 'support_contact_id': second},
+        {'event_id': adjacent, 'support_contact_id': first},
+    ]
+    assert preview['updated'] == 0
+    assert session.get(Event, overlapping).support_contact_id is None
+
+    result = event_handler.auto_assign_support()
+    assert result['assignments'] == preview['assignments']
+    assert result['unassigned'] == []
+    assert result['loads'] == {first: 2, second: 2}
+    assert result['updated'] == 2
+    assert session.get(Event, overlapping).support_contact_id == second
+    assert event_handler.scheduling_conflicts()['total'] == 0
+    assert event_handler.auto_assign_support()['assignments'] == []
+
+
+def test_add_support_contact_many(event_handler, session, schedule):
+    first, second = schedule['supports']
+    booked, overlapping, adjacent, other = schedule['events']
+
+    with pytest.raises(SchedulingConflict) as error:
+        event_handler.add_support_contact_many([overlapping, adjacent], first)
+    assert error.value.conflicts == [booked, overlapping, adjacent]
+
+    with pytest.raises(SchedulingConflict) as error:
+        event_handler.add_support_contact_many([overlapping, adjacent], second)
+    assert error.value.conflicts == [overlapping, adjacent]
+
+    assert event_handler.add_support_contact_many([adjacent, 999999], first) == {'requested': 2, 'updated': 1}
+    assert session.get(Event, adjacent).support_contact_id == first
+    result = event_handler.add_support_contact_many([overlapping, adjacent], second, allow_overlap=True)
+    assert result == {'requested': 2, 'updated': 2}
+    assert session.get(Event, adjacent).support_contact_id == second
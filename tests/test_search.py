@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine
+from models import Base, Client, Contract, Event, Collaborator, match_expression
+from config.migrations import migrate
+
+
+@pytest.fixture
+def indexed(session):
+    commercial = Collaborator(name='Marie Curie', email='marie@epic.com', department='commercial', password='x')
+    session.add(commercial)
+    session.flush()
+    client = Client(name='Jean Dupont', email='jean@dupont-paris.fr', telephone='+33100000000',
+                    company_name='Dupont Événements', commercial_id=commercial.id)
+    other = Client(name='Paul Martin', email='paul@martin.fr', telephone='+33100000001',
+                   company_name='Martin SA', commercial_id=commercial.id)
+    session.add_all([client, other])
+    session.flush()
+    contract = Contract(client_id=client.id, commercial_id=commercial.id, total_amount=100, amount_due=0, status=True)
+    session.add(contract)
+    session.flush()
+    event = Event(contract_id=contract.id, client_id=client.id, start_date=datetime(2025, 1, 1),
+                  end_date=datetime(2025, 1, 2), location='Château de Versailles', attendees=10,
+                  notes='Gala dinner for Dupont')
+    session.add(event)
+    session.commit()
+    yield {'commercial': commercial, 'client': client, 'other': other, 'event': event}
+    for model in (Event, Contract, Client, Collaborator):
+        session.query(model).delete()
+    session.commit()
+
+
+def test_match_expression_quotes_every_word():
+    assert match_expression('dup par') == '"dup"* "par"*'
+    assert match_expression('a-b "OR"') == '"a"* "b"* "OR"*'
+    assert match_expression(' -- ') is None
+
+
+def test_search_ranks_prefix_matches(search_handler, indexed):
+    results = search_handler.search('dupon')
+    assert [(result['kind'], result['id']) for result in results] == [
+        ('client', indexed['client'].id), ('event', indexed['event'].id)]
+    assert '[' in results[0]['snippet'] or results[0]['name'] == 'Jean Dupont'
+
+    assert search_handler.search('versa chat')[0]['id'] == indexed['event'].id
+    assert search_handler.search('dupont', kinds=['event'])[0]['kind'] == 'event'
+    assert [result['kind'] for result in search_handler.search('marie')] == ['collaborator']
+    assert search_handler.search('"') == []
+    with pytest.raises(Exception, match='Unknown search kind'):
+        search_handler.search('dupont', kinds=['contract'])
+
+
+def test_search_index_follows_updates_and_deletes(search_handler, indexed, session):
+    indexed['other'].company_name = 'Lumière Productions'
+    session.commit()
+    assert [result['id'] for result in search_handler.search('lumiere')] == [indexed['other'].id]
+    assert search_handler.search('martin sa', kinds=['client']) == []
+
+    session.delete(indexed['event'])
+    session.commit()
+    assert search_handler.search('gala') == []
+
+
+def test_migrate_builds_the_search_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE collaborators (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                                   "email VARCHAR NOT NULL, department VARCHAR NOT NULL, password VARCHAR NOT NULL)")
+        connection.exec_driver_sql("INSERT INTO collaborators VALUES (1, 'Ada Lovelace', 'ada@epic.com', 'support', 'x')")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM search_index")
+
+    migrate(engine)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql(
+            "SELECT rowid FROM search_index WHERE search_index MATCH '\"lovel\"*'").scalars().all() == [1 * 3 + 2]
+    engine.dispose()
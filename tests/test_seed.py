@@ -0,0 +1,138 @@
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import Session
+from models import Base, Client, Contract, Event, Collaborator
+from controllers.seed import seed, draw_count
+
+
+@pytest.fixture
+def seed_engine():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_seed_is_referentially_consistent(seed_engine):
+    with seed_engine.begin() as connection:
+        counts = seed(connection, collaborators=12, clients=300, contracts_per_client=2, events_per_contract=1.5,
+                      skew=1.0, batch_size=100)
+
+    with Session(seed_engine) as session:
+        assert session.scalar(select(func.count(Client.id))) == counts['clients'] == 300
+        assert session.scalar(select(func.count(Contract.id))) == counts['contracts']
+        assert session.scalar(select(func.count(Event.id))) == counts['events'] > 0
+        # Contracts follow the commercial of their client.
+        assert session.scalar(select(func.count(Contract.id)).join(Client, Contract.client_id == Client.id)
+                              .where(Contract.commercial_id != Client.commercial_id)) == 0
+        assert session.scalar(select(func.count(Client.id)).join(Collaborator, Client.commercial_id == Collaborator.id)
+                              .where(Collaborator.department != 'commercial')) == 0
+        # Events belong to signed contracts of the same client, with a support contact.
+        assert session.scalar(select(func.count(Event.id)).join(Contract, Event.contract_id == Contract.id)
+                              .where((Contract.status.is_(False)) | (Event.client_id != Contract.client_id))) == 0
+        assert session.scalar(select(func.count(Event.id))
+                              .join(Collaborator, Event.support_contact_id == Collaborator.id)
+                              .where(Collaborator.department != 'support')) == 0
+        assert session.scalar(select(func.count(Contract.id)).where(Contract.amount_due > Contract.total_amount)) == 0
+
+        collaborator = session.scalars(select(Collaborator).order_by(Collaborator.id).limit(1)).one()
+        assert collaborator.check_password('password')
+        event = session.scalars(select(Event).limit(1)).one()
+        assert event.end_date > event.start_date
+        # Seeded rows are indexed in bulk, the insert triggers are back afterwards.
+        indexed = session.execute(text("SELECT count(*) FROM search_index")).scalar()
+        assert indexed == counts['collaborators'] + counts['clients'] + counts['events']
+        triggers = session.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars().all()
+        assert 'clients_search_insert' in triggers
+        assert 'contracts_revenue_insert' in triggers
+        assert session.execute(text("SELECT sum(contracts) FROM revenue_by_commercial")).scalar() == counts['contracts']
+        assert session.execute(text("SELECT sum(contracts) FROM revenue_by_client")).scalar() == counts['contracts']
+
+
+def test_seed_appends_and_is_reproducible(seed_engine):
+    with seed_engine.begin() as connection:
+        first = seed(connection, collaborators=3, clients=20, distribution='fixed', contracts_per_client=1)
+        second = seed(connection, collaborators=3, clients=20, distribution='fixed', contracts_per_client=1)
+    assert first == second
+    with Session(seed_engine) as session:
+        assert session.scalar(select(func.count(Collaborator.id))) == 6
+        assert session.scalar(select(func.count(Contract.id))) == 40
+
+
+def test_seed_rejects_bad_options(seed_engine):
+    with seed_engine.begin() as connection:
+        with pytest.raises(Exception, match='Unknown distribution'):
+            seed(connection, distribution='normal')
+        with pytest.raises(Exception, match='At least 3 collaborators'):
+            seed(connection, collaborators=2)
+
+
+def test_draw_count_follows_the_mean():
+    import random
+    rng = random.Random(1)
+    assert draw_count(rng, 2, 'fixed') == 2
+    for distribution in ('uniform', 'poisson'):
+        draws = [draw_count(rng, 2, distribution) for _ in range(5000)]
+        assert min(draws) >= 0
+        assert abs(sum(draws) / len(draws) - 2) < 0.1
+
+
+@pytest.fixture
+def seed_cli(tmp_path, monkeypatch):
+    import commands
+    import config.database
+    import epicEvents
+    from sqlalchemy.orm import sessionmaker
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setitem(commands._runtime, 'ready', True)
+    monkeypatch.setitem(config.database.engine_settings, 'profile', 'interactive')
+    monkeypatch.setattr(config.database, 'engine', engine)
+    monkeypatch.setattr(config.database, 'SessionLocal', sessionmaker(bind=engine))
+    monkeypatch.delenv('EPICEVENTS_DB_PROFILE', raising=False)
+    monkeypatch.chdir(tmp_path)
+    # The group keeps the commands it loaded, the startup tests expect none.
+    monkeypatch.setattr(epicEvents.cli, 'commands', {})
+    yield engine
+    engine.dispose()
+
+
+def invoke_seed(*seed_args, group_args=()):
+    from click.testing import CliRunner
+    import epicEvents
+    return CliRunner().invoke(epicEvents.cli, [*group_args, 'seed', '--collaborators', '3', '--clients', '5', *seed_args])
+
+
+def collaborator_count(engine):
+    with Session(engine) as session:
+        return session.scalar(select(func.count(Collaborator.id)))
+
+
+def test_seed_command_requires_gestion_or_an_empty_database(seed_cli):
+    import config.database
+
+    assert 'Please login first.' in invoke_seed().output
+    assert collaborator_count(seed_cli) == 0
+
+    assert invoke_seed('--initial').exit_code == 0
+    assert collaborator_count(seed_cli) == 3
+    assert config.database.engine_settings['profile'] == 'bulk-load'
+    assert 'only seeds a database without collaborators' in invoke_seed('--initial').output
+
+    with Session(seed_cli) as session:
+        commercial = session.scalars(select(Collaborator).where(Collaborator.department == 'commercial').limit(1)).one()
+        gestion = session.scalars(select(Collaborator).where(Collaborator.department == 'gestion').limit(1)).one()
+        commercial_token, gestion_token = commercial.create_token(), gestion.create_token()
+    with open('token.txt', 'w') as f:
+        f.write(commercial_token)
+    assert 'Permission denied' in invoke_seed().output
+    assert collaborator_count(seed_cli) == 3
+
+    with open('token.txt', 'w') as f:
+        f.write(gestion_token)
+    # As applied by bootstrap, which the fixture skips.
+    config.database.engine_settings['profile'] = 'read-heavy'
+    assert invoke_seed(group_args=['--db-profile', 'read-heavy']).exit_code == 0
+    assert collaborator_count(seed_cli) == 6
+    assert config.database.engine_settings['profile'] == 'read-heavy'
@@ -0,0 +1,52 @@
+import subprocess
+import sys
+from click.testing import CliRunner
+
+
+def test_cli_import_is_light():
+    code = ("import sys, epicEvents; "
+            "print(sorted(m for m in ('sqlalchemy', 'sentry_sdk', 'rich', 'views', 'config.database') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
+
+
+def test_help_lists_every_command_without_loading_it():
+    import epicEvents
+    result = CliRunner().invoke(epicEvents.cli, ['--help'])
+    assert result.exit_code == 0
+    for name in epicEvents.COMMANDS:
+        assert name in result.output
+    assert epicEvents.cli.commands == {}
+
+
+def test_lazy_command_resolution():
+    import epicEvents
+    result = CliRunner().invoke(epicEvents.cli, ['export', '--help'])
+    assert result.exit_code == 0
+    assert '--with-names' in result.output
+    assert CliRunner().invoke(epicEvents.cli, ['nope']).exit_code != 0
+
+
+def test_command_registry_matches_the_commands():
+    import click
+    import importlib
+    import pkgutil
+    import commands
+    import epicEvents
+
+    registered = set()
+    for name, (target, short_help) in epicEvents.COMMANDS.items():
+        module_name, attribute = target.split(':')
+        command = getattr(importlib.import_module(module_name), attribute)
+        assert (command.name, command.short_help) == (name, short_help)
+        registered.add(target)
+
+    defined = set()
+    for module_info in pkgutil.iter_modules(commands.__path__):
+        module = importlib.import_module(f'commands.{module_info.name}')
+        objects = {attribute: value for attribute, value in vars(module).items()
+                   if isinstance(value, click.Command) and value.callback.__module__ == module.__name__}
+        subcommands = {id(command) for value in objects.values() if isinstance(value, click.Group)
+                       for command in value.commands.values()}
+        defined |= {f'{module.__name__}:{attribute}' for attribute, value in objects.items() if id(value) not in subcommands}
+    assert defined == registered
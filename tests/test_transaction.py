@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import event
+from models import Client, ValidationError
+from controllers import transaction_scope
+
+
+def client_data(name, email):
+    return {'name': name, 'email': email, 'telephone': '+1234567890', 'company_name': 'Company'}
+
+
+def test_scope_commits_once(client_handler, session):
+    commits = []
+    listener = lambda session: commits.append(session)
+    event.listen(session, 'after_commit', listener)
+    try:
+        with client_handler.transaction():
+            for i in range(3):
+                client_handler.create_client(client_data(f'Batch {i}', f'batch{i}@gmail.com'))
+            assert commits == []
+    finally:
+        event.remove(session, 'after_commit', listener)
+
+    assert len(commits) == 1
+    assert session.query(Client).filter(Client.name.like('Batch %')).count() == 3
+
+
+def test_scope_rolls_back_everything_on_error(client_handler, session):
+    with pytest.raises(ValidationError):
+        with transaction_scope(session):
+            client_handler.create_client(client_data('Rolled back', 'rolledback@gmail.com'))
+            client_handler.create_client(client_data('Invalid', 'not-an-email'))
+
+    assert session.query(Client).filter_by(name='Rolled back').first() is None
+
+
+def test_nested_scope_is_a_savepoint(client_handler, session):
+    rejected = []
+    with transaction_scope(session):
+        for name, email in [('Kept 1', 'kept1@gmail.com'), ('Dropped', 'dropped'), ('Kept 2', 'kept2@gmail.com')]:
+            try:
+                with transaction_scope(session):
+                    client_handler.create_client(client_data(name, email))
+            except ValidationError:
+                rejected.append(name)
+
+    assert rejected == ['Dropped']
+    names = [client.name for client in session.query(Client).filter(Client.name.in_(['Kept 1', 'Dropped', 'Kept 2']))]
+    assert sorted(names) == ['Kept 1', 'Kept 2']
+    assert session.info['transaction_depth'] == 0
@@ -1,8 +1,17 @@
 from .cli_views import login, register, show_clients, add_client, update_client
-from .con_views import show_contracts, add_contract, update_contract, filter_contracts
-from .event_views import show_events, add_event, add_support_contact, update_event, filter_events_ws, filter_my_events
+from .con_views import (show_contracts, add_contract, update_contract, filter_contracts, find_contracts,
+                        update_contracts_batch)
+from .event_views import (show_events, add_event, add_support_contact, update_event, filter_events_ws, filter_my_events, find_events,
+                          show_scheduling_conflicts, auto_assign_support, add_support_contact_batch)
 from .col_views import show_collaborators, add_collaborator, update_collaborator, delete_collaborator
+from .io_views import import_data, export_data
+from .profile_views import show_sql_profile
+from .search_views import search
+from .report_views import show_revenue, rebuild_revenue, show_audit_trail
 
 __all__ = [login, register, show_clients, add_client, update_client, show_contracts, add_contract, update_contract, filter_contracts,
            show_events, filter_events_ws, filter_my_events, add_event, add_support_contact, update_event, show_collaborators, 
-           add_collaborator, update_collaborator, delete_collaborator]
+           add_collaborator, update_collaborator, delete_collaborator, import_data,
+           export_data, show_sql_profile, search, find_contracts, find_events,
+           show_revenue, rebuild_revenue, show_scheduling_conflicts, auto_assign_support,
+           update_contracts_batch, add_support_contact_batch, show_audit_trail]
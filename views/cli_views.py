@@ -1,10 +1,11 @@
 import click
 from rich.console import Console
-from rich.table import Table
-from models import Collaborator
+from models import Client, Collaborator
 from controllers import ClientHandler
+from views.output import page_through, render_rows, update_with_version
 from config.database import SessionLocal
 from sentry_sdk import capture_exception
+from metrics import metrics
 
 
 console = Console()
@@ -13,14 +14,14 @@ session = SessionLocal()
 
 
 @click.command()
+@metrics.timed('login')
 def login():
     """
     Authenticate a collaborator and return a JWT token.
     """
     email = click.prompt("Email")
     password = click.prompt("Password", hide_input=True)
-    collaborator = session.query(Collaborator).filter_by(email=email).first()
-    token = collaborator.authenticate(session, email, password)
+    token = Collaborator().authenticate(session, email, password)
     if token:
         console.print("[green]Login successful![/green]")
         with open('token.txt', 'w') as f:
@@ -32,6 +33,7 @@ def login():
 
 
 @click.command()
+@metrics.timed('register')
 def register():
     """
     Register a new collaborator.
@@ -48,6 +50,7 @@ def register():
 
 @click.command()
 @click.argument('token')
+@metrics.timed('add_client')
 def add_client(token):
     """
     Add a new client.
@@ -78,6 +81,7 @@ def add_client(token):
 
 @click.command()
 @click.argument('token')
+@metrics.timed('update_client')
 def update_client(token):
     """
     Update an existing client.
@@ -86,59 +90,66 @@ def update_client(token):
         token (str): JWT token for authentication.
     """
     client_id = click.prompt("Client ID")
-    name = click.prompt("Name")
-    email = click.prompt("Email")
-    telephone = click.prompt("Telephone")
-    company_name = click.prompt("Company Name")
 
     handler = ClientHandler(session, token)
-    data = {
-        'name': name,
-        'email': email,
-        'telephone': telephone,
-        'company_name': company_name
-    }
+
+    def prompt():
+        return {
+            'name': click.prompt("Name"),
+            'email': click.prompt("Email"),
+            'telephone': click.prompt("Telephone"),
+            'company_name': click.prompt("Company Name")
+        }
 
     try:
-        handler.update_client(client_id, data)
-        console.print("[green]Client updated successfully.[/green]")
+        if update_with_version(console, session, Client, client_id, CLIENT_COLUMNS, client_row, prompt,
+                               handler.update_client):
+            console.print("[green]Client updated successfully.[/green]")
     except Exception as e:
         capture_exception(e)
         console.print(f"[red]{e}[/red]")
 
 
-@click.command()
-@click.argument('token')
-def show_clients(token):
+CLIENT_COLUMNS = ('ID', 'Name', 'Email', 'Telephone', 'Company Name', 'Creation Date', 'Last Update', 'Contact Commercial')
+
+
+def client_row(client):
+    """
+    Format a client, loaded with its commercial contact, as a table row.
+
+    Args:
+        client (Client): The client to display.
+
+    Returns:
+        tuple: The cells of the row.
+    """
+    commercial = client.commercial
+    return (str(client.id), client.name, client.email, client.telephone, client.company_name, str(client.creation_date), 
+            str(client.last_update), commercial.name if commercial is not None else None)
+
+
+@metrics.timed('show_clients')
+def show_clients(token, page_size=None, sort_key='id', output='auto'):
     """
-    Display all clients in a table.
+    Display clients, one page at a time or streamed.
 
     Args:
         token (str): JWT token for authentication.
+        page_size (int): Clients per page, all clients streamed when None.
+        sort_key (str): The column to sort on.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
     """
     handler = ClientHandler(session, token)
+    render = lambda clients: render_rows(console, "Clients", CLIENT_COLUMNS, map(client_row, clients), output)
     try:
-        clients = handler.get_all_clients()
-        table = Table(title="Clients")
-        table.add_column('ID', justify="right", style="cyan", no_wrap=True)
-        table.add_column("Name", style="magenta")
-        table.add_column("Email", style="magenta")  
-        table.add_column("Telephone", style="magenta")
-        table.add_column("Company Name", style="magenta")
-        table.add_column("Creation Date", style="magenta")
-        table.add_column("Last Update", style="magenta")
-        table.add_column("Contact Commercial", style="magenta")
-
-        for client in clients:
-            try:
-                commercial_name = session.query(Collaborator).filter_by(id=client.commercial_id).first().name
-            except Exception:
-                commercial_name = None
-            table.add_row(str(client.id), client.name, client.email, client.telephone, client.company_name, str(client.creation_date), 
-                          str(client.last_update), commercial_name)
-        
-        console.print(table)
+        if page_size:
+            page_through(
+                lambda after_id, limit: handler.get_all_clients(after_id, limit, sort_key),
+                render,
+                page_size
+            )
+        else:
+            render(handler.stream_clients(sort_key))
     except Exception as e:
         capture_exception(e)
         console.print(f"[red]{e}[/red]")
-    
\ No newline at end of file
@@ -1,16 +1,18 @@
 import click
 from rich.console import Console
-from rich.table import Table
 from models import Collaborator
 from controllers import CollaboratorHandler
+from views.output import page_through, render_rows
 from config.database import SessionLocal
 from sentry_sdk import capture_exception
+from metrics import metrics
 
 console = Console()
 
 session = SessionLocal()
 
 
+@metrics.timed('add_collaborator')
 def add_collaborator(token):
     """
     Prompt user for collaborator details and create a new collaborator.
@@ -39,6 +41,7 @@ def add_collaborator(token):
         console.print(f"[red]{e}[/red]")
 
 
+@metrics.timed('update_collaborator')
 def update_collaborator(token):
     """
     Prompt user for collaborator ID and details, and update the collaborator.
@@ -50,7 +53,7 @@ def update_collaborator(token):
     name = click.prompt("Name")
     email = click.prompt("Email")
     department = click.prompt("Department(gestion/commercial/support)")
-    password = click.prompt("Password", hide_input=True)
+    password = click.prompt("Password (leave empty to keep it)", hide_input=True, default='', show_default=False)
 
     handler = CollaboratorHandler(session, token)
     data = {
@@ -68,30 +71,50 @@ def update_collaborator(token):
         console.print(f"[red]{e}[/red]")    
 
 
-def show_collaborators(token):
+COLLABORATOR_COLUMNS = ('ID', 'Name', 'Email', 'Department')
+
+
+def collaborator_row(collaborator):
+    """
+    Format a collaborator as a table row.
+
+    Args:
+        collaborator (Collaborator): The collaborator to display.
+
+    Returns:
+        tuple: The cells of the row.
+    """
+    return (str(collaborator.id), collaborator.name, collaborator.email, collaborator.department)
+
+
+@metrics.timed('show_collaborators')
+def show_collaborators(token, page_size=None, sort_key='id', output='auto'):
     """
-    Display all collaborators in a table.
+    Display collaborators, one page at a time or streamed.
 
     Args:
         token (str): JWT token for authentication.
+        page_size (int): Collaborators per page, all collaborators streamed when None.
+        sort_key (str): The column to sort on.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
     """
     handler = CollaboratorHandler(session, token)
+    render = lambda collaborators: render_rows(console, "Collaborators", COLLABORATOR_COLUMNS, 
+                                               map(collaborator_row, collaborators), output)
     try:
-        collaborators = handler.get_all_collaborators()
-        table = Table(title="Collaborators")
-        table.add_column('ID', justify="right", style="cyan", no_wrap=True)
-        table.add_column("Name", style="magenta")
-        table.add_column("Email", style="magenta")
-        table.add_column("Department", style="magenta")
-
-        for collaborator in collaborators:
-            table.add_row(str(collaborator.id), collaborator.name, collaborator.email, collaborator.department)
-            
-        console.print(table)
+        if page_size:
+            page_through(
+                lambda after_id, limit: handler.get_all_collaborators(after_id, limit, sort_key),
+                render,
+                page_size
+            )
+        else:
+            render(handler.stream_collaborators(sort_key))
     except Exception as e:
         capture_exception(e)
         console.print(f"[red]{e}[/red]")
 
+@metrics.timed('delete_collaborator')
 def delete_collaborator(token):
     """
     Delete a collaborator by ID.
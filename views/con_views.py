@@ -1,10 +1,11 @@
 import click
 from rich.console import Console
-from rich.table import Table
-from models import Collaborator, Client
+from models import Contract
 from controllers import ContractHandler
+from views.output import page_through, render_rows, print_batch_result, update_with_version
 from config.database import SessionLocal
 from sentry_sdk import capture_exception
+from metrics import metrics
 
 
 console = Console()
@@ -13,6 +14,7 @@ session = SessionLocal()
 
 @click.command()
 @click.argument('token')
+@metrics.timed('add_contract')
 def add_contract(token):
     """
     Add a new contract.
@@ -42,6 +44,7 @@ def add_contract(token):
 
 @click.command()
 @click.argument('token')
+@metrics.timed('update_contract')
 def update_contract(token):
     """
     Update an existing contract.
@@ -50,60 +53,69 @@ def update_contract(token):
         token (str): JWT token for authentication.
     """
     contract_id = click.prompt("Contract ID")
-    total_amount = click.prompt("Total Amount", type=float)
-    amount_due = click.prompt("Amount Due", type=float)
-    status = click.prompt("Status (true/false)").lower() in ('true', 'yes', '1')
 
     handler = ContractHandler(session, token)
-    data = {
-        'total_amount': total_amount,
-        'amount_due': amount_due,
-        'status': status
-    }
-    
+
+    def prompt():
+        return {
+            'total_amount': click.prompt("Total Amount", type=float),
+            'amount_due': click.prompt("Amount Due", type=float),
+            'status': click.prompt("Status (true/false)").lower() in ('true', 'yes', '1')
+        }
+
     try:
-        handler.update_contract(contract_id, data)
-        console.print("[green]Contract updated successfully.[/green]")
+        if update_with_version(console, session, Contract, contract_id, CONTRACT_COLUMNS, contract_row, prompt,
+                               handler.update_contract):
+            console.print("[green]Contract updated successfully.[/green]")
     except Exception as e:
         capture_exception(e)
         console.print(f"[red]{e}[/red]")
 
-@click.command()
-@click.argument('token')        
-def show_contracts(token):
+CONTRACT_COLUMNS = ('ID', 'Client Contact', 'Commercial Contact', 'Total Amount', 'Amount Due', 'Creation Date', 'Status')
+
+
+def contract_row(contract):
     """
-    Display all contracts in a table.
+    Format a contract, loaded with its client and commercial contact, as a table row.
+
+    Args:
+        contract (Contract): The contract to display.
+
+    Returns:
+        tuple: The cells of the row.
+    """
+    commercial = contract.commercial
+    return (str(contract.id), contract.client.name, commercial.name if commercial is not None else None, 
+            str(contract.total_amount), str(contract.amount_due), str(contract.creation_date), str(contract.status))
+
+
+@metrics.timed('show_contracts')
+def show_contracts(token, page_size=None, sort_key='id', output='auto'):
+    """
+    Display contracts, one page at a time or streamed.
 
     Args:
         token (str): JWT token for authentication.
+        page_size (int): Contracts per page, all contracts streamed when None.
+        sort_key (str): The column to sort on.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
     """
     handler = ContractHandler(session, token)
+    render = lambda contracts: render_rows(console, "Contracts", CONTRACT_COLUMNS, map(contract_row, contracts), output)
     try:
-        contracts = handler.get_all_contracts()
-    
-        table = Table(title="Contracts")
-        table.add_column('ID', justify="right", style="cyan", no_wrap=True)
-        table.add_column("Client Contact", style="magenta")
-        table.add_column("Commercial Contact", style="magenta")  
-        table.add_column("Total Amount", style="magenta")
-        table.add_column("Amount Due", style="magenta")
-        table.add_column("Creation Date", style="magenta")
-        table.add_column("Status", style="magenta")
-
-        for contract in contracts:
-            try:
-                commercial_name = session.query(Collaborator).filter_by(id=contract.commercial_id).first().name
-            except Exception:
-                commercial_name = None
-            client_name = session.query(Client).filter_by(id=contract.client_id).first().name
-            table.add_row(str(contract.id), client_name, commercial_name, 
-                        str(contract.total_amount), str(contract.amount_due), str(contract.creation_date), str(contract.status))
-            
-        console.print(table)
+        if page_size:
+            page_through(
+                lambda after_id, limit: handler.get_all_contracts(after_id, limit, sort_key),
+                render,
+                page_size
+            )
+        else:
+            render(handler.stream_contracts(sort_key))
     except Exception as e:
         capture_exception(e)
         console.print(f"[red]{e}[/red]")
 
+@metrics.timed('filter_contracts')
 def filter_contracts(token):
     """
     Display all contracts not paid in a table.
@@ -114,26 +126,55 @@ def filter_contracts(token):
     handler = ContractHandler(session, token)
     try:
         contracts = handler.filter_contacts_not_paid()
-    
-        table = Table(title="Contracts")
-        table.add_column('ID', justify="right", style="cyan", no_wrap=True)
-        table.add_column("Client Contact", style="magenta")
-        table.add_column("Commercial Contact", style="magenta")  
-        table.add_column("Total Amount", style="magenta")
-        table.add_column("Amount Due", style="magenta")
-        table.add_column("Creation Date", style="magenta")
-        table.add_column("Status", style="magenta")
-
-        for contract in contracts:
-            try:
-                commercial_name = session.query(Collaborator).filter_by(id=contract.commercial_id).first().name
-            except Exception:
-                commercial_name = None
-            client_name = session.query(Client).filter_by(id=contract.client_id).first().name
-            table.add_row(str(contract.id), client_name, commercial_name, 
-                        str(contract.total_amount), str(contract.amount_due), str(contract.creation_date), str(contract.status))
-            
-        console.print(table)
+        render_rows(console, "Contracts", CONTRACT_COLUMNS, map(contract_row, contracts))
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
+
+@metrics.timed('find_contracts')
+def find_contracts(token, terms, sort_key='id', limit=None, output='auto'):
+    """
+    Display the contracts matching filter terms.
+
+    Args:
+        token (str): JWT token for authentication.
+        terms (list): Filter terms, see ContractHandler.filter_contracts.
+        sort_key (str): The column to sort on.
+        limit (int): The maximum number of contracts, all when None.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
+    """
+    handler = ContractHandler(session, token)
+    try:
+        contracts = handler.filter_contracts(terms, sort_key, limit)
+        render_rows(console, "Contracts", CONTRACT_COLUMNS, map(contract_row, contracts), output)
     except Exception as e:
         capture_exception(e)
-        console.print(f"[red]{e}[/red]")
\ No newline at end of file
+        console.print(f"[red]{e}[/red]")
+
+
+# Batch action -> ContractHandler method.
+BATCH_ACTIONS = {
+    'sign': 'mark_contracts_signed',
+    'pay': 'mark_contracts_paid',
+    'adjust-due': 'adjust_amount_due',
+}
+
+
+@metrics.timed('update_contracts_batch')
+def update_contracts_batch(token, action, contract_ids, *args):
+    """
+    Update a list of contracts with a single statement.
+
+    Args:
+        token (str): JWT token for authentication.
+        action (str): One of BATCH_ACTIONS.
+        contract_ids (list): The ids of the contracts.
+        *args: The extra arguments of the action, the delta for adjust-due.
+    """
+    handler = ContractHandler(session, token)
+    try:
+        result = getattr(handler, BATCH_ACTIONS[action])(contract_ids, *args)
+        print_batch_result(console, result, 'contracts')
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
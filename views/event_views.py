@@ -1,11 +1,12 @@
 import click
 from rich.console import Console
-from rich.table import Table
-from models import Collaborator, Client
-from controllers import EventHandler
+from models import Event
+from controllers import EventHandler, SchedulingConflict
+from views.output import page_through, render_rows, print_batch_result, update_with_version
 from config.database import SessionLocal
 from datetime import datetime
 from sentry_sdk import capture_exception
+from metrics import metrics
 
 
 console = Console()
@@ -14,6 +15,7 @@ session = SessionLocal()
 
 @click.command()
 @click.argument('token')
+@metrics.timed('add_event')
 def add_event(token):
     """
     Add a new event.
@@ -44,6 +46,7 @@ def add_event(token):
         capture_exception(e)
         console.print(f"[red]{e}[/red]")
 
+@metrics.timed('update_event')
 def update_event(token):
     """
     Update an existing event.
@@ -52,63 +55,75 @@ def update_event(token):
         token (str): JWT token for authentication.
     """
     event_id = click.prompt("Event ID")
-    end_date_str = click.prompt("End Date (YYYY-MM-DD)")
-    end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
-    location = click.prompt("Location")
-    attendees = click.prompt("Attendees", type=int)
-    notes = click.prompt("Notes")
 
     handler = EventHandler(session, token)
-    data = {
-        'end_date': end_date,
-        'location': location,
-        'attendees': attendees,
-        'notes' : notes
-    }
+
+    def prompt():
+        return {
+            'end_date': datetime.strptime(click.prompt("End Date (YYYY-MM-DD)"), "%Y-%m-%d"),
+            'location': click.prompt("Location"),
+            'attendees': click.prompt("Attendees", type=int),
+            'notes': click.prompt("Notes")
+        }
 
     try:
-        handler.update_event(event_id, data)
-        console.print("[green]Event updated successfully.[/green]")
+        if update_with_version(console, session, Event, event_id, EVENT_COLUMNS, event_row, prompt,
+                               handler.update_event):
+            console.print("[green]Event updated successfully.[/green]")
     except Exception as e:
         capture_exception(e)
         console.print(f"[red]{e}[/red]")
 
-def show_events(token):
+EVENT_COLUMNS = ('ID', 'Contract ID', 'Client Name', 'Client Contact', 'Start Date', 'End Date', 'Support Contact', 
+                 'Location', 'Attendees', 'Notes')
+
+
+def event_row(event):
     """
-    Display all events in a table.
+    Format an event, loaded with its client and support contact, as a table row.
+
+    Args:
+        event (Event): The event to display.
+
+    Returns:
+        tuple: The cells of the row.
+    """
+    client = event.client
+    support_contact = event.support_contact
+    return (str(event.id), str(event.contract_id), client.name, client.email + '\n' + client.telephone, str(event.start_date), 
+            str(event.end_date), support_contact.name if support_contact is not None else "", 
+            event.location, str(event.attendees), event.notes)
+
+
+@metrics.timed('show_events')
+def show_events(token, page_size=None, sort_key='id', output='auto'):
+    """
+    Display events, one page at a time or streamed.
 
     Args:
         token (str): JWT token for authentication.
+        page_size (int): Events per page, all events streamed when None.
+        sort_key (str): The column to sort on.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
     """
     handler = EventHandler(session, token)
+    render = lambda events: render_rows(console, "Events", EVENT_COLUMNS, map(event_row, events), output)
     try:
-        events = handler.get_all_events()
-        table = Table(title="Events")
-        table.add_column('ID', justify="right", style="cyan", no_wrap=True)
-        table.add_column("Contract ID", style="magenta")
-        table.add_column("Client Name", style="magenta")
-        table.add_column("Client Contact", style="magenta")
-        table.add_column("Start Date", style="magenta")
-        table.add_column("End Date", style="magenta")
-        table.add_column("Support Contact", style="magenta")
-        table.add_column("Location", style="magenta")
-        table.add_column("Attendees", style="magenta")
-        table.add_column("Notes", style="magenta")
-
-        for event in events:
-            client = session.query(Client).filter_by(id=event.client_id).first()
-            support_contact = session.query(Collaborator).filter_by(id=event.support_contact_id).first()
-            table.add_row(str(event.id), str(event.contract_id), client.name, client.email + '\n' + client.telephone, str(event.start_date), 
-                        str(event.end_date), support_contact.name if support_contact is not None else "", 
-                        event.location, str(event.attendees), event.notes)
-            
-        console.print(table)
+        if page_size:
+            page_through(
+                lambda after_id, limit: handler.get_all_events(after_id, limit, sort_key),
+                render,
+                page_size
+            )
+        else:
+            render(handler.stream_events(sort_key))
 
     except Exception as e:
         capture_exception(e)
         console.print(f"[red]{e}[/red]")
 
 
+@metrics.timed('filter_events_ws')
 def filter_events_ws(token):
     """
     Display all events without support in a table.
@@ -119,31 +134,13 @@ def filter_events_ws(token):
     handler = EventHandler(session, token)
     try:
         events = handler.filter_events_without_support()
-        table = Table(title="Events")
-        table.add_column('ID', justify="right", style="cyan", no_wrap=True)
-        table.add_column("Contract ID", style="magenta")
-        table.add_column("Client Name", style="magenta")
-        table.add_column("Client Contact", style="magenta")
-        table.add_column("Start Date", style="magenta")
-        table.add_column("End Date", style="magenta")
-        table.add_column("Support Contact", style="magenta")
-        table.add_column("Location", style="magenta")
-        table.add_column("Attendees", style="magenta")
-        table.add_column("Notes", style="magenta")
-
-        for event in events:
-            client = session.query(Client).filter_by(id=event.client_id).first()
-            support_contact = session.query(Collaborator).filter_by(id=event.support_contact_id).first()
-            table.add_row(str(event.id), str(event.contract_id), client.name, client.email + '\n' + client.telephone, str(event.start_date), 
-                        str(event.end_date), support_contact.name if support_contact is not None else "", 
-                        event.location, str(event.attendees), event.notes)
-            
-        console.print(table)
+        render_rows(console, "Events", EVENT_COLUMNS, map(event_row, events))
 
     except Exception as e:
         capture_exception(e)
         console.print(f"[red]{e}[/red]")
 
+@metrics.timed('filter_my_events')
 def filter_my_events(token):
     """
     Display all events assigned to the current collaborator in a table.
@@ -154,32 +151,14 @@ def filter_my_events(token):
     handler = EventHandler(session, token)
     try:
         events = handler.filter_my_events()
-        table = Table(title="Events")
-        table.add_column('ID', justify="right", style="cyan", no_wrap=True)
-        table.add_column("Contract ID", style="magenta")
-        table.add_column("Client Name", style="magenta")
-        table.add_column("Client Contact", style="magenta")
-        table.add_column("Start Date", style="magenta")
-        table.add_column("End Date", style="magenta")
-        table.add_column("Support Contact", style="magenta")
-        table.add_column("Location", style="magenta")
-        table.add_column("Attendees", style="magenta")
-        table.add_column("Notes", style="magenta")
-
-        for event in events:
-            client = session.query(Client).filter_by(id=event.client_id).first()
-            support_contact = session.query(Collaborator).filter_by(id=event.support_contact_id).first()
-            table.add_row(str(event.id), str(event.contract_id), client.name, client.email + '\n' + client.telephone, str(event.start_date), 
-                        str(event.end_date), support_contact.name if support_contact is not None else "", 
-                        event.location, str(event.attendees), event.notes)
-            
-        console.print(table)
+        render_rows(console, "Events", EVENT_COLUMNS, map(event_row, events))
 
     except Exception as e:
         capture_exception(e)
         console.print(f"[red]{e}[/red]")
 
 
+@metrics.timed('add_support_contact')
 def add_support_contact(token):
     """
     Add a support contact for an event.
@@ -192,8 +171,129 @@ def add_support_contact(token):
 
     handler = EventHandler(session, token)
     try:
-        handler.add_support_contact(event_id, support_contact_id)
+        try:
+            handler.add_support_contact(event_id, support_contact_id)
+        except SchedulingConflict as e:
+            console.print(f"[yellow]{e}[/yellow]")
+            if not click.confirm("Assign anyway?", default=False):
+                return
+            handler.add_support_contact(event_id, support_contact_id, allow_overlap=True)
         console.print("Support contact designated successfully.")
     except Exception as e:
         capture_exception(e)
-        console.print(f"[red]{e}[/red]")
\ No newline at end of file
+        console.print(f"[red]{e}[/red]")
+
+@metrics.timed('find_events')
+def find_events(token, terms, sort_key='id', limit=None, output='auto'):
+    """
+    Display the events matching filter terms.
+
+    Args:
+        token (str): JWT token for authentication.
+        terms (list): Filter terms, see EventHandler.filter_events.
+        sort_key (str): The column to sort on.
+        limit (int): The maximum number of events, all when None.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
+    """
+    handler = EventHandler(session, token)
+    try:
+        events = handler.filter_events(terms, sort_key, limit)
+        render_rows(console, "Events", EVENT_COLUMNS, map(event_row, events), output)
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
+
+
+CONFLICT_COLUMNS = ('Support Contact ID', 'Event ID', 'Overlapped Event ID')
+
+
+@metrics.timed('show_scheduling_conflicts')
+def show_scheduling_conflicts(token, limit=1000, output='auto'):
+    """
+    Display the overlapping events of every support contact.
+
+    Args:
+        token (str): JWT token for authentication.
+        limit (int): The maximum number of listed pairs, all when None.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
+    """
+    handler = EventHandler(session, token)
+    try:
+        report = handler.scheduling_conflicts(limit)
+        if not report['total']:
+            console.print("[green]No scheduling conflict.[/green]")
+            return
+        conflicts = report['conflicts']
+        render_rows(console, f"Scheduling conflicts ({len(conflicts)} of {report['total']})", CONFLICT_COLUMNS,
+                    ((str(c['support_contact_id']), str(c['event_id']), str(c['other_event_id'])) for c in conflicts),
+                    output)
+        for support_contact_id, count in sorted(report['by_support_contact'].items()):
+            console.print(f"[yellow]Support contact {support_contact_id}: {count} conflicts.[/yellow]")
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
+
+
+ASSIGNMENT_COLUMNS = ('Event ID', 'Support Contact ID')
+
+
+@metrics.timed('auto_assign_support')
+def auto_assign_support(token, terms=(), dry_run=False, limit=1000, output='auto'):
+    """
+    Assign the events without support contact, balancing the support loads.
+
+    Args:
+        token (str): JWT token for authentication.
+        terms (list): Filter terms restricting the events, see EventHandler.filter_events.
+        dry_run (bool): Only show the planned assignments.
+        limit (int): The maximum number of listed assignments, all when None.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
+    """
+    handler = EventHandler(session, token)
+    try:
+        plan = handler.auto_assign_support(terms, dry_run)
+        assignments = plan['assignments']
+        if not assignments and not plan['unassigned']:
+            console.print("[green]No event without support contact.[/green]")
+            return
+        render_rows(console, f"Planned assignments ({min(len(assignments), limit or len(assignments))} of "
+                             f"{len(assignments)})", ASSIGNMENT_COLUMNS,
+                    ((str(a['event_id']), str(a['support_contact_id'])) for a in assignments[:limit]), output)
+        for support_contact_id, load in sorted(plan['loads'].items()):
+            console.print(f"Support contact {support_contact_id}: {load} events.")
+        if plan['unassigned']:
+            console.print(f"[yellow]{len(plan['unassigned'])} events overlap the calendar of every support "
+                          f"contact and stay unassigned.[/yellow]")
+        if dry_run:
+            console.print("[yellow]Dry run, nothing was assigned.[/yellow]")
+        else:
+            console.print(f"[green]{plan['updated']} events assigned.[/green]")
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
+
+
+@metrics.timed('add_support_contact_batch')
+def add_support_contact_batch(token, event_ids, support_contact_id, allow_overlap=False):
+    """
+    Assign a support contact to a list of events with a single statement.
+
+    Args:
+        token (str): JWT token for authentication.
+        event_ids (list): The ids of the events.
+        support_contact_id (int): The ID of the support contact.
+        allow_overlap (bool): Assign without asking when some events overlap.
+    """
+    handler = EventHandler(session, token)
+    try:
+        try:
+            result = handler.add_support_contact_many(event_ids, support_contact_id, allow_overlap)
+        except SchedulingConflict as e:
+            console.print(f"[yellow]{e}[/yellow]")
+            if not click.confirm("Assign anyway?", default=False):
+                return
+            result = handler.add_support_contact_many(event_ids, support_contact_id, allow_overlap=True)
+        print_batch_result(console, result, 'events')
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
@@ -0,0 +1,68 @@
+from rich.console import Console
+from controllers import ImportHandler, ExportHandler
+from controllers.bulk import read_records
+from config.database import SessionLocal
+from sentry_sdk import capture_exception
+from metrics import metrics
+
+
+console = Console()
+
+session = SessionLocal()
+
+MAX_REPORTED_ERRORS = 20
+
+
+@metrics.timed('import_data')
+def import_data(token, entity, path, fmt=None, batch_size=1000, workers=None):
+    """
+    Import clients, contracts or events from a CSV or JSONL file.
+
+    Args:
+        token (str): JWT token for authentication.
+        entity (str): 'clients', 'contracts' or 'events'.
+        path (str): The file to import.
+        fmt (str): 'csv' or 'jsonl', guessed from the extension when None.
+        batch_size (int): The number of rows per transaction.
+        workers (int): The number of parsing processes.
+    """
+    handler = ImportHandler(session, token)
+    try:
+        report = handler.import_records(entity, read_records(path, fmt), batch_size, workers)
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
+        return
+
+    console.print(f"[green]{report['inserted']} {entity} imported.[/green]")
+    errors = report['errors']
+    if errors:
+        console.print(f"[red]{len(errors)} rows rejected.[/red]")
+        for line_number, messages in errors[:MAX_REPORTED_ERRORS]:
+            console.print(f"[red]Line {line_number}: {' '.join(messages)}[/red]")
+        if len(errors) > MAX_REPORTED_ERRORS:
+            console.print(f"[red]... and {len(errors) - MAX_REPORTED_ERRORS} more.[/red]")
+
+
+@metrics.timed('export_data')
+def export_data(token, entities, directory, fmt='csv', with_names=False, workers=None, chunk_size=5000):
+    """
+    Export clients, contracts and events to CSV or JSONL files.
+
+    Args:
+        token (str): JWT token for authentication.
+        entities (list): Entities among 'clients', 'contracts' and 'events'.
+        directory (str): The directory receiving the files.
+        fmt (str): 'csv' or 'jsonl'.
+        with_names (bool): Whether to add the commercial, client and support names.
+        workers (int): The number of tables exported in parallel.
+        chunk_size (int): The number of rows fetched per round trip.
+    """
+    handler = ExportHandler(session, token)
+    try:
+        counts = handler.export_entities(entities, directory, fmt, with_names, workers, chunk_size)
+        for entity, count in counts.items():
+            console.print(f"[green]{count} {entity} exported to {directory}/{entity}.{fmt}.[/green]")
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
@@ -0,0 +1,195 @@
+import itertools
+import click
+from rich.table import Table
+from models import NotFound, ConcurrentUpdateError
+
+
+STREAM_THRESHOLD = 500
+
+OUTPUT_MODES = ('auto', 'table', 'plain', 'tsv')
+
+
+def build_table(title, columns, rows):
+    """
+    Build a rich table with the column styles used across the views.
+
+    Args:
+        title (str): The table title.
+        columns (list): The column headers, the first one being the ID.
+        rows (iterable): Rows as tuples of strings.
+
+    Returns:
+        Table: The rich table to print.
+    """
+    table = Table(title=title)
+    table.add_column(columns[0], justify="right", style="cyan", no_wrap=True)
+    for column in columns[1:]:
+        table.add_column(column, style="magenta")
+    for row in rows:
+        table.add_row(*row)
+    return table
+
+
+def _clean(value):
+    """
+    Flatten a cell so it fits on a single output line.
+    """
+    return ' '.join(('' if value is None else str(value)).split())
+
+
+def stream_plain(columns, rows, sample=(), separator=None):
+    """
+    Write rows one by one as aligned text or TSV.
+
+    Column widths for the aligned output are taken from the header and the
+    sample rows, longer cells simply push the line wider, so nothing has to
+    be held in memory.
+
+    Args:
+        columns (list): The column headers.
+        rows (iterable): Rows as tuples of strings.
+        sample (list): Rows already read from the iterator, written first.
+        separator (str): '\\t' for TSV, None for aligned columns.
+    """
+    if separator is None:
+        widths = [len(column) for column in columns]
+        for row in sample:
+            widths = [max(width, len(_clean(cell))) for width, cell in zip(widths, row)]
+        format_line = lambda cells: '  '.join(cell.ljust(width) for cell, width in zip(cells, widths)).rstrip()
+    else:
+        format_line = separator.join
+
+    click.echo(format_line(list(columns)))
+    for row in itertools.chain(sample, rows):
+        click.echo(format_line([_clean(cell) for cell in row]))
+
+
+def render_rows(console, title, columns, rows, output='auto', threshold=STREAM_THRESHOLD):
+    """
+    Print rows as a rich table or stream them as plain text.
+
+    In auto mode up to threshold rows are buffered: a result that fits is
+    shown as a rich table, a bigger one is streamed as aligned text so peak
+    memory stays bounded by the threshold and the handler chunk size.
+
+    Args:
+        console (Console): The rich console of the calling view.
+        title (str): The table title.
+        columns (list): The column headers.
+        rows (iterable): Rows as tuples of strings, typically a generator.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
+        threshold (int): The largest result rendered as a table in auto mode.
+    """
+    if output not in OUTPUT_MODES:
+        raise click.BadParameter(f"Output must be one of: {', '.join(OUTPUT_MODES)}.")
+
+    if output == 'table':
+        console.print(build_table(title, columns, rows))
+    elif output == 'tsv':
+        stream_plain(columns, rows, separator='\t')
+    elif output == 'plain':
+        stream_plain(columns, rows)
+    else:
+        rows = iter(rows)
+        sample = list(itertools.islice(rows, threshold + 1))
+        if len(sample) <= threshold:
+            console.print(build_table(title, columns, sample))
+        else:
+            stream_plain(columns, rows, sample)
+
+
+def page_through(fetch, render, page_size=None):
+    """
+    Render a listing page by page using keyset pagination.
+
+    Each page is fetched right after the last row of the previous one, and the
+    user is asked before the next page is loaded.
+
+    Args:
+        fetch (callable): Handler listing method accepting after_id and limit.
+        render (callable): Function printing one page of rows.
+        page_size (int): Rows per page, everything at once when None.
+    """
+    after_id = None
+    while True:
+        rows = fetch(after_id=after_id, limit=page_size)
+        render(rows)
+        if not page_size or len(rows) < page_size:
+            break
+        if not click.confirm("Next page?", default=True):
+            break
+        after_id = rows[-1].id
+
+
+def print_batch_result(console, result, noun):
+    """
+    Print the outcome of a batch update, see BaseHandler._update_many.
+
+    Args:
+        console (Console): The rich console of the calling view.
+        result (dict): The requested and updated counts.
+        noun (str): The plural name of the updated rows.
+    """
+    console.print(f"[green]{result['updated']} of {result['requested']} {noun} updated.[/green]")
+    skipped = result['requested'] - result['updated']
+    if skipped:
+        console.print(f"[yellow]{skipped} {noun} not found or not permitted.[/yellow]")
+
+
+def update_with_version(console, session, model, row_id, columns, format_row, prompt, update):
+    """
+    Run an interactive update against the version of the row the user saw.
+
+    The current row and its version are shown before the new values are
+    prompted, and that version is sent with them, see
+    BaseHandler._check_version. When someone else changed the row meanwhile,
+    the fresh row is shown and the user enters the changes again on top of
+    it, or gives up: values typed for an older version are never written
+    blindly.
+
+    Args:
+        console (Console): The rich console of the calling view.
+        session: The session of the calling view.
+        model: The mapped class of the row.
+        row_id: The id typed by the user.
+        columns (tuple): The column headers of format_row.
+        format_row (callable): Formats the row as a table row.
+        prompt (callable): Asks the new values, returns the data dict.
+        update (callable): The handler update method, taking the id and the data.
+
+    Returns:
+        bool: Whether the update was written.
+
+    Raises:
+        NotFound: If the row does not exist.
+    """
+    name = model.__name__.lower()
+
+    def show(current, title):
+        console.print(build_table(f"{title} {name} {current.id}, version {current.version}", columns,
+                                  [format_row(current)]))
+
+    current = session.get(model, int(row_id), populate_existing=True)
+    if current is None:
+        raise NotFound(f'{model.__name__} not found')
+    show(current, "Current")
+    while True:
+        version = current.version
+        # The read transaction is not kept open while the user types.
+        session.rollback()
+        data = prompt()
+        data['version'] = version
+        try:
+            update(row_id, data)
+            return True
+        except ConcurrentUpdateError:
+            session.rollback()
+
+        current = session.get(model, int(row_id), populate_existing=True)
+        if current is None:
+            raise NotFound(f'{model.__name__} not found')
+        console.print(f"[yellow]This {name} was changed by someone else since version {version}.[/yellow]")
+        show(current, "Now")
+        if not click.confirm("Enter your changes again on this version?", default=False):
+            console.print("[yellow]Update cancelled.[/yellow]")
+            return False
@@ -0,0 +1,48 @@
+from rich.console import Console
+from rich.table import Table
+
+
+console = Console()
+
+MAX_SQL_WIDTH = 120
+
+MAX_LISTED_STATEMENTS = 10
+
+
+def _one_line(sql):
+    """
+    Squeezes a statement on one line, shortened to MAX_SQL_WIDTH characters.
+    """
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= MAX_SQL_WIDTH else sql[:MAX_SQL_WIDTH - 3] + '...'
+
+
+def show_sql_profile(report, title='SQL profile'):
+    """
+    Print the summary of a SQL profiler report.
+
+    Args:
+        report (dict): The report, see SqlProfiler.report.
+        title (str): The title of the summary, usually the profiled command.
+    """
+    console.print(f"[bold]{title}[/bold]: {report['queries']} queries in {report['total'] * 1000:.1f} ms")
+    if not report['queries']:
+        return
+
+    table = Table()
+    for column in ('Count', 'Distinct params', 'Total ms', 'Max ms', 'Statement'):
+        table.add_column(column, justify='left' if column == 'Statement' else 'right')
+    for stats in report['statements'][:MAX_LISTED_STATEMENTS]:
+        count = f"[red]{stats['count']}[/red]" if stats['count'] > 1 else str(stats['count'])
+        table.add_row(count, str(stats['distinct']), f"{stats['total'] * 1000:.2f}", f"{stats['max'] * 1000:.2f}",
+                      _one_line(stats['sql']))
+    console.print(table)
+
+    for stats in report['duplicates']:
+        kind = "possible N+1 loop" if stats['distinct'] > 1 else "redundant query"
+        console.print(f"[yellow]Repeated {stats['count']} times ({kind}):[/yellow] {_one_line(stats['sql'])}")
+
+    for slow in report['slowest']:
+        console.print(f"[cyan]{slow['duration'] * 1000:.2f} ms[/cyan] {_one_line(slow['sql'])}")
+        for step in slow['plan']:
+            console.print(f"    {step}")
@@ -0,0 +1,103 @@
+from rich.console import Console
+from controllers import ReportHandler
+from config.database import SessionLocal
+from sentry_sdk import capture_exception
+from metrics import metrics
+from views.output import render_rows
+
+
+console = Console()
+
+session = SessionLocal()
+
+REVENUE_COLUMNS = ('ID', 'Name', 'Contracts', 'Signed', 'Total signed', 'Outstanding')
+
+MAX_REPORTED_DIFFERENCES = 20
+
+
+def revenue_row(key, row):
+    """
+    Format the totals of a commercial or a client as a table row.
+    """
+    return (str(row[key]), row['name'], str(row['contracts']), str(row['signed_contracts']),
+            f"{row['total_signed']:.2f}", f"{row['total_due']:.2f}")
+
+
+@metrics.timed('show_revenue')
+def show_revenue(token, by='commercial', commercial_id=None, limit=None, output='auto'):
+    """
+    Display the signed and outstanding totals per commercial or per client.
+
+    Args:
+        token (str): JWT token for authentication.
+        by (str): 'commercial' or 'client'.
+        commercial_id (int): With by='client', only the clients of this commercial.
+        limit (int): With by='client', the maximum number of clients.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
+    """
+    handler = ReportHandler(session, token)
+    try:
+        if by == 'commercial':
+            rows, key, title = handler.revenue_by_commercial(), 'commercial_id', "Revenue by commercial"
+        else:
+            rows, key, title = handler.revenue_by_client(commercial_id, limit), 'client_id', "Revenue by client"
+        render_rows(console, title, REVENUE_COLUMNS, (revenue_row(key, row) for row in rows), output)
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
+
+
+@metrics.timed('rebuild_revenue')
+def rebuild_revenue(token, check_only=False):
+    """
+    Compare the revenue summaries with the contracts, and recompute them.
+
+    Args:
+        token (str): JWT token for authentication.
+        check_only (bool): Only report the differences, without rebuilding.
+    """
+    handler = ReportHandler(session, token)
+    try:
+        differences = handler.check_revenue() if check_only else handler.rebuild_revenue()
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
+        return
+
+    if not differences:
+        console.print("[green]The revenue summaries match the contracts.[/green]")
+    else:
+        console.print(f"[red]{len(differences)} totals differed from the contracts.[/red]")
+        for difference in differences[:MAX_REPORTED_DIFFERENCES]:
+            console.print(f"[red]{difference['table']} {difference['key']} {difference['column']}: "
+                          f"{difference['stored']} instead of {difference['expected']}[/red]")
+    if not check_only:
+        console.print("[green]Revenue summaries rebuilt.[/green]")
+
+
+AUDIT_COLUMNS = ('ID', 'Recorded at', 'Collaborator', 'Table', 'Row', 'Action', 'Changes')
+
+
+@metrics.timed('show_audit_trail')
+def show_audit_trail(token, table_name=None, row_id=None, limit=50, output='auto'):
+    """
+    Display the latest recorded changes, the latest first.
+
+    Args:
+        token (str): JWT token for authentication.
+        table_name (str): Only the changes of this table.
+        row_id (int): Only the changes of this row.
+        limit (int): The maximum number of changes.
+        output (str): One of 'auto', 'table', 'plain' or 'tsv'.
+    """
+    handler = ReportHandler(session, token)
+    try:
+        entries = handler.audit_trail(table_name, row_id, limit)
+        render_rows(console, "Audit trail", AUDIT_COLUMNS,
+                    ((str(entry['id']), entry['recorded_at'].strftime('%Y-%m-%d %H:%M:%S'),
+                      str(entry['collaborator_id'] or ''), entry['table_name'], str(entry['row_id'] or ''),
+                      entry['action'], entry['changes']) for entry in entries),
+                    output)
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")
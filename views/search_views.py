@@ -0,0 +1,39 @@
+from rich.console import Console
+from controllers import SearchHandler
+from config.database import SessionLocal
+from sentry_sdk import capture_exception
+from metrics import metrics
+from views.output import render_rows
+
+
+console = Console()
+
+session = SessionLocal()
+
+SEARCH_COLUMNS = ('ID', 'Kind', 'Name', 'Matches')
+
+
+@metrics.timed('search')
+def search(token, query, kinds=None, limit=20, output='auto'):
+    """
+    Display the clients, events and collaborators matching a query, best first.
+
+    Args:
+        token (str): JWT token for authentication.
+        query (str): The searched words, each one matched as a prefix.
+        kinds (list): Kinds to restrict the search to, among client, event and collaborator.
+        limit (int): The maximum number of results.
+        output (str): One of OUTPUT_MODES.
+    """
+    handler = SearchHandler(session, token)
+    try:
+        results = handler.search(query, kinds, limit)
+        if not results:
+            console.print("[yellow]No match.[/yellow]")
+            return
+        render_rows(console, f"Search: {query}", SEARCH_COLUMNS,
+                    ((str(result['id']), result['kind'], result['name'], result['snippet']) for result in results),
+                    output)
+    except Exception as e:
+        capture_exception(e)
+        console.print(f"[red]{e}[/red]")